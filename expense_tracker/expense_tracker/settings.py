@@ -11,6 +11,47 @@ ALLOWED_HOSTS = []
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# AI chat memory (tracker.chat_memory). Without MongoDB, e.g. for a single
+# process or tests, use {"BACKEND": "tracker.chat_memory.LocalChatStore"}.
+CHAT_MEMORY = {
+    "BACKEND": "tracker.chat_memory.MongoChatStore",
+    "OPTIONS": {
+        "uri": os.getenv("MONGO_URI", "mongodb://localhost:27017/"),
+        "database": "ai_assistant",
+    },
+}
+
+# "dashboard" holds the dashboard totals and chart data (tracker.summaries).
+# LocMemCache is per process; with several worker processes set
+# DASHBOARD_CACHE to "file" or "db" (run createcachetable first) to share it.
+DASHBOARD_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "dashboard"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache" / "dashboard")),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "tracker_dashboard_cache"),
+}
+_dashboard_backend, _dashboard_location = DASHBOARD_CACHE_BACKENDS[os.getenv("DASHBOARD_CACHE", "locmem")]
+
+# "ai_responses" holds Gemini answers (tracker.ai). LocMemCache evicts the
+# least recently used entries past MAX_ENTRIES; use a shared backend such as
+# Redis or FileBasedCache to share answers between processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "ai_responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ai-responses",
+        "TIMEOUT": int(os.getenv("AI_RESPONSE_CACHE_TTL", 6 * 60 * 60)),
+        "OPTIONS": {"MAX_ENTRIES": 5000, "CULL_FREQUENCY": 10},
+    },
+    "dashboard": {
+        "BACKEND": _dashboard_backend,
+        "LOCATION": os.getenv("DASHBOARD_CACHE_LOCATION", _dashboard_location),
+        "TIMEOUT": 24 * 60 * 60,  # keys include the date, so a day is the useful lifetime
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("DASHBOARD_CACHE_ENTRIES", 10000)), "CULL_FREQUENCY": 4},
+    },
+}
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -22,6 +63,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tracker.instrumentation.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -31,6 +73,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# tracker.instrumentation: log requests slower than this, and SQL repeated
+# more than N_PLUS_ONE_THRESHOLD times in one request
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+N_PLUS_ONE_THRESHOLD = 10
+
 ROOT_URLCONF = 'expense_tracker.urls'
 
 TEMPLATES = [
@@ -5,12 +5,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from tracker.views import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('tracker.urls')),
    
 ]
 
-# Serve media files during development
+# Serve media files during development (with the same cache headers the
+# production web server should send, see the README)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
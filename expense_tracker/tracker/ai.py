@@ -0,0 +1,102 @@
+import hashlib
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+
+from . import metrics
+from .versioning import get_data_version
+
+GEMINI_MODEL = "gemini-1.5-flash"
+
+# Cache alias for Gemini answers; see CACHES in settings for its size and TTL
+RESPONSE_CACHE = "ai_responses"
+
+
+@lru_cache(maxsize=None)
+def get_model(name=GEMINI_MODEL):
+    """Shared Gemini client for ``name``, configured on first use.
+
+    google.generativeai is heavy to import, so it is only loaded by the
+    first process that actually talks to the model, and then reused.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai.GenerativeModel(name)
+
+
+# ---------- Response Cache ----------
+def normalize_question(text):
+    """Casefold, collapse whitespace and drop trailing punctuation"""
+    text = " ".join(text.casefold().split())
+    return re.sub(r"[\s?!.]+$", "", text)
+
+
+def _response_cache():
+    try:
+        return caches[RESPONSE_CACHE]
+    except InvalidCacheBackendError:
+        return None
+
+
+# Words that point back into the conversation ("why is that?", "and last
+# week?"); "this"/"that" before a period ("this month") do not
+_FOLLOW_UP = re.compile(
+    r"^(?:and|or|but|also|so|then|what about|how about)\b"
+    r"|\b(?:it|its|they|them|their|those|these|he|she|him|her|same|else|again|above|previous|earlier)\b"
+    r"|\b(?:this|that)\b(?!\s+(?:day|week|weekend|month|quarter|year)\b)"
+    r"|\.\.\.|…"
+)
+
+
+def is_follow_up(question):
+    """Whether the question only makes sense with the conversation before it"""
+    return bool(_FOLLOW_UP.search(normalize_question(question)))
+
+
+def cacheable(question, history):
+    """Whether an answer to ``question`` can be shared across conversations:
+    it opens the conversation or stands on its own"""
+    return not history or not is_follow_up(question)
+
+
+def response_key(user_id, question):
+    """Cache key for a question; only used for questions that are ``cacheable``.
+
+    Scoped to the user's current data version: any expense change bumps
+    it, so answers computed from older data are never looked up again and
+    simply age out of the cache.
+    """
+    digest = hashlib.sha256(normalize_question(question).encode()).hexdigest()
+    return f"reply:{user_id}:{get_data_version(user_id)}:{digest}"
+
+
+def cached_reply(user_id, question):
+    """A previous Gemini answer to the same question on the same data, or None"""
+    cache = _response_cache()
+    if cache is None:
+        return None
+    reply = cache.get(response_key(user_id, question))
+    metrics.incr("ai.cache.miss" if reply is None else "ai.cache.hit")
+    return reply
+
+
+def cache_reply(user_id, question, reply):
+    cache = _response_cache()
+    if cache is not None and reply:
+        cache.set(response_key(user_id, question), reply)
+
+
+def response_cache_stats():
+    counts = metrics.read("ai.cache.hit", "ai.cache.miss")
+    hits, misses = counts["ai.cache.hit"], counts["ai.cache.miss"]
+    return {"hits": hits, "misses": misses, "hit_rate": metrics.ratio(hits, misses)}
+
+
+def local_answer_stats():
+    """How many chat questions the intent engine answered without Gemini"""
+    counts = metrics.read("ai.answer.local", "ai.answer.remote")
+    local, remote = counts["ai.answer.local"], counts["ai.answer.remote"]
+    return {"local": local, "remote": remote, "local_rate": metrics.ratio(local, remote)}
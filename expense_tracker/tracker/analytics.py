@@ -0,0 +1,289 @@
+"""Spending analytics on columnar NumPy arrays.
+
+A user's expenses are loaded once into parallel arrays ordered by date
+(date ordinal, amount in cents, category code, plus a running total) and
+kept per process, within ANALYTICS_CACHE_BYTES, until their data version
+changes. Trends, moving
+averages and the month-end budget projection are then computed with
+binary searches and vectorized operations, without touching the database
+again.
+"""
+import calendar
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+
+from .matching import get_category_matcher
+from .models import Expense, UserProfile
+from .periods import as_date, month_start
+from .versioning import get_data_version
+
+LOAD_CHUNK_SIZE = 50_000
+DEFAULT_MONTHS = 12
+MAX_MONTHS = 60
+DAILY_DAYS = 90  # days of daily totals and moving averages returned
+MOVING_AVERAGE_WINDOWS = (7, 30)
+RUN_RATE_DAYS = 30  # trailing days the month-end projection extrapolates from
+
+
+@dataclass(frozen=True)
+class ExpenseColumns:
+    """Expenses of one user as parallel arrays, ordered by date"""
+
+    days: np.ndarray        # int32 date ordinals, ascending
+    cents: np.ndarray       # int64 amounts in cents
+    categories: np.ndarray  # int16 codes into category_ids
+    category_ids: tuple     # category id of each code (None for uncategorized)
+    cumulative: np.ndarray  # int64 running total of cents, with a leading 0
+
+    @classmethod
+    def build(cls, days, cents, categories, category_ids):
+        if len(days) and np.any(days[1:] < days[:-1]):
+            order = np.argsort(days, kind="stable")
+            days, cents, categories = days[order], cents[order], categories[order]
+        cumulative = np.zeros(len(cents) + 1, np.int64)
+        np.cumsum(cents, out=cumulative[1:])
+        return cls(days, cents, categories, tuple(category_ids), cumulative)
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def nbytes(self):
+        return self.days.nbytes + self.cents.nbytes + self.categories.nbytes + self.cumulative.nbytes
+
+    def span(self, start, end):
+        """Index range of the expenses dated ``start`` to ``end`` inclusive"""
+        return (int(np.searchsorted(self.days, start.toordinal(), "left")),
+                int(np.searchsorted(self.days, end.toordinal(), "right")))
+
+    def total(self, start, end):
+        """Cents spent from ``start`` to ``end`` inclusive"""
+        low, high = self.span(start, end)
+        return int(self.cumulative[high] - self.cumulative[low])
+
+
+# ---------- Loading ----------
+def load_columns(user_id):
+    """Read every expense of a user into ExpenseColumns, in chunks"""
+    # Ordered by the (user, date) index, so the arrays need no sorting
+    rows = (Expense.objects.filter(user_id=user_id).order_by("date")
+            .values_list("date", "amount", "category_id").iterator(chunk_size=LOAD_CHUNK_SIZE))
+    codes = {}
+    days, cents, categories = [], [], []
+    while True:
+        chunk = list(islice(rows, LOAD_CHUNK_SIZE))
+        if not chunk:
+            break
+        days.append(np.fromiter((as_date(row[0]).toordinal() for row in chunk), np.int32, len(chunk)))
+        cents.append(np.rint(np.fromiter((row[1] for row in chunk), np.float64, len(chunk)) * 100).astype(np.int64))
+        categories.append(np.fromiter((codes.setdefault(row[2], len(codes)) for row in chunk), np.int32, len(chunk)))
+
+    code_type = np.int16 if len(codes) <= np.iinfo(np.int16).max else np.int32
+    return ExpenseColumns.build(
+        days=np.concatenate(days) if days else np.empty(0, np.int32),
+        cents=np.concatenate(cents) if cents else np.empty(0, np.int64),
+        categories=(np.concatenate(categories) if categories else np.empty(0, np.int32)).astype(code_type),
+        category_ids=codes,
+    )
+
+
+_lock = threading.Lock()
+_columns = OrderedDict()  # user id -> (data version, ExpenseColumns), least recently used first
+_cached_bytes = 0
+
+
+def _cache_limit():
+    return getattr(settings, "ANALYTICS_CACHE_BYTES", 64 * 1024 * 1024)  # per process
+
+
+def get_columns(user_id):
+    """The user's ExpenseColumns, reloaded only after their data changes.
+
+    Least recently used users are evicted once the cached arrays pass
+    ANALYTICS_CACHE_BYTES; a user larger than that is not cached at all.
+    """
+    global _cached_bytes
+    version = get_data_version(user_id)
+    with _lock:
+        cached = _columns.get(user_id)
+        if cached is not None and cached[0] == version:
+            _columns.move_to_end(user_id)
+            return cached[1]
+    # Loaded outside the lock; a write during the load bumps the version,
+    # so the next call reloads
+    columns = load_columns(user_id)
+    limit = _cache_limit()
+    with _lock:
+        previous = _columns.pop(user_id, None)
+        if previous is not None:
+            _cached_bytes -= previous[1].nbytes
+        if columns.nbytes <= limit:
+            _columns[user_id] = (version, columns)
+            _cached_bytes += columns.nbytes
+        while _cached_bytes > limit:
+            _cached_bytes -= _columns.popitem(last=False)[1][1].nbytes
+    return columns
+
+
+def clear_columns():
+    global _cached_bytes
+    with _lock:
+        _columns.clear()
+        _cached_bytes = 0
+
+
+# ---------- Computations ----------
+# Range sums come from the running total and row ranges from a binary
+# search on the sorted dates, so no computation scans every row.
+def _month_number(day):
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def _month_date(number):
+    return date(1970 + number // 12, number % 12 + 1, 1)
+
+
+def _amount(cents):
+    return round(float(cents) / 100, 2)
+
+
+def monthly_totals(columns, today, months=DEFAULT_MONTHS):
+    """Cents spent in each of the ``months`` months up to today's, oldest first.
+
+    The current month runs to today; future-dated expenses are not counted.
+    """
+    first = _month_number(today) - months + 1
+    boundaries = [_month_date(number).toordinal() for number in range(first, first + months)]
+    boundaries.append(today.toordinal() + 1)
+    positions = np.searchsorted(columns.days, boundaries, "left")
+    return np.diff(columns.cumulative[positions])
+
+
+def daily_totals(columns, start, end):
+    """Cents spent on each day from ``start`` to ``end`` inclusive"""
+    low, high = columns.span(start, end)
+    totals = np.bincount(columns.days[low:high] - start.toordinal(), weights=columns.cents[low:high],
+                         minlength=(end - start).days + 1)
+    return np.rint(totals).astype(np.int64)
+
+
+def moving_average(values, window):
+    """Trailing means over ``window`` values; the first window - 1 are dropped"""
+    sums = np.cumsum(np.concatenate(([0], values)), dtype=np.float64)
+    return (sums[window:] - sums[:-window]) / window
+
+
+def month_over_month(totals):
+    """Change of each month against the previous one, in cents and percent"""
+    previous = totals[:-1].astype(np.float64)
+    change = totals[1:] - totals[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(previous > 0, change / previous * 100, np.nan)
+    return change, percent
+
+
+def trend_slope(totals):
+    """Least-squares change per month (cents) over complete months"""
+    if len(totals) < 2:
+        return 0.0
+    return float(np.polyfit(np.arange(len(totals)), totals.astype(np.float64), 1)[0])
+
+
+def month_end_projection(columns, today, budget=0):
+    """Spend so far this month and its extrapolation to the end of the month.
+
+    The remaining days are projected at the average daily spend of the last
+    RUN_RATE_DAYS days, so monthly bills paid early in the month are
+    counted once rather than extrapolated.
+    """
+    first = month_start(today)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    remaining_days = days_in_month - today.day
+
+    spent = columns.total(first, today)
+    run_rate = columns.total(today - timedelta(days=RUN_RATE_DAYS - 1), today) / RUN_RATE_DAYS
+    projected = spent + run_rate * remaining_days
+
+    result = {
+        "spent": _amount(spent),
+        "daily_run_rate": _amount(run_rate),
+        "days_remaining": remaining_days,
+        "projected": _amount(projected),
+        "budget": budget or None,
+    }
+    if budget:
+        budget_cents = budget * 100
+        result.update({
+            "budget_used_percent": round(spent / budget_cents * 100, 1),
+            "projected_percent": round(projected / budget_cents * 100, 1),
+            "projected_over_budget": _amount(max(projected - budget_cents, 0)),
+            "safe_daily_spend": _amount(max(budget_cents - spent, 0) / max(remaining_days, 1)),
+        })
+    return result
+
+
+def category_totals(columns, start, end):
+    """(category id, cents) spent from ``start`` to ``end``, largest first"""
+    low, high = columns.span(start, end)
+    totals = np.bincount(columns.categories[low:high], weights=columns.cents[low:high],
+                         minlength=len(columns.category_ids))
+    order = np.argsort(totals)[::-1]
+    return [(columns.category_ids[code], int(round(totals[code]))) for code in order if totals[code] > 0]
+
+
+# ---------- Summary ----------
+def compute(columns, today, budget=0, months=DEFAULT_MONTHS, category_names=None):
+    """Every analytic for one user's columns, as a JSON-serializable dict.
+
+    ``category_names`` maps category ids to names; this does no queries.
+    """
+    names = category_names or {}
+    totals = monthly_totals(columns, today, months)
+    change, percent = month_over_month(totals)
+    first_month = _month_number(today) - months + 1
+
+    daily_start = today - timedelta(days=DAILY_DAYS - 1)
+    widest = max(MOVING_AVERAGE_WINDOWS)
+    # Start early enough that every returned day has a full window
+    daily = daily_totals(columns, daily_start - timedelta(days=widest - 1), today)
+
+    return {
+        "months": [
+            {
+                "month": _month_date(first_month + i).isoformat(),
+                "total": _amount(totals[i]),
+                "change": _amount(change[i - 1]) if i else None,
+                "change_percent": round(float(percent[i - 1]), 1) if i and not np.isnan(percent[i - 1]) else None,
+            }
+            for i in range(months)
+        ],
+        # The current month is still in progress, so it is left out of the trend
+        "trend_per_month": _amount(trend_slope(totals[:-1])),
+        "daily": {
+            "start": daily_start.isoformat(),
+            "totals": [_amount(cents) for cents in daily[widest - 1:]],
+            **{
+                f"moving_average_{window}": [
+                    _amount(value) for value in moving_average(daily, window)[widest - window:]
+                ]
+                for window in MOVING_AVERAGE_WINDOWS
+            },
+        },
+        "this_month": month_end_projection(columns, today, budget),
+        "categories_this_month": [
+            {"category": names.get(category_id, "Uncategorized"), "total": _amount(cents)}
+            for category_id, cents in category_totals(columns, month_start(today), today)
+        ],
+    }
+
+
+def user_analytics(user, today=None, months=DEFAULT_MONTHS):
+    budget = UserProfile.objects.filter(user=user).values_list("budget", flat=True).first() or 0
+    names = {category.id: category.name for category in get_category_matcher().categories}
+    return compute(get_columns(user.pk), today or date.today(), budget, months, names)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TrackerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tracker'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects the receivers)
+        # Installs the query timer on every connection, including the first
+        from . import instrumentation  # noqa: F401
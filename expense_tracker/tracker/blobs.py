@@ -0,0 +1,129 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import Expense, MediaBlob, UserProfile
+from .storage import media_storage
+from .thumbnails import FORMATS, SIZES, variant_name
+from .versioning import bump_data_versions
+
+# (model, file field) pairs whose files are reference counted
+TRACKED_FIELDS = [(Expense, "receipt"), (UserProfile, "profile_picture")]
+
+# Unreferenced blobs younger than this may belong to an upload in progress
+GC_GRACE_PERIOD = timedelta(hours=1)
+
+
+# ---------- Reference Counting ----------
+def add_ref(name):
+    if MediaBlob.objects.filter(name=name).update(refs=F("refs") + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, refs=1)
+    except IntegrityError:
+        # Created concurrently
+        MediaBlob.objects.filter(name=name).update(refs=F("refs") + 1, updated_at=timezone.now())
+
+
+def touch(name):
+    """Hold off garbage collection of ``name`` for the grace period, before a
+    reference to it is taken; creates an unreferenced blob if there is none"""
+    if MediaBlob.objects.filter(name=name).update(updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, refs=0)
+    except IntegrityError:
+        MediaBlob.objects.filter(name=name).update(updated_at=timezone.now())
+
+
+def release(name):
+    MediaBlob.objects.filter(name=name).update(refs=F("refs") - 1, updated_at=timezone.now())
+
+
+def replace_ref(old, new):
+    """Move one reference from file ``old`` to ``new`` (either may be empty)"""
+    if old == new:
+        return
+    if new:
+        add_ref(new)
+    if old:
+        release(old)
+
+
+# ---------- Thumbnail Variants ----------
+def mark_variants(names):
+    """Record that the thumbnail variants of ``names`` have been written.
+
+    Pages showing the images change (the variants replace the originals), so
+    the data version of every user whose rows reference them is bumped.
+    """
+    pending = MediaBlob.objects.filter(name__in=list(names), variants=False)
+    changed = list(pending.values_list("name", flat=True))
+    if not changed:
+        return
+    MediaBlob.objects.filter(name__in=changed).update(variants=True)
+    owners = set()
+    for model, field in TRACKED_FIELDS:
+        owners.update(model.objects.filter(**{f"{field}__in": changed}).values_list("user_id", flat=True))
+    bump_data_versions(owners)
+
+
+def has_variants(name):
+    return MediaBlob.objects.filter(name=name, variants=True).exists()
+
+
+def variants_ready(field):
+    """Annotation: whether the variants of the file in ``field`` are written,
+    for rendering a list of images without a query or file check per row"""
+    return Exists(MediaBlob.objects.filter(name=OuterRef(field), variants=True))
+
+
+# ---------- Garbage Collection ----------
+def referenced_names():
+    """Count of rows referencing each stored file, straight from the tables"""
+    counts = {}
+    for model, field in TRACKED_FIELDS:
+        names = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+        for name in names.values_list(field, flat=True).iterator():
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def recount():
+    """Reset every reference count from the tables; returns how many were wrong"""
+    actual = referenced_names()
+    fixed = 0
+    with transaction.atomic():
+        for blob in MediaBlob.objects.select_for_update().iterator():
+            refs = actual.pop(blob.name, 0)
+            if blob.refs != refs:
+                MediaBlob.objects.filter(pk=blob.pk).update(refs=refs, updated_at=timezone.now())
+                fixed += 1
+        MediaBlob.objects.bulk_create(MediaBlob(name=name, refs=refs) for name, refs in actual.items())
+    return fixed + len(actual)
+
+
+def delete_files(name):
+    """Delete a stored file and its thumbnail variants"""
+    storage = media_storage()
+    for path in [name, *(variant_name(name, size, fmt) for size in SIZES for fmt in FORMATS)]:
+        storage.delete(path)
+
+
+def collect_garbage(grace=GC_GRACE_PERIOD, dry_run=False):
+    """Delete blobs nothing has referenced for ``grace``; returns their names"""
+    cutoff = timezone.now() - grace
+    collected = []
+    for blob in MediaBlob.objects.filter(refs__lte=0, updated_at__lt=cutoff).iterator():
+        if not dry_run:
+            with transaction.atomic():
+                # Skip it if it was referenced or re-uploaded since the query
+                if not MediaBlob.objects.filter(pk=blob.pk, refs__lte=0, updated_at__lt=cutoff).delete()[0]:
+                    continue
+                delete_files(blob.name)
+        collected.append(blob.name)
+    return collected
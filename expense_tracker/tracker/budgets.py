@@ -0,0 +1,169 @@
+"""Monthly budget tracking from running per-month spend counters.
+
+MonthlySpend holds each user's total per month. It is changed with F()
+increments from the ``expenses_changed`` receiver, inside the transaction
+of the expense write, so reading budget status is a single-row lookup.
+Crossing ALERT_THRESHOLDS percent of UserProfile.budget sends
+``budget_alert`` once per month, after the write commits.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth
+from django.dispatch import Signal, receiver
+
+from .models import Expense, MonthlySpend, UserProfile
+from .periods import month_start
+
+logger = logging.getLogger(__name__)
+
+ALERT_THRESHOLDS = (50, 80, 100)  # percent of the monthly budget
+
+# Sent after commit with user_id, month, threshold, spent and budget
+budget_alert = Signal()
+
+
+@dataclass
+class BudgetStatus:
+    budget: float
+    spent: float
+    alerted: int = 0
+
+    @property
+    def remaining(self):
+        return self.budget - self.spent
+
+    @property
+    def used(self):
+        """Fraction of the budget spent, or None without a budget"""
+        return self.spent / self.budget if self.budget > 0 else None
+
+    def as_dict(self):
+        has_budget = self.budget > 0
+        return {
+            "budget": self.budget if has_budget else None,
+            "spent": round(self.spent, 2),
+            "remaining": round(self.remaining, 2) if has_budget else None,
+            "used_percent": round(self.used * 100, 1) if has_budget else None,
+            "alerted": self.alerted,
+        }
+
+
+def crossed_threshold(spent, budget):
+    """The highest threshold ``spent`` has reached, or 0"""
+    if budget <= 0:
+        return 0
+    return max((t for t in ALERT_THRESHOLDS if spent >= budget * t / 100), default=0)
+
+
+# ---------- Incremental Updates ----------
+def _add(user_id, month, delta):
+    rows = MonthlySpend.objects.filter(user_id=user_id, month=month)
+    if rows.update(total=F("total") + delta):
+        return
+    try:
+        with transaction.atomic():
+            MonthlySpend.objects.create(user_id=user_id, month=month, total=delta)
+    except IntegrityError:
+        # Created concurrently
+        rows.update(total=F("total") + delta)
+
+
+def apply_changes(added, removed):
+    """Apply ExpenseRow changes to the monthly counters and check the budgets"""
+    deltas = defaultdict(float)
+    for rows, sign in ((added, 1), (removed, -1)):
+        for row in rows:
+            deltas[(row.user_id, month_start(row.date))] += sign * row.amount
+    increased = set()
+    for (user_id, month), delta in deltas.items():
+        if delta:
+            _add(user_id, month, delta)
+        if delta > 0:
+            increased.add((user_id, month))
+    if increased:
+        check_alerts(increased)
+
+
+def check_alerts(user_months):
+    """Record and announce thresholds newly reached in the given (user, month) pairs"""
+    budgets = dict(UserProfile.objects.filter(user_id__in={user_id for user_id, _ in user_months})
+                   .values_list("user_id", "budget"))
+    for user_id, month in user_months:
+        budget = budgets.get(user_id) or 0
+        if budget <= 0:
+            continue
+        counter = MonthlySpend.objects.filter(user_id=user_id, month=month)
+        spent, alerted = counter.values_list("total", "alerted").first() or (0, 0)
+        threshold = crossed_threshold(spent, budget)
+        # The conditional update lets only one writer claim each threshold
+        if threshold > alerted and counter.filter(alerted__lt=threshold).update(alerted=threshold):
+            transaction.on_commit(partial(
+                budget_alert.send, sender=MonthlySpend, user_id=user_id, month=month,
+                threshold=threshold, spent=spent, budget=budget,
+            ))
+
+
+def reset_alerts(user_id, budget, today=None):
+    """Mark this month's reached thresholds under a new budget as already alerted"""
+    counter = MonthlySpend.objects.filter(user_id=user_id, month=month_start(today or date.today()))
+    spent = counter.values_list("total", flat=True).first() or 0
+    counter.update(alerted=crossed_threshold(spent, budget))
+
+
+@receiver(budget_alert)
+def log_budget_alert(sender, user_id, month, threshold, spent, budget, **kwargs):
+    logger.info("User %s reached %d%% of their %s budget for %s (spent %.2f)",
+                user_id, threshold, budget, f"{month:%Y-%m}", spent)
+
+
+# ---------- Reading ----------
+def budget_status(user_id, today=None):
+    """This month's BudgetStatus: two primary-key/unique lookups, no aggregation"""
+    budget = UserProfile.objects.filter(user_id=user_id).values_list("budget", flat=True).first() or 0
+    counter = (MonthlySpend.objects.filter(user_id=user_id, month=month_start(today or date.today()))
+               .values_list("total", "alerted").first())
+    spent, alerted = counter or (0, 0)
+    return BudgetStatus(budget=budget, spent=spent, alerted=alerted)
+
+
+# ---------- Rebuild ----------
+def expected_totals(user_id):
+    months = (Expense.objects.filter(user_id=user_id).order_by().annotate(month=TruncMonth("date"))
+              .values_list("month").annotate(total=Sum("amount")))
+    return dict(months)
+
+
+def diff_user(user_id, tolerance=1e-6):
+    """Months whose counter differs from the recomputed total, as (month, stored, expected)"""
+    expected = expected_totals(user_id)
+    stored = dict(MonthlySpend.objects.filter(user_id=user_id).values_list("month", "total"))
+    return [(month, stored.get(month, 0), expected.get(month, 0))
+            for month in sorted(expected.keys() | stored.keys())
+            if abs(stored.get(month, 0) - expected.get(month, 0)) > tolerance]
+
+
+def rebuild_user(user_id):
+    """Recompute a user's monthly counters from their expenses, keeping alert state"""
+    expected = expected_totals(user_id)
+    with transaction.atomic():
+        existing = {counter.month: counter for counter in MonthlySpend.objects.filter(user_id=user_id)}
+        stale = [counter.pk for month, counter in existing.items() if month not in expected]
+        MonthlySpend.objects.filter(pk__in=stale).delete()
+        changed = []
+        for month, total in expected.items():
+            counter = existing.get(month)
+            if counter is not None and counter.total != total:
+                counter.total = total
+                changed.append(counter)
+        MonthlySpend.objects.bulk_update(changed, ["total"], batch_size=500)
+        MonthlySpend.objects.bulk_create(
+            MonthlySpend(user_id=user_id, month=month, total=total)
+            for month, total in expected.items() if month not in existing
+        )
+    return len(expected)
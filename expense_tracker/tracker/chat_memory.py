@@ -0,0 +1,216 @@
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .instrumentation import external_call
+
+# Hard cap on stored messages per user; summarization normally keeps the
+# buffer far below this, it only bounds the document if the summarizer is down.
+MAX_MESSAGES = 200
+
+DEFAULT_CHAT_MEMORY = {
+    "BACKEND": "tracker.chat_memory.MongoChatStore",
+    "OPTIONS": {"uri": "mongodb://localhost:27017/", "database": "ai_assistant"},
+}
+
+
+class ChatStore(ABC):
+    """Per-user chat memory: a bounded buffer of recent messages plus a summary.
+
+    ``pending`` counts the buffered messages not yet folded into the summary;
+    messages dropped by the cap are no longer pending.
+    """
+
+    @abstractmethod
+    def append(self, user_id, role, content):
+        """Store a message and return the new pending count"""
+
+    @abstractmethod
+    def history(self, user_id, limit=10):
+        """The last ``limit`` messages, oldest first, as role/content dicts"""
+
+    @abstractmethod
+    def summary(self, user_id):
+        """The user's summary, or an empty string"""
+
+    @abstractmethod
+    def unsummarized(self, user_id):
+        """Every buffered message (with its ``id``), oldest first"""
+
+    @abstractmethod
+    def claim_fold(self, user_id, seconds):
+        """Reserve folding the user's messages for ``seconds``.
+
+        False while another claim, from any process, has not been released
+        or expired, so only one summarization runs per user.
+        """
+
+    @abstractmethod
+    def release_fold(self, user_id):
+        """Release the user's fold claim"""
+
+    @abstractmethod
+    def fold(self, user_id, summary, message_ids):
+        """Replace the summary and drop the messages it now covers"""
+
+    @abstractmethod
+    def reset(self, user_id):
+        """Forget the user's messages and summary"""
+
+
+class MongoChatStore(ChatStore):
+    """One document per user in ``summaries``: summary, pending and messages.
+
+    Writes are update pipelines that cap ``messages`` and recount
+    ``pending`` from it in the same atomic update, and reading history is a
+    single indexed document read.
+    """
+
+    def __init__(self, uri, database, collection="summaries"):
+        from bson import ObjectId
+        from pymongo import MongoClient, ReturnDocument
+
+        self._object_id = ObjectId
+        self._after = ReturnDocument.AFTER
+        self.client = MongoClient(uri)
+        self.collection = self.client[database][collection]
+        # Unique, so concurrent first messages cannot upsert two documents
+        self.collection.create_index("user_id", unique=True)
+
+    @external_call("mongo")
+    def append(self, user_id, role, content):
+        message = {"id": self._object_id(), "role": role, "content": content}
+        messages = {"$concatArrays": [{"$ifNull": ["$messages", []]}, {"$literal": [message]}]}
+        doc = self.collection.find_one_and_update(
+            {"user_id": user_id},
+            [
+                {"$set": {"messages": {"$slice": [messages, -MAX_MESSAGES]}}},
+                {"$set": {"pending": {"$size": "$messages"}}},
+            ],
+            projection={"pending": 1, "_id": 0},
+            upsert=True,
+            return_document=self._after,
+        )
+        return doc["pending"]
+
+    @external_call("mongo")
+    def history(self, user_id, limit=10):
+        doc = self.collection.find_one(
+            {"user_id": user_id},
+            {"messages": {"$slice": -limit}, "_id": 0, "summary": 0},
+        )
+        messages = doc.get("messages", []) if doc else []
+        return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+    @external_call("mongo")
+    def summary(self, user_id):
+        doc = self.collection.find_one({"user_id": user_id}, {"summary": 1, "_id": 0})
+        return doc.get("summary", "") if doc else ""
+
+    @external_call("mongo")
+    def unsummarized(self, user_id):
+        doc = self.collection.find_one({"user_id": user_id}, {"messages": 1, "_id": 0})
+        return doc.get("messages", []) if doc else []
+
+    @external_call("mongo")
+    def claim_fold(self, user_id, seconds):
+        now = timezone.now()
+        result = self.collection.update_one(
+            {"user_id": user_id, "summarizing_until": {"$not": {"$gt": now}}},
+            {"$set": {"summarizing_until": now + timedelta(seconds=seconds)}},
+        )
+        return result.modified_count == 1
+
+    @external_call("mongo")
+    def release_fold(self, user_id):
+        self.collection.update_one({"user_id": user_id}, {"$unset": {"summarizing_until": ""}})
+
+    @external_call("mongo")
+    def fold(self, user_id, summary, message_ids):
+        kept = {"$filter": {
+            "input": {"$ifNull": ["$messages", []]},
+            "cond": {"$not": {"$in": ["$$this.id", {"$literal": list(message_ids)}]}},
+        }}
+        self.collection.update_one(
+            {"user_id": user_id},
+            [
+                {"$set": {"summary": {"$literal": summary}, "messages": kept}},
+                {"$set": {"pending": {"$size": "$messages"}}},
+            ],
+        )
+
+    @external_call("mongo")
+    def reset(self, user_id):
+        self.collection.delete_one({"user_id": user_id})
+
+
+class LocalChatStore(ChatStore):
+    """In-process store for tests and single-process deployments"""
+
+    def __init__(self):
+        self._users = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _user(self, user_id):
+        return self._users.setdefault(user_id, {"summary": "", "pending": 0, "messages": []})
+
+    def append(self, user_id, role, content):
+        with self._lock:
+            doc = self._user(user_id)
+            doc["messages"].append({"id": next(self._ids), "role": role, "content": content})
+            del doc["messages"][:-MAX_MESSAGES]
+            doc["pending"] = len(doc["messages"])
+            return doc["pending"]
+
+    def history(self, user_id, limit=10):
+        with self._lock:
+            messages = self._user(user_id)["messages"][-limit:]
+            return [{"role": m["role"], "content": m["content"]} for m in messages]
+
+    def summary(self, user_id):
+        with self._lock:
+            return self._user(user_id)["summary"]
+
+    def unsummarized(self, user_id):
+        with self._lock:
+            return list(self._user(user_id)["messages"])
+
+    def claim_fold(self, user_id, seconds):
+        now = time.monotonic()
+        with self._lock:
+            doc = self._user(user_id)
+            if doc.get("summarizing_until", 0) > now:
+                return False
+            doc["summarizing_until"] = now + seconds
+            return True
+
+    def release_fold(self, user_id):
+        with self._lock:
+            self._user(user_id).pop("summarizing_until", None)
+
+    def fold(self, user_id, summary, message_ids):
+        folded = set(message_ids)
+        with self._lock:
+            doc = self._user(user_id)
+            doc["summary"] = summary
+            doc["messages"] = [m for m in doc["messages"] if m["id"] not in folded]
+            doc["pending"] = len(doc["messages"])
+
+    def reset(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+@lru_cache(maxsize=None)
+def get_chat_store():
+    """The configured store, created (and connected) on first use"""
+    config = getattr(settings, "CHAT_MEMORY", DEFAULT_CHAT_MEMORY)
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import tempfile
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .filters import apply_filters, filter_params
+from .models import Expense, ExportJob
+from .periods import date_range_bounds
+from .versioning import get_data_version
+
+logger = logging.getLogger(__name__)
+
+EXPORT_JOB_RETENTION = timedelta(days=getattr(settings, "EXPORT_JOB_RETENTION_DAYS", 7))
+EXPORT_JOB_STALE_AFTER = timedelta(hours=1)
+PROGRESS_EVERY = 1000
+EXTENSIONS = {ExportJob.CSV: "csv", ExportJob.EXCEL: "xlsx", ExportJob.PDF: "pdf"}
+
+
+def fingerprint(export_format, params, bounds):
+    """Hash of an export's format, filters and the closed date ``bounds``
+    its ``date_range`` covers"""
+    payload = json.dumps([export_format, params, [day and day.isoformat() for day in bounds]], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def enqueue(user, export_format, params, today=None):
+    """Queue an export, or return an existing job for the same data.
+
+    A relative ``date_range`` (today, week, month) is resolved to dates on
+    ``today`` and stored on the job, so a worker exports the same period
+    whenever it runs. A job is reused when the user, format, filters and
+    the period they cover match and the user's data version has not
+    changed since it was queued, so repeated requests share one artifact.
+    Returns ``(job, reused)``.
+    """
+    params = filter_params(params)
+    start, end = date_range_bounds(params.get("date_range"), today or date.today())
+    key = fingerprint(export_format, params, (start, end))
+    version = get_data_version(user.id)
+    job = (
+        ExportJob.objects.filter(user=user, fingerprint=key, data_version=version)
+        .exclude(status=ExportJob.FAILED)
+        .order_by("-created_at")
+        .first()
+    )
+    if job and (job.status != ExportJob.DONE or job.file):
+        return job, True
+    job = ExportJob.objects.create(
+        user=user, format=export_format, params=params,
+        fingerprint=key, data_version=version, range_start=start, range_end=end,
+    )
+    return job, False
+
+
+def claim(job_id):
+    """Atomically move a pending job to running; False if another worker won"""
+    return bool(
+        ExportJob.objects.filter(pk=job_id, status=ExportJob.PENDING)
+        .update(status=ExportJob.RUNNING, started_at=timezone.now())
+    )
+
+
+def _with_progress(job, rows):
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(pk=job.pk).update(progress=written)
+
+
+def job_expenses(job):
+    """The expenses a job exports, over the dates stored when it was queued"""
+    params = {name: value for name, value in job.params.items() if name != "date_range"}
+    expenses = apply_filters(Expense.objects.filter(user_id=job.user_id), params)
+    if job.range_start is not None:
+        expenses = expenses.filter(date__gte=job.range_start)
+    if job.range_end is not None:
+        expenses = expenses.filter(date__lte=job.range_end)
+    return expenses
+
+
+def run(job):
+    """Produce the artifact for a claimed job and store it under MEDIA_ROOT"""
+    from . import exporters
+
+    try:
+        expenses = job_expenses(job)
+        job.total = expenses.count()
+        ExportJob.objects.filter(pk=job.pk).update(total=job.total)
+        rows = _with_progress(job, exporters.export_rows(expenses))
+
+        with tempfile.TemporaryFile() as spool:
+            if job.format == ExportJob.CSV:
+                for chunk in exporters.csv_chunks(rows):
+                    spool.write(chunk.encode())
+            elif job.format == ExportJob.EXCEL:
+                exporters.write_excel(rows, spool)
+            else:
+                exporters.write_pdf(rows, spool, summary=exporters.category_summary(expenses))
+            spool.seek(0)
+            # Random names: MEDIA_ROOT may be publicly served
+            job.file.save(f"{uuid.uuid4().hex}.{EXTENSIONS[job.format]}", File(spool), save=False)
+
+        job.status = ExportJob.DONE
+        job.progress = job.total
+    except Exception as e:
+        logger.exception("Export job %s failed", job.pk)
+        job.status = ExportJob.FAILED
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "progress", "file", "error", "finished_at"])
+    return job
+
+
+def requeue_stale():
+    """Return jobs stuck in running (e.g. after a worker crash) to the queue"""
+    cutoff = timezone.now() - EXPORT_JOB_STALE_AFTER
+    return ExportJob.objects.filter(status=ExportJob.RUNNING, started_at__lt=cutoff).update(
+        status=ExportJob.PENDING, progress=0
+    )
+
+
+def purge_expired():
+    """Delete finished jobs (and their files) older than the retention period"""
+    cutoff = timezone.now() - EXPORT_JOB_RETENTION
+    expired = ExportJob.objects.filter(
+        status__in=[ExportJob.DONE, ExportJob.FAILED], finished_at__lt=cutoff
+    )
+    count = 0
+    for job in expired.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
+
+
+def filename(job):
+    return f"expenses.{EXTENSIONS[job.format]}"
@@ -0,0 +1,170 @@
+import csv
+import io
+from itertools import chain, islice
+
+from django.db.models import Count, Sum
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Frame, PageBreak, Paragraph, Spacer, Table, TableStyle
+
+EXPORT_HEADERS = ["Title", "Amount", "Category", "Date", "Notes"]
+# The category name comes from the join, so no per-row category query
+EXPORT_FIELDS = ("title", "amount", "category__name", "date", "notes")
+
+
+def export_rows(expenses, chunk_size=2000):
+    """Stream (title, amount, category, date, notes) tuples for an ordered queryset.
+
+    Rows are fetched in chunks as plain tuples, so memory stays flat
+    regardless of how many expenses are exported.
+    """
+    rows = expenses.values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for title, amount, category, day, notes in rows:
+        yield title, amount, category or '', day, notes or ''
+
+
+# ---------- CSV ----------
+def csv_chunks(rows, chunk_bytes=64 * 1024):
+    """Yield CSV text in roughly ``chunk_bytes`` pieces, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# ---------- Excel ----------
+EXCEL_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXCEL_WIDTH_SAMPLE = 500
+EXCEL_MAX_WIDTH = 60
+
+
+def write_excel(rows, fileobj, sample_size=EXCEL_WIDTH_SAMPLE):
+    """Write rows to ``fileobj`` as .xlsx with a write-only workbook.
+
+    Column widths are sized from the first ``sample_size`` rows, since a
+    write-only sheet must be sized before any row is written and is never
+    held in memory as a whole.
+    """
+    rows = (
+        [title, amount, category, day.strftime("%Y-%m-%d"), notes]
+        for title, amount, category, day, notes in rows
+    )
+    sample = list(islice(rows, sample_size))
+
+    widths = [len(header) for header in EXPORT_HEADERS]
+    for row in sample:
+        for index, value in enumerate(row):
+            widths[index] = max(widths[index], len(str(value)))
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Expenses")
+    for index, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = min(width, EXCEL_MAX_WIDTH) + 2
+
+    worksheet.append(EXPORT_HEADERS)
+    for row in chain(sample, rows):
+        worksheet.append(row)
+    workbook.save(fileobj)
+
+
+# ---------- PDF ----------
+# Roughly one A4 page of rows per table: reportlab lays a table out in time
+# that grows faster than its row count, so many page-sized tables keep the
+# whole report linear.
+PDF_ROWS_PER_TABLE = 35
+PDF_COLUMN_WIDTHS = [130, 60, 80, 65, 150]
+PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.grey),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+    ('ALIGN',(0,0),(-1,-1),'CENTER'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0,0), (-1,0), 8),
+    ('BACKGROUND',(0,1),(-1,-1),colors.beige),
+    ('GRID',(0,0),(-1,-1),1,colors.black),
+])
+
+
+def category_summary(expenses):
+    """Per-category (name, total, count) for a queryset, computed in SQL"""
+    return list(
+        expenses.order_by()
+        .values_list("category__name")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by("-total")
+    )
+
+
+def _pdf_tables(rows, rows_per_table):
+    chunk = []
+    for title, amount, category, day, notes in rows:
+        chunk.append([title, f"{amount:.2f}", category, day.strftime("%Y-%m-%d"), notes])
+        if len(chunk) == rows_per_table:
+            yield Table([EXPORT_HEADERS] + chunk, colWidths=PDF_COLUMN_WIDTHS, style=PDF_TABLE_STYLE)
+            chunk = []
+    if chunk:
+        yield Table([EXPORT_HEADERS] + chunk, colWidths=PDF_COLUMN_WIDTHS, style=PDF_TABLE_STYLE)
+
+
+def _pdf_page_frame(pagesize):
+    # The margins and padding of SimpleDocTemplate
+    width, height = pagesize
+    return Frame(inch, inch, width - 2 * inch, height - 2 * inch)
+
+
+def write_pdf(rows, fileobj, summary=None, rows_per_table=PDF_ROWS_PER_TABLE):
+    """Write the expense report to ``fileobj`` as page-sized table chunks.
+
+    ``summary`` is an optional list of (category, total, count) rows shown on
+    a first summary page. Pages are laid out one at a time with
+    Frame.addFromList, taking the next table chunk from ``rows`` only when
+    the page has room for it, and written compressed, so memory grows only
+    with the compressed page content rather than with the flowables.
+    """
+    pdf = canvas.Canvas(fileobj, pagesize=A4, pageCompression=1)
+    styles = getSampleStyleSheet()
+    pending = [Paragraph("Expense Report", styles['Title']), Spacer(1, 12)]
+
+    if summary is not None:
+        data = [["Category", "Total", "Expenses"]]
+        data += [[name or 'Uncategorized', f"{total:.2f}", count] for name, total, count in summary]
+        data.append([
+            "All categories",
+            f"{sum(total for _, total, _ in summary):.2f}",
+            sum(count for _, _, count in summary),
+        ])
+        pending.append(Paragraph("Summary by Category", styles['Heading2']))
+        pending.append(Table(data, colWidths=[200, 100, 80], style=PDF_TABLE_STYLE))
+        pending.append(PageBreak())  # takes the rest of the frame
+
+    tables = _pdf_tables(rows, rows_per_table)
+
+    def more():
+        if not pending:
+            pending.extend(islice(tables, 1))
+        return bool(pending)
+
+    while more():
+        frame = _pdf_page_frame(A4)
+        while more():
+            # Draws what fits, splitting a table at the page end; the rest stays pending
+            frame.addFromList(pending, pdf)
+            if pending:
+                break
+        pdf.showPage()
+    pdf.save()
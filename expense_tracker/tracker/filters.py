@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from .matching import get_category_matcher
+from .periods import month_start, next_month
+
+# Query parameters understood by apply_filters (dashboard, exports, API)
+FILTER_PARAMS = ("category", "date_range", "search", "sort_by")
+
+# Every ordering ends with the primary key so rows with equal sort values
+# still have a stable, unique position for keyset pagination.
+SORT_ORDERINGS = {
+    "newest": ("-date", "-id"),
+    "oldest": ("date", "id"),
+    "high": ("-amount", "-id"),
+    "low": ("amount", "id"),
+}
+DEFAULT_SORT = "newest"
+
+
+def apply_filters(expenses, params):
+    """Filter and order an Expense queryset from a mapping such as request.GET"""
+    today = date.today()
+    category = params.get("category")
+    date_range = params.get("date_range")
+    search = params.get("search")
+    sort_by = params.get("sort_by")
+
+    if category:
+        # Resolve the name up front and match on category_id rather than
+        # joining on the name, so the (user, category, date) index applies
+        category_ids = get_category_matcher().ids_for(category)
+        expenses = expenses.filter(category_id__in=category_ids)
+
+    # Plain range comparisons on the date column, never date__month/__year
+    # lookups, so the (user, date) indexes can be used
+    if date_range == "today":
+        expenses = expenses.filter(date=today)
+    elif date_range == "week":
+        start_week = today - timedelta(days=7)
+        expenses = expenses.filter(date__gte=start_week)
+    elif date_range == "month":
+        expenses = expenses.filter(date__gte=month_start(today), date__lt=next_month(today))
+
+    if search and search.strip():
+        expenses = expenses.filter(title__icontains=search)
+
+    ordering = SORT_ORDERINGS.get(sort_by, SORT_ORDERINGS[DEFAULT_SORT])
+    return expenses.order_by(*ordering)
+
+
+def filter_params(params):
+    """The non-empty filter parameters from ``params`` as a plain dict"""
+    return {name: params[name] for name in FILTER_PARAMS if params.get(name)}
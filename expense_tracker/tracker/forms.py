@@ -50,15 +50,32 @@ class ExpenseForm(forms.ModelForm):
         }
 
 
+# ---------- Import Form ----------
+class ImportExpensesForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV or Excel (.xlsx) with Title, Amount, Category, Date and Notes columns",
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,.xlsx'}),
+    )
+    dry_run = forms.BooleanField(required=False, label="Only check the file, don't import")
+
+
 # ---------- Profile Form ----------
 class UserProfileForm(forms.ModelForm):
+    budget = forms.FloatField(
+        min_value=0, initial=0, label="Monthly budget",
+        help_text="0 turns budget tracking off",
+        widget=forms.NumberInput(attrs={
+            'class': 'w-full border rounded px-3 py-2 focus:outline-none focus:ring-2 focus:ring-indigo-400',
+            'placeholder': 'Monthly Budget', 'step': '0.01',
+        }),
+    )
+
     class Meta:
         model = UserProfile
        
-        fields = ['profile_picture', 'bio']
+        fields = ['profile_picture', 'bio', 'budget']
         
         widgets = {
-            'budget': forms.NumberInput(attrs={'placeholder': 'Monthly Budget'}),
             'bio': forms.Textarea(attrs={
                 'class': 'w-full border rounded px-3 py-2 focus:outline-none focus:ring-2 focus:ring-indigo-400',
                 'placeholder': 'Tell us about yourself...',
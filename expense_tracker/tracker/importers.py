@@ -0,0 +1,265 @@
+import csv
+import io
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django import forms
+from django.db import transaction
+
+from .forms import ExpenseForm
+from .matching import invalidate_category_matcher
+from .models import Category, Expense
+from .signals import expense_row, expenses_changed
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000  # per import; later errors are only counted
+
+# Header (case-insensitive) -> field; the export headers import as-is
+COLUMNS = {
+    "title": "title", "description": "title", "name": "title",
+    "amount": "amount", "cost": "amount", "price": "amount",
+    "category": "category",
+    "date": "date",
+    "notes": "notes", "note": "notes", "memo": "notes",
+}
+REQUIRED_COLUMNS = {"title", "amount", "date"}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be imported (bad type, encoding or missing columns).
+
+    ``result`` holds the ImportResult of the batches committed before the
+    error, when it was raised part-way through an import.
+    """
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class BatchReport:
+    number: int
+    imported: int = 0
+    errors: list = field(default_factory=list)  # (row number, message)
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    categories_created: int = 0
+    errors: list = field(default_factory=list)  # (row number, message), capped
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+# ---------- Reading ----------
+def _columns(header):
+    columns = {}
+    for index, name in enumerate(header):
+        column = COLUMNS.get(str(name or "").strip().lower())
+        if column and column not in columns:
+            columns[column] = index
+    missing = REQUIRED_COLUMNS - columns.keys()
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(sorted(missing))}")
+    return columns
+
+
+def _records(rows):
+    """(row number, {field: value}) for rows after the header row"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFormatError("The file is empty")
+    columns = _columns(header)
+    for number, row in enumerate(rows, start=2):
+        if not any(value not in (None, "") for value in row):
+            continue  # blank line
+        yield number, {name: row[index] if index < len(row) else None for name, index in columns.items()}
+
+
+def _checked_rows(rows, errors, problem):
+    """Yield ``rows``, turning ``errors`` raised while reading into ImportFormatError
+    naming the row reached"""
+    rows = iter(rows)
+    number = 0
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except errors as error:
+            raise ImportFormatError(f"Reading stopped at row {number + 1}: {problem} ({error}).") from error
+        number += 1
+        yield row
+
+
+def read_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        yield from _records(_checked_rows(
+            csv.reader(text), (UnicodeDecodeError, csv.Error),
+            "the file is not UTF-8 CSV text; save it as \"CSV UTF-8\" and try again",
+        ))
+    finally:
+        text.detach()
+
+
+def read_xlsx(fileobj):
+    from xml.etree.ElementTree import ParseError
+
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # Damaged archives fail on open or, since rows are streamed, part-way through
+    damaged = (zipfile.BadZipFile, zlib.error, KeyError, EOFError, ParseError, InvalidFileException)
+    try:
+        # read_only streams rows from the sheet XML instead of loading the workbook
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except damaged:
+        raise ImportFormatError("The file is not a valid .xlsx workbook")
+    try:
+        yield from _records(_checked_rows(
+            workbook.active.iter_rows(values_only=True), damaged, "the workbook is damaged",
+        ))
+    finally:
+        workbook.close()
+
+
+READERS = {"csv": read_csv, "xlsx": read_xlsx}
+
+
+def file_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension not in READERS:
+        raise ImportFormatError("Upload a .csv or .xlsx file")
+    return extension
+
+
+# ---------- Validation ----------
+_FIELDS = ExpenseForm.base_fields
+_CATEGORY = forms.CharField(max_length=Category._meta.get_field("name").max_length, required=False)
+
+
+def clean_record(values):
+    """Validate one row with the ExpenseForm field rules; raises ValidationError"""
+    cleaned = {}
+    for name, form_field in (("title", _FIELDS["title"]), ("amount", _FIELDS["amount"]),
+                             ("date", _FIELDS["date"]), ("notes", _FIELDS["notes"]),
+                             ("category", _CATEGORY)):
+        value = values.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        try:
+            cleaned[name] = form_field.clean(value)
+        except forms.ValidationError as error:
+            raise forms.ValidationError(f"{name}: {' '.join(error.messages)}")
+    return cleaned
+
+
+class CategoryResolver:
+    """Category name -> id, loaded once per import; missing names are created in bulk"""
+
+    def __init__(self):
+        self.ids = {}
+        for pk, name in Category.objects.order_by("-id").values_list("id", "name"):
+            self.ids[name.lower()] = pk  # the oldest category wins on duplicates
+        self.created = 0
+
+    def resolve(self, names):
+        missing = {}
+        for name in names:
+            if name and name.lower() not in self.ids:
+                missing.setdefault(name.lower(), name)
+        if missing:
+            created = Category.objects.bulk_create(Category(name=name) for name in missing.values())
+            for category in created:
+                self.ids[category.name.lower()] = category.pk
+            self.created += len(created)
+            # bulk_create skips the signals that refresh the matcher
+            transaction.on_commit(invalidate_category_matcher)
+
+    def id_for(self, name):
+        return self.ids[name.lower()] if name else None
+
+
+# ---------- Import ----------
+def _import_batch(user, records, categories, number, dry_run):
+    report = BatchReport(number)
+    valid = []
+    for row_number, values in records:
+        try:
+            valid.append(clean_record(values))
+        except forms.ValidationError as error:
+            report.errors.append((row_number, " ".join(error.messages)))
+    if dry_run or not valid:
+        report.imported = len(valid)
+        return report
+
+    with transaction.atomic():
+        categories.resolve(row["category"] for row in valid)
+        expenses = Expense.objects.bulk_create(
+            Expense(user=user, title=row["title"], amount=row["amount"], date=row["date"],
+                    notes=row["notes"], category_id=categories.id_for(row["category"]))
+            for row in valid
+        )
+        # bulk_create skips model signals
+        expenses_changed.send(sender=Expense, added=[expense_row(e) for e in expenses], removed=[])
+    report.imported = len(expenses)
+    return report
+
+
+def import_expenses(user, fileobj, fmt, batch_size=IMPORT_BATCH_SIZE, dry_run=False, on_batch=None):
+    """Import expenses for ``user`` from a CSV or XLSX file object.
+
+    Rows are read as a stream and written in batches of ``batch_size``,
+    each in its own transaction, so memory is bounded by the batch size.
+    Invalid rows are skipped and reported; ``on_batch`` is called with
+    each BatchReport as it completes.
+
+    A file that cannot be read raises ImportFormatError. If that happens
+    part-way through, the earlier batches stay imported: the error names
+    the batch and carries their ImportResult.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    records = READERS[fmt](fileobj)
+    categories = CategoryResolver()
+    try:
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            result.batches += 1
+            report = _import_batch(user, batch, categories, result.batches, dry_run)
+            result.rows += len(batch)
+            result.imported += report.imported
+            result.failed += len(report.errors)
+            room = MAX_REPORTED_ERRORS - len(result.errors)
+            result.errors.extend(report.errors[:max(room, 0)])
+            if on_batch:
+                on_batch(report)
+    except ImportFormatError as error:
+        if not result.batches:
+            raise
+        result.categories_created = categories.created
+        result.seconds = time.perf_counter() - started
+        done = "were valid" if dry_run else "were imported"
+        raise ImportFormatError(
+            f"{error} Batch {result.batches + 1} was not imported; "
+            f"{result.imported} rows from the {result.batches} earlier batch(es) {done}.",
+            result=result,
+        ) from error
+    result.categories_created = categories.created
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,238 @@
+"""Per-request timing: database queries, the view, and external calls.
+
+RequestTimingMiddleware collects a RequestStats for every request and
+reports it in a ``Server-Timing`` header. It logs slow requests with
+their slowest SQL, logs repeated identical queries (N+1 patterns), and
+keeps recent durations per URL name for ``percentiles``.
+
+Queries are timed by an execute wrapper installed on every database
+connection as it opens, which records into the current request's stats.
+The stats live in a ContextVar, so sync views run from the ASGI handler's
+thread pool and the consumption of streamed responses are counted too.
+
+Code calling another service wraps the call in ``external_call(name)``.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from math import ceil
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import FileResponse
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_stats", default=None)
+
+_IN_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def sql_shape(sql):
+    """The SQL with literals and IN lists collapsed, so repeats compare equal"""
+    return _LITERAL.sub("?", _IN_LIST.sub("(...)", sql))
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = []  # (ms, sql)
+        self.external_ms = defaultdict(float)
+        self.external_calls = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing each query"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.db_ms += elapsed
+            self.queries.append((elapsed, sql))
+
+    def repeated_queries(self, threshold):
+        """(count, shape) of SQL shapes run more than ``threshold`` times"""
+        shapes = Counter(sql_shape(sql) for _, sql in self.queries)
+        return [(count, shape) for shape, count in shapes.most_common() if count > threshold]
+
+    def server_timing(self):
+        entries = [
+            f'db;dur={self.db_ms:.1f};desc="{len(self.queries)} queries"',
+            *(f'{name};dur={ms:.1f};desc="{self.external_calls[name]} calls"'
+              for name, ms in self.external_ms.items()),
+            f"total;dur={self.total_ms:.1f}",
+        ]
+        return ", ".join(entries)
+
+
+def track_query(execute, sql, params, many, context):
+    """Execute wrapper timing queries for the current request, if any"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_tracking(connection):
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_query)
+
+
+@receiver(connection_created)
+def _track_new_connection(sender, connection, **kwargs):
+    install_query_tracking(connection)
+
+
+@contextmanager
+def external_call(name):
+    """Time a call to another service (``gemini``, ``mongo``) for the current request.
+
+    Also works as a decorator. Outside a request it does nothing.
+    """
+    stats = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.external_ms[name] += (time.perf_counter() - started) * 1000
+            stats.external_calls[name] += 1
+
+
+# ---------- Rolling Percentiles ----------
+_samples = defaultdict(lambda: deque(maxlen=getattr(settings, "REQUEST_TIMING_SAMPLES", 1000)))
+_samples_lock = threading.Lock()
+
+
+def record(url_name, total_ms):
+    with _samples_lock:
+        _samples[url_name].append(total_ms)
+
+
+def _percentile(ordered, p):
+    return ordered[max(ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def percentiles():
+    """p50/p95/p99 (ms) of this process's recent requests, per URL name"""
+    with _samples_lock:
+        snapshot = {name: sorted(samples) for name, samples in _samples.items() if samples}
+    return {
+        name: {
+            "count": len(ordered),
+            "p50": round(_percentile(ordered, 50), 1),
+            "p95": round(_percentile(ordered, 95), 1),
+            "p99": round(_percentile(ordered, 99), 1),
+        }
+        for name, ordered in sorted(snapshot.items())
+    }
+
+
+# ---------- Middleware ----------
+class RequestTimingMiddleware:
+    """Time each request and report it; see the module docstring.
+
+    Settings: SLOW_REQUEST_MS (default 500) and N_PLUS_ONE_THRESHOLD
+    (default 10 repeats of one SQL shape). For streamed responses the
+    Server-Timing header covers the work before the first chunk; logging
+    and percentiles wait until the stream is consumed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        self.repeat_threshold = getattr(settings, "N_PLUS_ONE_THRESHOLD", 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        stats.total_ms = (time.perf_counter() - stats.started) * 1000
+        response["Server-Timing"] = stats.server_timing()
+        if response.streaming and not isinstance(response, FileResponse):
+            # Queries made while the body is generated belong to this request
+            track = self._atrack if response.is_async else self._track
+            response.streaming_content = track(response.streaming_content, request, stats)
+        else:
+            self.report(request, stats)
+        return response
+
+    def _track(self, content, request, stats):
+        content = iter(content)
+        try:
+            while True:
+                token = _current.set(stats)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            stats.total_ms = (time.perf_counter() - stats.started) * 1000
+            self.report(request, stats)
+
+    async def _atrack(self, content, request, stats):
+        content = aiter(content)
+        try:
+            while True:
+                token = _current.set(stats)
+                try:
+                    chunk = await anext(content)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current.reset(token)
+                yield chunk
+        finally:
+            stats.total_ms = (time.perf_counter() - stats.started) * 1000
+            self.report(request, stats)
+
+    def report(self, request, stats):
+        """Record the request's duration and log slow requests and N+1 patterns"""
+        match = request.resolver_match
+        url_name = (match.view_name if match else None) or "<unresolved>"
+        record(url_name, stats.total_ms)
+
+        for count, shape in stats.repeated_queries(self.repeat_threshold):
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.path, count, shape)
+        if stats.total_ms > self.slow_ms:
+            slowest = sorted(stats.queries, key=lambda query: query[0], reverse=True)[:3]
+            logger.warning(
+                "Slow request %s %s: %.0f ms, %d queries in %.0f ms%s%s",
+                request.method, request.path, stats.total_ms, len(stats.queries), stats.db_ms,
+                "".join(f", {name} {ms:.0f} ms" for name, ms in stats.external_ms.items()),
+                "".join(f"\n  {ms:.1f} ms: {sql}" for ms, sql in slowest),
+            )
@@ -0,0 +1,291 @@
+"""Answers common spending questions from the database, without the LLM.
+
+``parse`` turns a chat message into an Intent (what to compute, over which
+period, for which category) and ``answer`` computes it from the rollup
+table with one or two aggregate queries, or for the budget from the
+monthly spend counter. Messages that match no intent
+return None and go to Gemini.
+"""
+import calendar
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db.models import Sum
+
+from . import budgets
+from .matching import get_category_matcher
+from .models import Expense, SpendingRollup
+from .periods import month_start, next_month
+from .rollups import range_filter
+
+Period = namedtuple("Period", ["label", "start", "end", "unit"])
+Intent = namedtuple("Intent", ["kind", "period", "category", "limit", "per_day"])
+
+BUDGET, COMPARE, LARGEST, TOP_CATEGORIES, AVERAGE, TOTAL = (
+    "budget", "compare", "largest", "top_categories", "average", "total",
+)
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+MAX_LIMIT = 20
+
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+_IN_MONTH = re.compile(rf"\b(?:in|during|for|of)\s+({_MONTH_NAMES})\b(?:\s+(\d{{4}}))?")
+_IN_YEAR = re.compile(r"\b(?:in|during|for)\s+(\d{4})\b")
+_LAST_DAYS = re.compile(r"\b(?:last|past)\s+(\d+)\s+days?\b")
+# A result count only next to the ranking word: "top 3", "5 biggest", "largest three"
+_COUNT = rf"(\d+|{'|'.join(NUMBER_WORDS)})"
+_RANKING = r"(?:top|largest|biggest|highest|main|most\s+expensive|costliest)"
+_LIMIT = re.compile(rf"\b{_RANKING}\s+{_COUNT}\b|\b{_COUNT}\s+{_RANKING}\b")
+
+# Questions about the data only; advice is left to Gemini
+_ADVICE = re.compile(
+    r"\b(?:should|could|would|help|advice|advise|tips?|better|recommend|suggest|ideas?)\b"
+    r"|\bhow\s+(?:can|do)\s+i\b"
+)
+# The budget's status, not budgeting in general
+_BUDGET = re.compile(
+    r"\bbudget\b.*\b(?:left|remaining|used|status)\b"
+    r"|\b(?:over|under|within|on|of)\s+(?:my\s+|the\s+)?budget\b"
+    r"|\bwhat(?:'s|\s+is)\s+my\s+budget\b|\bleft to spend\b"
+)
+_COMPARE = re.compile(r"\b(?:compare[ds]?|comparison|vs|versus)\b|\bthan\s+(?:the\s+)?(?:last|previous)\b")
+# Where the second period of a comparison starts ("this month vs last month")
+_COMPARED_WITH = re.compile(r"\b(?:than|vs|versus|with|to|and)\b")
+_LARGEST = re.compile(
+    r"\b(?:largest|biggest|highest|most expensive|costliest)\s+"
+    r"(?:\w+\s+)?(expenses?|purchases?|transactions?|payments?|bills?)\b"
+)
+_TOP_CATEGORIES = re.compile(
+    r"\b(?:top|biggest|largest|highest|main)\b.*\bcategor(?:y|ies)\b"
+    r"|\b(?:spen[dt]|spending)\s+(?:the\s+)?most\b|\bmost\s+(?:money\s+)?on\b"
+)
+_AVERAGE = re.compile(r"\b(?:average|avg|mean)\b|\bper\s+day\b|\ba\s+day\b|\bdaily\b")
+_PER_DAY = re.compile(r"\bper\s+day\b|\ba\s+day\b|\bdaily\b")
+_TOTAL = re.compile(r"\b(?:how much|total|spent|spend|spending)\b")
+_HOW_MUCH = re.compile(r"\b(?:how much|total)\b")
+
+
+# ---------- Periods ----------
+def _month(year, month, label):
+    start = date(year, month, 1)
+    return Period(label, start, next_month(start) - timedelta(days=1), "month")
+
+
+def parse_period(text, today):
+    """The period a message talks about, or None for all time"""
+    if "today" in text:
+        return Period("today", today, today, "day")
+    if "yesterday" in text:
+        day = today - timedelta(days=1)
+        return Period("yesterday", day, day, "day")
+    found = _LAST_DAYS.search(text)
+    if found:
+        days = max(int(found.group(1)), 1)
+        return Period(f"in the last {days} days", today - timedelta(days=days - 1), today, "days")
+    if "last week" in text:
+        monday = today - timedelta(days=today.weekday() + 7)
+        return Period("last week", monday, monday + timedelta(days=6), "week")
+    if "this week" in text:
+        return Period("this week", today - timedelta(days=today.weekday()), today, "week")
+    if "last month" in text:
+        previous = month_start(today) - timedelta(days=1)
+        return _month(previous.year, previous.month, "last month")
+    if "this month" in text:
+        return Period("this month", month_start(today), today, "month")
+    if "last year" in text:
+        year = today.year - 1
+        return Period("last year", date(year, 1, 1), date(year, 12, 31), "year")
+    if "this year" in text:
+        return Period("this year", date(today.year, 1, 1), today, "year")
+    found = _IN_MONTH.search(text)
+    if found:
+        month = MONTHS[found.group(1)]
+        if found.group(2):
+            year = int(found.group(2))
+        else:
+            # The most recent such month
+            year = today.year if month <= today.month else today.year - 1
+        return _month(year, month, f"in {calendar.month_name[month]} {year}")
+    found = _IN_YEAR.search(text)
+    if found:
+        year = int(found.group(1))
+        return Period(f"in {year}", date(year, 1, 1), date(year, 12, 31), "year")
+    return None
+
+
+def previous_period(period):
+    """The period of the same kind just before ``period``"""
+    if period.unit == "month":
+        day = month_start(period.start) - timedelta(days=1)
+        return _month(day.year, day.month, f"in {calendar.month_name[day.month]} {day.year}")
+    if period.unit == "year":
+        year = period.start.year - 1
+        return Period(f"in {year}", date(year, 1, 1), date(year, 12, 31), "year")
+    length = (period.end - period.start).days + 1
+    if period.unit == "week":
+        length = 7
+    start = period.start - timedelta(days=length)
+    label = {"day": "the day before", "week": "the week before"}.get(period.unit, f"the {length} days before")
+    return Period(label, start, start + timedelta(days=length - 1), period.unit)
+
+
+# ---------- Parsing ----------
+def _limit(text, default):
+    found = _LIMIT.search(text)
+    if not found:
+        return default
+    value = found.group(1) or found.group(2)
+    number = NUMBER_WORDS.get(value) or int(value)
+    return min(max(number, 1), MAX_LIMIT)
+
+
+def parse(message, today=None):
+    """The Intent of a chat message, or None if it needs the LLM"""
+    today = today or date.today()
+    text = " ".join(message.lower().split())
+    if _ADVICE.search(text):
+        return None
+    # Years and day counts are not result sizes
+    counts_text = _LAST_DAYS.sub(" ", re.sub(r"\b\d{4}\b", " ", text))
+    period = parse_period(text, today)
+    category = get_category_matcher().match(message)
+    category_name = category.name if category else None
+    this_month = Period("this month", month_start(today), today, "month")
+
+    if _BUDGET.search(text):
+        return Intent(BUDGET, this_month, None, None, False)
+    if _COMPARE.search(text):
+        first = parse_period(_COMPARED_WITH.split(text, 1)[0], today)
+        return Intent(COMPARE, first or period or this_month, category_name, None, False)
+    found = _LARGEST.search(text)
+    if found:
+        plural = found.group(1).endswith("s")
+        return Intent(LARGEST, period, category_name, _limit(counts_text, 5 if plural else 1), False)
+    if _TOP_CATEGORIES.search(text) and not category_name:
+        plural = "categories" in text
+        return Intent(TOP_CATEGORIES, period, None, _limit(counts_text, 3 if plural else 1), False)
+    if _AVERAGE.search(text):
+        per_day = bool(_PER_DAY.search(text))
+        return Intent(AVERAGE, period or (this_month if per_day else None), category_name, None, per_day)
+    if _TOTAL.search(text) and (period or category_name or _HOW_MUCH.search(text)):
+        return Intent(TOTAL, period, category_name, None, False)
+    return None
+
+
+# ---------- Answering ----------
+def _money(value):
+    return f"₹{value:,.2f}"
+
+
+def _in(period):
+    return f" {period.label}" if period else ""
+
+
+def _rollups(user, period, category_name=None):
+    rollups = SpendingRollup.objects.filter(user=user)
+    if category_name:
+        rollups = rollups.filter(category_id__in=get_category_matcher().ids_for(category_name))
+    start, end = (period.start, period.end) if period else (None, None)
+    return rollups.filter(range_filter(start, end))
+
+
+def _totals(user, period, category_name=None):
+    sums = _rollups(user, period, category_name).aggregate(total=Sum("total"), count=Sum("count"))
+    return sums["total"] or 0, sums["count"] or 0
+
+
+def _answer_budget(user, intent):
+    # Read from the running monthly counter, not aggregated
+    status = budgets.budget_status(user.pk, intent.period.end)
+    budget, spent, remaining, used = status.budget, status.spent, status.remaining, status.used
+    if budget <= 0:
+        return f"📋 You haven't set a monthly budget yet. You have spent {_money(spent)} this month."
+    if remaining >= 0:
+        return (f"📋 You have {_money(remaining)} left of your {_money(budget)} budget this month "
+                f"({used:.0%} used).")
+    return f"⚠️ You are {_money(-remaining)} over your {_money(budget)} budget this month ({used:.0%} used)."
+
+
+def _answer_compare(user, intent):
+    before = previous_period(intent.period)
+    current, _ = _totals(user, intent.period, intent.category)
+    previous, _ = _totals(user, before, intent.category)
+    subject = f" on {intent.category}" if intent.category else ""
+    reply = (f"📊 You spent {_money(current)}{subject} {intent.period.label}, "
+             f"compared with {_money(previous)} {before.label}")
+    if previous:
+        change = (current - previous) / previous
+        direction = "more" if change >= 0 else "less"
+        return f"{reply} ({abs(change):.0%} {direction})."
+    return f"{reply}."
+
+
+def _answer_largest(user, intent):
+    expenses = Expense.objects.filter(user=user)
+    if intent.category:
+        expenses = expenses.filter(category_id__in=get_category_matcher().ids_for(intent.category))
+    if intent.period:
+        expenses = expenses.filter(date__gte=intent.period.start, date__lte=intent.period.end)
+    rows = list(expenses.order_by("-amount", "-id").values_list("title", "amount", "date")[:intent.limit])
+    if not rows:
+        return f"🧾 You have no expenses{_in(intent.period)}."
+    if len(rows) == 1:
+        title, amount, day = rows[0]
+        return f"🧾 Your largest expense{_in(intent.period)} was {title}: {_money(amount)} on {day:%d %b %Y}."
+    lines = "\n".join(f"{i}. {title}: {_money(amount)} on {day:%d %b %Y}"
+                      for i, (title, amount, day) in enumerate(rows, 1))
+    return f"🧾 Your {len(rows)} largest expenses{_in(intent.period)}:\n{lines}"
+
+
+def _answer_top_categories(user, intent):
+    rows = list(
+        _rollups(user, intent.period).values("category__name")
+        .annotate(spent=Sum("total")).order_by("-spent")[:intent.limit]
+    )
+    if not rows:
+        return f"🏷️ You have no expenses{_in(intent.period)}."
+    if len(rows) == 1:
+        row = rows[0]
+        name = row["category__name"] or "Uncategorized"
+        return f"🏷️ You spent the most{_in(intent.period)} on {name}: {_money(row['spent'])}."
+    lines = "\n".join(f"{i}. {row['category__name'] or 'Uncategorized'}: {_money(row['spent'])}"
+                      for i, row in enumerate(rows, 1))
+    return f"🏷️ Your top {len(rows)} categories{_in(intent.period)}:\n{lines}"
+
+
+def _answer_average(user, intent):
+    total, count = _totals(user, intent.period, intent.category)
+    subject = f" on {intent.category}" if intent.category else ""
+    if intent.per_day:
+        days = (intent.period.end - intent.period.start).days + 1
+        return f"📈 You spent an average of {_money(total / days)} per day{subject}{_in(intent.period)}."
+    if not count:
+        return f"📈 You have no expenses{subject}{_in(intent.period)}."
+    return (f"📈 Your average expense{subject}{_in(intent.period)} was {_money(total / count)} "
+            f"across {count} expenses.")
+
+
+def _answer_total(user, intent):
+    total, _ = _totals(user, intent.period, intent.category)
+    if intent.category and intent.period is None:
+        return f"💰 You have spent a total of {_money(total)} on {intent.category}."
+    subject = f" on {intent.category}" if intent.category else ""
+    return f"💰 You spent {_money(total)}{subject}{_in(intent.period)}."
+
+
+ANSWERS = {
+    BUDGET: _answer_budget,
+    COMPARE: _answer_compare,
+    LARGEST: _answer_largest,
+    TOP_CATEGORIES: _answer_top_categories,
+    AVERAGE: _answer_average,
+    TOTAL: _answer_total,
+}
+
+
+def answer(user, intent):
+    return ANSWERS[intent.kind](user, intent)
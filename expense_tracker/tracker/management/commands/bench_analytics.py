@@ -0,0 +1,64 @@
+import statistics
+import time
+from datetime import date
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import analytics
+
+
+def synthetic_columns(count, categories=12, years=4, seed=0):
+    rng = np.random.default_rng(seed)
+    today = date.today().toordinal()
+    return analytics.ExpenseColumns.build(
+        days=rng.integers(today - 365 * years, today + 1, count).astype(np.int32),
+        cents=np.rint(rng.lognormal(7, 1.2, count)).astype(np.int64),
+        categories=rng.integers(0, categories, count).astype(np.int16),
+        category_ids=range(1, categories + 1),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Time the NumPy analytics at several row counts, or for a user\'s stored expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000],
+                            help='Synthetic row counts to benchmark (no database needed)')
+        parser.add_argument('--user', help='Benchmark this user\'s expenses instead, including the load')
+        parser.add_argument('--months', type=int, default=analytics.DEFAULT_MONTHS)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--max-ms', type=float, help='Fail if the median compute time exceeds this')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user "{options["user"]}"')
+            analytics.clear_columns()
+            started = time.perf_counter()
+            columns = analytics.get_columns(user.pk)
+            self.stdout.write(f'loaded {len(columns)} rows in {time.perf_counter() - started:.2f}s')
+            cases = [(user.username, columns)]
+        else:
+            cases = [(str(count), synthetic_columns(count)) for count in options['rows']]
+
+        self.stdout.write(f'{"rows":>10} {"MB":>8} {"p50 ms":>9} {"max ms":>9}')
+        slow = []
+        for name, columns in cases:
+            today = date.today()
+            names = {category_id: f'Category {category_id}' for category_id in columns.category_ids}
+            analytics.compute(columns, today, budget=50_000, months=options['months'], category_names=names)  # warm up
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                analytics.compute(columns, today, budget=50_000, months=options['months'], category_names=names)
+                timings.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(timings)
+            self.stdout.write(f'{len(columns):>10} {columns.nbytes / 1e6:>8.1f} {median:>9.1f} {max(timings):>9.1f}')
+            if options['max_ms'] is not None and median > options['max_ms']:
+                slow.append(f'{name}: {median:.1f} ms')
+        if slow:
+            raise CommandError(f'Slower than {options["max_ms"]} ms: ' + ', '.join(slow))
@@ -0,0 +1,47 @@
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from tracker import exporters
+
+CATEGORIES = ['Food', 'Rent', 'Travel', 'Shopping', 'Bills', '']
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    for index in range(count):
+        yield (
+            f'Expense {index}',
+            round(rng.uniform(1, 500), 2),
+            rng.choice(CATEGORIES),
+            start + timedelta(days=rng.randrange(2000)),
+            'note' if index % 5 == 0 else '',
+        )
+
+
+class Command(BaseCommand):
+    help = ('Time PDF report generation at several row counts (no database needed); '
+            'peak RSS is the process high-water mark, so list row counts in ascending order')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000],
+                            help='Row counts to benchmark')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"rows":>10} {"seconds":>10} {"us/row":>10} {"MB":>8} {"peak RSS MB":>12}')
+        for count in options['rows']:
+            summary = [(name or None, 0.0, 0) for name in CATEGORIES]
+            with tempfile.TemporaryFile() as spool:
+                started = time.perf_counter()
+                exporters.write_pdf(synthetic_rows(count), spool, summary=summary)
+                elapsed = time.perf_counter() - started
+                size = spool.tell()
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+            self.stdout.write(
+                f'{count:>10} {elapsed:>10.2f} {elapsed / count * 1e6:>10.1f} {size / 1e6:>8.1f} {peak:>12.0f}'
+            )
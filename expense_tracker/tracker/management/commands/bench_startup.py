@@ -0,0 +1,83 @@
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SETUP = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings'); "
+)
+WSGI_BOOT = SETUP + (
+    "from expense_tracker.wsgi import application; "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+IMPORT_VIEWS = SETUP + "import django; django.setup(); import tracker.views"
+HEAVY_MODULES = ("openpyxl", "reportlab", "google.generativeai", "pymongo", "numpy", "PIL")
+
+
+def _run(args):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *args], cwd=settings.BASE_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        raise CommandError(f'{" ".join(args)} failed:\n{result.stderr}')
+    return elapsed, result.stderr
+
+
+def _importtime(stderr):
+    """(cumulative microseconds, module) for each line of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Measure process startup: manage.py check, WSGI boot and tracker.views imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+        parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+        parser.add_argument('--max-check-seconds', type=float,
+                            help='Fail if the median manage.py check time exceeds this')
+        parser.add_argument('--max-wsgi-seconds', type=float,
+                            help='Fail if the median WSGI boot time exceeds this')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        timings = {
+            'manage.py check': [_run(['manage.py', 'check'])[0] for _ in range(repeat)],
+            'WSGI app + URLconf': [_run(['-c', WSGI_BOOT])[0] for _ in range(repeat)],
+        }
+        for name, runs in timings.items():
+            self.stdout.write(
+                f'{name:<20} median {statistics.median(runs):.3f}s  min {min(runs):.3f}s  ({repeat} runs)'
+            )
+
+        _, stderr = _run(['-X', 'importtime', '-c', IMPORT_VIEWS])
+        imports = _importtime(stderr)
+        loaded = {name for _, name in imports}
+        heavy = [module for module in HEAVY_MODULES if module in loaded]
+        self.stdout.write('\nSlowest imports (cumulative) for django.setup() + tracker.views:')
+        for cumulative, name in sorted(imports, reverse=True)[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:>8.1f} ms  {name}')
+        self.stdout.write(f'Heavy modules loaded at startup: {", ".join(heavy) or "none"}')
+
+        limits = {
+            'manage.py check': options['max_check_seconds'],
+            'WSGI app + URLconf': options['max_wsgi_seconds'],
+        }
+        failures = [
+            f'{name} took {statistics.median(timings[name]):.3f}s (limit {limit}s)'
+            for name, limit in limits.items()
+            if limit is not None and statistics.median(timings[name]) > limit
+        ]
+        if failures:
+            raise CommandError('; '.join(failures))
@@ -0,0 +1,214 @@
+import itertools
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from tracker import intents
+from tracker.chat_memory import get_chat_store
+from tracker.filters import SORT_ORDERINGS
+from tracker.models import Category, Expense
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+MIN_SLOWDOWN_MS = 2.0  # smaller differences are timer noise, whatever the ratio
+
+# Questions the local intent engine answers; Gemini is never called
+LOCAL_QUESTIONS = [
+    'How much did I spend this month?',
+    'What are my top 3 categories last month?',
+    'What was my biggest expense this year?',
+    'Compare this month with last month',
+    'How much budget do I have left?',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter:
+    """Execute wrapper counting queries (queries_log is reset per request)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _consume(response):
+    """Read the whole body, so streamed responses are fully generated"""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = ('Time the tracker views (latency, queries, peak memory) against generated data '
+            'and compare with a stored baseline. Latencies are absolute milliseconds, so a '
+            'baseline only holds for the machine and data it was saved with')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to benchmark as (default: the user with most expenses)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+        parser.add_argument('--only', help='Run only cases whose name contains this text')
+        parser.add_argument('--export-range', default='month',
+                            help='date_range filter for the export cases ("" exports everything)')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative slowdown or memory growth over the baseline')
+        parser.add_argument('--require-baseline-entries', action='store_true',
+                            help='Also fail on cases the baseline has no entry for, so CI catches a stale baseline')
+
+    def handle(self, *args, **options):
+        # Chat replies are saved in the background; keep them out of MongoDB
+        with override_settings(CHAT_MEMORY={'BACKEND': 'tracker.chat_memory.LocalChatStore'}):
+            get_chat_store.cache_clear()
+            try:
+                self.run(options)
+            finally:
+                get_chat_store.cache_clear()
+
+    def run(self, options):
+        user = self.bench_user(options['user'])
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        cases = [case for case in self.cases(user, options['export_range'])
+                 if not options['only'] or options['only'] in case[0]]
+
+        self.stdout.write(f'Benchmarking as {user.username}\n')
+        self.stdout.write(f'{"case":<58} {"p50 ms":>9} {"max ms":>9} {"queries":>8} {"peak KB":>9}')
+        results = {}
+        for name, method, url, data in cases:
+            results[name] = self.measure(client, method, url, data, options['repeat'])
+            r = results[name]
+            self.stdout.write(f'{name:<58} {r["ms"]:>9.1f} {r["max_ms"]:>9.1f} {r["queries"]:>8} {r["peak_kb"]:>9}')
+
+        if options['save_baseline']:
+            options['baseline'].parent.mkdir(parents=True, exist_ok=True)
+            options['baseline'].write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'\nBaseline saved to {options["baseline"]}'))
+            return
+        if not options['baseline'].exists():
+            raise CommandError(f'No baseline at {options["baseline"]}; run with --save-baseline to store one')
+        regressions = self.compare(results, json.loads(options['baseline'].read_text()), options['tolerance'],
+                                   strict=options['require_baseline_entries'])
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('\nNo regressions against the baseline'))
+
+    def bench_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user "{username}"')
+        user = User.objects.annotate(expenses=Count('expense')).order_by('-expenses').first()
+        if user is None:
+            raise CommandError('No users; create data with generate_data first')
+        return user
+
+    def cases(self, user, export_range):
+        category = (Category.objects.filter(expense__user=user)
+                    .annotate(n=Count('expense')).order_by('-n').values_list('name', flat=True).first())
+        home = reverse('home')
+        for sort_by, date_range, category_name in itertools.product(
+            ['', *SORT_ORDERINGS], ['', 'today', 'week', 'month'], ['', category or ''],
+        ):
+            params = {'sort_by': sort_by, 'date_range': date_range, 'category': category_name}
+            params = {key: value for key, value in params.items() if value}
+            label = ' '.join(f'{key}={value}' for key, value in params.items()) or 'no filters'
+            yield f'home [{label}]', 'get', home, params
+        yield 'home [search=groceries]', 'get', home, {'search': 'groceries'}
+
+        export_params = {'date_range': export_range} if export_range else {}
+        for kind in ('csv', 'excel', 'pdf'):
+            yield f'export {kind} [{export_range or "all"}]', 'get', reverse(f'export_{kind}'), export_params
+
+        yield 'add_expense_voice', 'post', reverse('add_expense_voice'), {'speech': f'spent 250 on {category or "food"}'}
+        for question in LOCAL_QUESTIONS:
+            if intents.parse(question) is None:
+                raise CommandError(f'"{question}" would be sent to Gemini')
+            yield f'ai_chat [{question}]', 'post', reverse('ai_chat'), {'message': question}
+
+        yield 'api expenses [limit=100]', 'get', reverse('api_expenses'), {'limit': 100}
+        yield 'api expenses [limit=100 fields=id,amount,date]', 'get', reverse('api_expenses'), {
+            'limit': 100, 'fields': 'id,amount,date',
+        }
+        # Per-operation cost of a batch against a batch of one
+        create = {'op': 'create', 'data': {'title': 'Bench', 'amount': 12.5, 'date': date.today().isoformat()}}
+        for size in (1, 100):
+            yield f'api batch [{size} creates]', 'post', reverse('api_expenses_batch'), {'operations': [create] * size}
+        ids = Expense.objects.filter(user=user).order_by('-date').values_list('id', flat=True)[:100]
+        yield 'api batch [100 updates]', 'post', reverse('api_expenses_batch'), {
+            'operations': [{'op': 'update', 'id': pk, 'data': {'amount': 99.5}} for pk in ids],
+        }
+
+    def request(self, client, method, url, data):
+        if method == 'post':
+            # Writes are rolled back so every run sees the same data
+            try:
+                with transaction.atomic():
+                    response = client.post(url, json.dumps(data), content_type='application/json')
+                    size = _consume(response)
+                    raise Rollback
+            except Rollback:
+                pass
+        else:
+            response = client.get(url, data)
+            size = _consume(response)
+        if response.status_code != 200:
+            raise CommandError(f'{method.upper()} {url} returned {response.status_code}')
+        return size
+
+    def measure(self, client, method, url, data, repeat):
+        self.request(client, method, url, data)  # warm caches and imports
+        timings = []
+        for _ in range(repeat):
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                self.request(client, method, url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+        # Memory is traced separately since tracing slows everything down
+        tracemalloc.start()
+        try:
+            self.request(client, method, url, data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'ms': round(statistics.median(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': queries.count,
+            'peak_kb': peak // 1024,
+        }
+
+    def compare(self, results, baseline, tolerance, strict=False):
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                if strict:
+                    regressions.append(f'{name}: not in the baseline')
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(f'{name}: {result["queries"]} queries (baseline {base["queries"]})')
+            if result['ms'] > base['ms'] * (1 + tolerance) and result['ms'] - base['ms'] > MIN_SLOWDOWN_MS:
+                regressions.append(f'{name}: {result["ms"]:.1f} ms (baseline {base["ms"]:.1f} ms)')
+            if result['peak_kb'] > base['peak_kb'] * (1 + tolerance):
+                regressions.append(f'{name}: peak {result["peak_kb"]} KB (baseline {base["peak_kb"]} KB)')
+        return regressions
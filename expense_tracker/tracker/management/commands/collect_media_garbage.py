@@ -0,0 +1,49 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tracker import blobs
+from tracker.models import MediaBlob
+from tracker.storage import content_digest, media_storage
+from tracker.thumbnails import is_variant
+
+
+class Command(BaseCommand):
+    help = 'Delete uploaded files (and their thumbnails) that no expense or profile references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=blobs.GC_GRACE_PERIOD.total_seconds() / 3600,
+                            help='Keep unreferenced files this recently released')
+        parser.add_argument('--dry-run', action='store_true', help='List what would be deleted')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recount references from the tables first (fixes drifted counts)')
+        parser.add_argument('--scan-files', action='store_true',
+                            help='Also report content-addressed files with no MediaBlob row')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = blobs.recount()
+            self.stdout.write(f'{fixed} reference counts corrected')
+
+        collected = blobs.collect_garbage(timedelta(hours=options['grace_hours']), dry_run=options['dry_run'])
+        for name in collected:
+            self.stdout.write(f'  {name}')
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(collected)} unreferenced files'))
+
+        if options['scan_files']:
+            untracked = sorted(self.stored_names() - set(MediaBlob.objects.values_list('name', flat=True)))
+            for name in untracked:
+                self.stdout.write(f'  untracked: {name}')
+            self.stdout.write(f'{len(untracked)} stored files are not tracked (not deleted)')
+
+    def stored_names(self):
+        storage = media_storage()
+        names = set()
+        for root, _, files in os.walk(storage.location):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), storage.location).replace(os.sep, '/')
+                if content_digest(name) and not is_variant(name):
+                    names.add(name)
+        return names
@@ -1,21 +1,31 @@
-from django.core.management.base import BaseCommand
-from tracker.models import Expense
 from datetime import date
 
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import recurrence
+
+
 class Command(BaseCommand):
-    help = 'Create recurring expenses for the new month'
+    help = 'Generate the expenses due from recurrence rules, catching up missed periods'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Generate as of this date (YYYY-MM-DD), default today')
+        parser.add_argument('--batch-size', type=int, default=recurrence.GENERATION_BATCH_SIZE,
+                            help='Rules processed per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be generated without writing anything')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError('--date must be YYYY-MM-DD')
 
-    def handle(self, *args, **kwargs):
-        today = date.today()
-        recurring_expenses = Expense.objects.filter(recurring=True)
-        for exp in recurring_expenses:
-            Expense.objects.create(
-                user=exp.user,
-                title=exp.title,
-                amount=exp.amount,
-                category=exp.category,
-                date=today,
-                notes=exp.notes,
-                recurring=True
-            )
-        self.stdout.write(self.style.SUCCESS('Recurring expenses created'))
+        result = recurrence.generate_due(
+            today, batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} recurring expense(s) from {result.rules} due rule(s) '
+            f'in {result.seconds:.2f}s ({result.skipped} already existed)'
+        ))
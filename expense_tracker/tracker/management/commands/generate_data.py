@@ -0,0 +1,156 @@
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tracker import budgets, rollups
+from tracker.models import Category, Expense, RecurrenceRule, UserProfile
+from tracker.versioning import bump_data_versions
+
+# name: (share of one-off expenses, median amount, titles)
+CATEGORY_PROFILES = {
+    'Food': (0.34, 250, ['Groceries', 'Lunch', 'Dinner out', 'Coffee', 'Snacks', 'Takeaway']),
+    'Travel': (0.14, 400, ['Cab', 'Metro card', 'Fuel', 'Train ticket', 'Flight', 'Parking']),
+    'Shopping': (0.12, 1200, ['Clothes', 'Shoes', 'Electronics', 'Books', 'Gifts']),
+    'Bills': (0.08, 1500, ['Electricity', 'Water', 'Phone recharge', 'Gas cylinder']),
+    'Health': (0.06, 800, ['Pharmacy', 'Doctor visit', 'Lab test']),
+    'Entertainment': (0.08, 500, ['Movie', 'Concert', 'Games', 'Streaming rental']),
+    'Education': (0.04, 2000, ['Course', 'Stationery', 'Exam fee']),
+    'Rent': (0.01, 15000, ['Rent']),
+    'Other': (0.13, 300, ['Misc', 'Donation', 'Household', 'Repairs']),
+}
+
+# title, category, median amount, frequency
+RECURRING_ITEMS = [
+    ('Rent', 'Rent', 15000, RecurrenceRule.MONTHLY),
+    ('Internet', 'Bills', 800, RecurrenceRule.MONTHLY),
+    ('Streaming subscription', 'Entertainment', 500, RecurrenceRule.MONTHLY),
+    ('Gym membership', 'Health', 1500, RecurrenceRule.MONTHLY),
+    ('Weekly groceries', 'Food', 1800, RecurrenceRule.WEEKLY),
+]
+
+NOTES = ['', '', '', '', 'paid by card', 'split with friends', 'cash', 'reimbursable']
+
+
+class Command(BaseCommand):
+    help = 'Create seeded, realistic users and expenses for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--expenses', type=int, default=100_000,
+                            help='One-off expenses in total, spread unevenly across users')
+        parser.add_argument('--years', type=int, default=3, help='How far back expenses go')
+        parser.add_argument('--recurring', type=int, default=3,
+                            help='Recurring items per user (at most %d)' % len(RECURRING_ITEMS))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench', help='Username prefix of generated users')
+        parser.add_argument('--password', default='bench', help='Password of generated users')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete previously generated users with this prefix first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=prefix)
+        if existing.exists():
+            if not options['replace']:
+                raise CommandError(f'Users starting with "{prefix}" exist; pass --replace to recreate them')
+            existing.delete()
+
+        started = time.perf_counter()
+        categories = self.categories()
+        today = date.today()
+        first_day = today - timedelta(days=365 * options['years'])
+        users = self.users(options['users'], prefix, options['password'], rng)
+
+        # Heavier users have more expenses (a long tail, like real usage)
+        weights = [rng.paretovariate(1.5) for _ in users]
+        scale = options['expenses'] / sum(weights)
+        created = 0
+        for user, weight in zip(users, weights):
+            count = round(weight * scale)
+            with transaction.atomic():
+                created += self.expenses(user, count, categories, first_day, today, rng, options['batch_size'])
+                created += self.recurring(user, options['recurring'], categories, first_day, today, rng,
+                                          options['batch_size'])
+                # bulk_create skips the signals; recompute derived data in one pass
+                rollups.rebuild_user(user.pk)
+                budgets.rebuild_user(user.pk)
+            self.stdout.write(f'  {user.username}: {count} one-off expenses')
+        bump_data_versions(user.pk for user in users)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users and {created} expenses in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def categories(self):
+        categories = {}
+        for name in CATEGORY_PROFILES:
+            category = Category.objects.filter(name=name).order_by('id').first()
+            categories[name] = category or Category.objects.create(name=name)
+        return categories
+
+    def users(self, count, prefix, password, rng):
+        password = make_password(password)  # hash once, not per user
+        users = User.objects.bulk_create(
+            User(username=f'{prefix}{i}', password=password) for i in range(count)
+        )
+        if not users or users[0].pk is None:
+            users = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+        UserProfile.objects.bulk_create(
+            UserProfile(user=user, budget=rng.choice([0, 20_000, 30_000, 50_000, 80_000]))
+            for user in users
+        )
+        return users
+
+    def expenses(self, user, count, categories, first_day, today, rng, batch_size):
+        names = list(CATEGORY_PROFILES)
+        shares = [CATEGORY_PROFILES[name][0] for name in names]
+        span = (today - first_day).days
+        batch = []
+        for _ in range(count):
+            name = rng.choices(names, shares)[0]
+            _, median, titles = CATEGORY_PROFILES[name]
+            day = first_day + timedelta(days=rng.randint(0, span))
+            if day.weekday() < 5 and rng.random() < 0.2:
+                day += timedelta(days=5 - day.weekday())  # weekends are busier
+            batch.append(Expense(
+                user=user, title=rng.choice(titles),
+                amount=round(median * math.exp(rng.gauss(0, 0.6)), 2),
+                category=categories[name] if rng.random() > 0.03 else None,
+                date=min(day, today), notes=rng.choice(NOTES),
+            ))
+            if len(batch) >= batch_size:
+                Expense.objects.bulk_create(batch)
+                batch = []
+        Expense.objects.bulk_create(batch)
+        return count
+
+    def recurring(self, user, count, categories, first_day, today, rng, batch_size):
+        created = 0
+        for title, name, median, frequency in rng.sample(RECURRING_ITEMS, min(count, len(RECURRING_ITEMS))):
+            start = first_day + timedelta(days=rng.randint(0, 90))
+            rule = RecurrenceRule(
+                user=user, title=title, amount=round(median * rng.uniform(0.9, 1.1), 2),
+                category=categories[name], frequency=frequency, start_date=start, next_run_date=start,
+            )
+            instances = []
+            day = start
+            while day <= today:
+                instances.append(day)
+                day = rule.following(day)
+            rule.next_run_date = day
+            rule.save()
+            Expense.objects.bulk_create(
+                (Expense(user=user, title=rule.title, amount=rule.amount, category=rule.category,
+                         date=day, recurring=True, recurrence_rule=rule) for day in instances),
+                batch_size=batch_size,
+            )
+            created += len(instances)
+        return created
@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+
+from tracker import blobs, thumbnails
+from tracker.models import Expense, UserProfile
+from tracker.storage import media_storage
+
+
+class Command(BaseCommand):
+    help = ('Create missing thumbnail variants for existing receipts and profile pictures '
+            'and record them on their blobs')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        names = chain(
+            Expense.objects.exclude(receipt='').exclude(receipt=None)
+            .values_list('receipt', flat=True).iterator(),
+            UserProfile.objects.exclude(profile_picture='').exclude(profile_picture=None)
+            .values_list('profile_picture', flat=True).iterator(),
+        )
+        started = time.perf_counter()
+        images = written = skipped = failed = 0
+        max_pending = options['workers'] * 4  # bounds memory for any number of images
+        with ProcessPoolExecutor(options['workers'], mp_context=get_context('spawn')) as pool:
+            pending = {}
+            for name in names:
+                images += 1
+                if not media_storage().exists(name):
+                    self.stderr.write(f'missing original: {name}')
+                    failed += 1
+                    continue
+                if not options['force'] and thumbnails.has_variants(name):
+                    blobs.mark_variants([name])  # written before the flag existed
+                    skipped += 1
+                    continue
+                pending[pool.submit(thumbnails.make_variants, media_storage().path(name), options['force'])] = name
+                if len(pending) >= max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    written, failed = self.collect(done, pending, written, failed)
+            written, failed = self.collect(wait(pending)[0], pending, written, failed)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{images} images: {written} variant files written, {skipped} already done, '
+            f'{failed} failed in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def collect(self, done, pending, written, failed):
+        for future in done:
+            name = pending.pop(future)
+            try:
+                written += future.result()
+            except Exception as error:
+                self.stderr.write(f'{name}: {error}')
+                failed += 1
+            else:
+                blobs.mark_variants([name])
+        return written, failed
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import importers
+
+
+class Command(BaseCommand):
+    help = 'Import expenses for a user from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Username to import for')
+        parser.add_argument('--format', choices=sorted(importers.READERS),
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=importers.IMPORT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'No user "{options["user"]}"')
+        try:
+            fmt = options['format'] or importers.file_format(options['path'])
+            with open(options['path'], 'rb') as fileobj:
+                result = importers.import_expenses(
+                    user, fileobj, fmt, batch_size=options['batch_size'],
+                    dry_run=options['dry_run'], on_batch=self.report_batch,
+                )
+        except (OSError, importers.ImportFormatError) as error:
+            raise CommandError(str(error))
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.imported} of {result.rows} rows in {result.seconds:.1f}s '
+            f'({result.rows_per_second:,.0f} rows/s); {result.failed} failed, '
+            f'{result.categories_created} categories created'
+        ))
+
+    def report_batch(self, report):
+        self.stdout.write(f'batch {report.number}: {report.imported} imported, {len(report.errors)} failed')
+        for row_number, message in report.errors[:10]:
+            self.stdout.write(f'  row {row_number}: {message}')
+        if len(report.errors) > 10:
+            self.stdout.write(f'  ... and {len(report.errors) - 10} more')
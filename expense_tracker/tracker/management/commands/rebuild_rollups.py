@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import budgets, rollups
+from tracker.models import Expense, MonthlySpend, SpendingRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the spending rollups and monthly spend counters from the raw expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report buckets that differ, do not write anything')
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Limit to this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = options['users']
+        if not user_ids:
+            user_ids = sorted(
+                set(Expense.objects.values_list('user_id', flat=True).distinct())
+                | set(SpendingRollup.objects.values_list('user_id', flat=True).distinct())
+                | set(MonthlySpend.objects.values_list('user_id', flat=True).distinct())
+            )
+
+        if options['verify']:
+            bad_users = 0
+            for user_id in user_ids:
+                mismatches = rollups.diff_rollups(user_id)
+                months = budgets.diff_user(user_id)
+                if mismatches or months:
+                    bad_users += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'User {user_id}: {len(mismatches)} bucket(s) and {len(months)} monthly total(s) out of date'
+                    ))
+                    for (category_id, period, bucket), have, want in mismatches[:10]:
+                        self.stdout.write(
+                            f'  category={category_id} {period} {bucket}: stored {have}, expected {want}'
+                        )
+                    for month, have, want in months[:10]:
+                        self.stdout.write(f'  month {month}: stored {have}, expected {want}')
+            if bad_users:
+                raise CommandError(f'{bad_users} of {len(user_ids)} user(s) have stale rollups')
+            self.stdout.write(self.style.SUCCESS(f'Rollups verified for {len(user_ids)} user(s)'))
+            return
+
+        buckets = months = 0
+        for user_id in user_ids:
+            buckets += rollups.rebuild_user(user_id)
+            months += budgets.rebuild_user(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {buckets} rollup bucket(s) and {months} monthly total(s) for {len(user_ids)} user(s)'
+        ))
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from tracker import export_jobs
+from tracker.models import ExportJob
+
+
+def _run_in_thread(job_id):
+    try:
+        job = ExportJob.objects.get(pk=job_id)
+        return export_jobs.run(job)
+    finally:
+        # Each pool thread has its own connection; don't leak it
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Process queued export jobs with a local thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Concurrent exports')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between queue checks')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        requeued = export_jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale job(s)')
+
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                close_old_connections()
+                for future in [future for future in in_flight if future.done()]:
+                    in_flight.discard(future)
+                    if future.exception():
+                        self.stderr.write(f'Export job crashed: {future.exception()}')
+                    else:
+                        job = future.result()
+                        self.stdout.write(f'Export job {job.pk} {job.status}')
+                free = workers - len(in_flight)
+                pending = []
+                if free > 0:
+                    pending = list(
+                        ExportJob.objects.filter(status=ExportJob.PENDING)
+                        .order_by('created_at').values_list('pk', flat=True)[:free]
+                    )
+                for job_id in pending:
+                    if export_jobs.claim(job_id):
+                        in_flight.add(pool.submit(_run_in_thread, job_id))
+                        self.stdout.write(f'Started export job {job_id}')
+
+                if options['once'] and not pending and not in_flight:
+                    break
+                if not pending:
+                    purged = export_jobs.purge_expired()
+                    if purged:
+                        self.stdout.write(f'Purged {purged} expired job(s)')
+                    time.sleep(options['poll'] if not options['once'] else 0.1)
+
+        self.stdout.write(self.style.SUCCESS('Export worker stopped'))
@@ -0,0 +1,67 @@
+import re
+import threading
+from collections import namedtuple
+
+from .models import Category
+from .versioning import bump_category_version, get_category_version
+
+CategoryMatch = namedtuple("CategoryMatch", ["id", "name"])
+
+
+class CategoryMatcher:
+    """Finds category names in free text with one compiled regex.
+
+    Names match as whole words, case-insensitively, and the longest name
+    wins where several match at the same position ("fast food" over "food").
+    """
+
+    def __init__(self, categories):
+        self.categories = [CategoryMatch(pk, name) for pk, name in categories]
+        self._by_lower = {}
+        self._ids_by_name = {}
+        for category in self.categories:
+            self._by_lower.setdefault(category.name.lower(), category)
+            self._ids_by_name.setdefault(category.name, []).append(category.id)
+
+        names = sorted((name for name in self._by_lower if name), key=len, reverse=True)
+        self._pattern = None
+        if names:
+            alternatives = "|".join(re.escape(name) for name in names)
+            self._pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+    def match(self, text):
+        """The first category named in ``text``, or None"""
+        if self._pattern is None:
+            return None
+        found = self._pattern.search(text)
+        return self._by_lower[found.group().lower()] if found else None
+
+    def ids_for(self, name):
+        """Ids of the categories called exactly ``name``"""
+        return self._ids_by_name.get(name, [])
+
+
+_lock = threading.Lock()
+_cached = (None, None)  # (version, matcher)
+
+
+def get_category_matcher():
+    """The process-wide matcher, rebuilt only after a Category change"""
+    global _cached
+    version = get_category_version()
+    cached_version, matcher = _cached
+    if matcher is not None and cached_version == version:
+        return matcher
+    with _lock:
+        cached_version, matcher = _cached
+        if matcher is None or cached_version != version:
+            matcher = CategoryMatcher(Category.objects.order_by("id").values_list("id", "name"))
+            _cached = (version, matcher)
+    return matcher
+
+
+def invalidate_category_matcher():
+    """Drop this process's matcher and move the shared version so the others rebuild too"""
+    global _cached
+    _cached = (None, None)
+    bump_category_version()
@@ -0,0 +1,54 @@
+"""Hit/miss counters for the caches, kept in a Django cache.
+
+They live in the METRICS_CACHE alias, by default the "dashboard" cache, so
+they are shared by every worker process whenever that cache is (set
+DASHBOARD_CACHE to "file" or "db"). With the default LocMemCache each
+process counts only its own requests. File and database caches increment
+with a read and a write, so concurrent increments can occasionally be lost;
+the counts are meant for ratios, not accounting.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+COUNTERS = {
+    "ai.cache.hit": "Gemini answers served from the response cache",
+    "ai.cache.miss": "Gemini calls made because no cached answer existed",
+    "ai.answer.local": "Chat questions answered by the local intent engine",
+    "ai.answer.remote": "Chat questions handed to Gemini (cached or not)",
+    "dashboard.cache.hit": "Dashboard totals and chart data served from the cache",
+    "dashboard.cache.miss": "Dashboard totals and chart data computed",
+}
+
+KEY_PREFIX = "tracker:metrics:"
+
+
+def _cache():
+    return caches[getattr(settings, "METRICS_CACHE", "dashboard")]
+
+
+def incr(name, delta=1):
+    key = KEY_PREFIX + name
+    cache = _cache()
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # First use (or evicted); add() keeps a concurrent first use from being lost
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def read(*names):
+    """Current value of each named counter (0 if never incremented)"""
+    names = names or tuple(COUNTERS)
+    values = _cache().get_many([KEY_PREFIX + name for name in names])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in names}
+
+
+def ratio(part, other):
+    """part / (part + other), or None before either has been counted"""
+    total = part + other
+    return part / total if total else None
+
+
+def reset(*names):
+    _cache().delete_many([KEY_PREFIX + name for name in names or COUNTERS])
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_rollups(apps, schema_editor):
+    Expense = apps.get_model('tracker', 'Expense')
+    SpendingRollup = apps.get_model('tracker', 'SpendingRollup')
+    expenses = Expense.objects.order_by()
+    days = expenses.values('user_id', 'category_id', 'date').annotate(total=Sum('amount'), count=Count('id'))
+    months = (expenses.annotate(month=TruncMonth('date')).values('user_id', 'category_id', 'month')
+              .annotate(total=Sum('amount'), count=Count('id')))
+    SpendingRollup.objects.bulk_create(
+        [SpendingRollup(user_id=r['user_id'], category_id=r['category_id'], period='day',
+                        bucket=r['date'], total=r['total'], count=r['count']) for r in days]
+        + [SpendingRollup(user_id=r['user_id'], category_id=r['category_id'], period='month',
+                          bucket=r['month'], total=r['total'], count=r['count']) for r in months],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_expense_bio_userprofile_bio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('bucket', models.DateField()),
+                ('total', models.FloatField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='tracker.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'period', 'bucket'], name='rollup_user_period_bucket')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'category', 'period', 'bucket'), name='unique_spending_rollup')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:54
+
+from calendar import monthrange
+from datetime import date
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _next_month(day, anchor_day):
+    year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+    return date(year, month, min(anchor_day, monthrange(year, month)[1]))
+
+
+def recurring_expenses_to_rules(apps, schema_editor):
+    """Turn each distinct recurring expense into a monthly rule.
+
+    The old command copied every recurring row (copies included) each run, so
+    identical rows are one series; one row per date is linked to the rule.
+    """
+    Expense = apps.get_model('tracker', 'Expense')
+    RecurrenceRule = apps.get_model('tracker', 'RecurrenceRule')
+    series = {}
+    for expense in Expense.objects.filter(recurring=True).order_by('date', 'id').iterator():
+        key = (expense.user_id, expense.title, expense.amount, expense.category_id, expense.notes)
+        series.setdefault(key, []).append(expense)
+
+    for (user_id, title, amount, category_id, notes), expenses in series.items():
+        start = expenses[0].date
+        rule = RecurrenceRule.objects.create(
+            user_id=user_id, title=title, amount=amount, category_id=category_id, notes=notes,
+            frequency='monthly', start_date=start,
+            next_run_date=_next_month(expenses[-1].date, start.day),
+        )
+        seen = set()
+        for expense in expenses:
+            if expense.date not in seen:
+                seen.add(expense.date)
+                Expense.objects.filter(pk=expense.pk).update(recurrence_rule=rule)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_dataversion_exportjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurrenceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('amount', models.FloatField()),
+                ('notes', models.TextField(blank=True)),
+                ('frequency', models.CharField(choices=[('monthly', 'Monthly'), ('weekly', 'Weekly'), ('custom', 'Every N days')], default='monthly', max_length=7)),
+                ('interval_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('start_date', models.DateField()),
+                ('next_run_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tracker.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='recurrence_rule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='instances', to='tracker.recurrencerule'),
+        ),
+        migrations.RunPython(recurring_expenses_to_rules, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('recurrence_rule', 'date'), name='unique_recurrence_instance'),
+        ),
+        migrations.AddIndex(
+            model_name='recurrencerule',
+            index=models.Index(fields=['active', 'next_run_date', 'id'], name='recurrence_due'),
+        ),
+    ]
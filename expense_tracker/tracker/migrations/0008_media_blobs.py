@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:32
+
+import tracker.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """One MediaBlob per file already referenced by a receipt or profile picture"""
+    MediaBlob = apps.get_model('tracker', 'MediaBlob')
+    counts = {}
+    for model, field in (('Expense', 'receipt'), ('UserProfile', 'profile_picture')):
+        names = apps.get_model('tracker', model).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        for name in names.values_list(field, flat=True).iterator():
+            counts[name] = counts.get(name, 0) + 1
+    MediaBlob.objects.bulk_create(MediaBlob(name=name, refs=refs) for name, refs in counts.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_expense_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='receipt',
+            field=models.ImageField(blank=True, null=True, storage=tracker.storage.media_storage, upload_to='receipts/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=tracker.storage.media_storage, upload_to='profiles/'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refs', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refs', 'updated_at'], name='mediablob_refs_updated')],
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
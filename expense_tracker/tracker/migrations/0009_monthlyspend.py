@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_monthly_spend(apps, schema_editor):
+    Expense = apps.get_model('tracker', 'Expense')
+    MonthlySpend = apps.get_model('tracker', 'MonthlySpend')
+    months = (Expense.objects.order_by().annotate(month=TruncMonth('date'))
+              .values('user_id', 'month').annotate(total=Sum('amount')))
+    MonthlySpend.objects.bulk_create(
+        (MonthlySpend(user_id=r['user_id'], month=r['month'], total=r['total']) for r in months),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_media_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.FloatField(default=0)),
+                ('alerted', models.PositiveSmallIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='unique_monthly_spend')],
+            },
+        ),
+        migrations.RunPython(populate_monthly_spend, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:21
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def rebuild_uncategorized_duplicates(apps, schema_editor):
+    """Recompute uncategorized buckets that concurrent first writes created twice.
+
+    Each copy holds part of the deltas, so neither is right; the bucket is
+    summed again from the expenses.
+    """
+    Expense = apps.get_model('tracker', 'Expense')
+    SpendingRollup = apps.get_model('tracker', 'SpendingRollup')
+    duplicates = (SpendingRollup.objects.filter(category__isnull=True).order_by()
+                  .values_list('user_id', 'period', 'bucket')
+                  .annotate(rows=Count('id')).filter(rows__gt=1))
+    for user_id, period, bucket, _ in list(duplicates):
+        SpendingRollup.objects.filter(category__isnull=True, user_id=user_id, period=period, bucket=bucket).delete()
+        if period == 'day':
+            dates = {'date': bucket}
+        else:
+            end = date(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+            dates = {'date__gte': bucket, 'date__lt': end}
+        sums = Expense.objects.filter(user_id=user_id, category__isnull=True, **dates).aggregate(
+            total=Sum('amount'), count=Count('id'))
+        if sums['count']:
+            SpendingRollup.objects.create(user_id=user_id, category=None, period=period, bucket=bucket,
+                                          total=sums['total'], count=sums['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0011_mediablob_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_uncategorized_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='spendingrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'period', 'bucket'), name='unique_uncategorized_rollup'),
+        ),
+    ]
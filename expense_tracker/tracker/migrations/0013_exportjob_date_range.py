@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:38
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from tracker.periods import date_range_bounds
+
+
+def resolve_queued_ranges(apps, schema_editor):
+    """Store the dates unfinished jobs were queued for, as enqueue now does"""
+    ExportJob = apps.get_model('tracker', 'ExportJob')
+    for job in ExportJob.objects.filter(status__in=['pending', 'running']).iterator():
+        if job.params.get('date_range'):
+            job.range_start, job.range_end = date_range_bounds(
+                job.params['date_range'], timezone.localtime(job.created_at).date())
+            job.save(update_fields=['range_start', 'range_end'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_uncategorized_rollup_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='range_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='range_start',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(resolve_queued_ranges, migrations.RunPython.noop),
+    ]
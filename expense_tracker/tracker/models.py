@@ -1,7 +1,12 @@
-from django.db import models
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .storage import media_storage
+
 # Categories
 class Category(models.Model):
     name = models.CharField(max_length=50)
@@ -13,12 +18,50 @@ class Category(models.Model):
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     budget = models.FloatField(default=0)
-    profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profiles/', storage=media_storage, blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
 
     def __str__(self):
         return self.user.username
 
+# Schedule that generates recurring expenses (see tracker.recurrence)
+class RecurrenceRule(models.Model):
+    MONTHLY = "monthly"
+    WEEKLY = "weekly"
+    CUSTOM = "custom"
+    FREQUENCY_CHOICES = [(MONTHLY, "Monthly"), (WEEKLY, "Weekly"), (CUSTOM, "Every N days")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=100)
+    amount = models.FloatField()
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    notes = models.TextField(blank=True)
+    frequency = models.CharField(max_length=7, choices=FREQUENCY_CHOICES, default=MONTHLY)
+    interval_days = models.PositiveIntegerField(blank=True, null=True)  # for CUSTOM only
+    start_date = models.DateField()
+    next_run_date = models.DateField()
+    end_date = models.DateField(blank=True, null=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["active", "next_run_date", "id"], name="recurrence_due"),
+        ]
+
+    def following(self, day):
+        """The occurrence after ``day``"""
+        if self.frequency == self.WEEKLY:
+            return day + timedelta(weeks=1)
+        if self.frequency == self.CUSTOM:
+            return day + timedelta(days=self.interval_days or 1)
+        # Monthly keeps the start day, clamped to short months (31st -> 28th -> 31st)
+        year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+        return date(year, month, min(self.start_date.day, monthrange(year, month)[1]))
+
+    def __str__(self):
+        return f"{self.title} ({self.frequency})"
+
 # Expenses
 class Expense(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -28,8 +71,150 @@ class Expense(models.Model):
     date = models.DateField(default=timezone.now)
     notes = models.TextField(blank=True)
     recurring = models.BooleanField(default=False)
-    receipt = models.ImageField(upload_to='receipts/', blank=True, null=True)
+    receipt = models.ImageField(upload_to='receipts/', storage=media_storage, blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
+    recurrence_rule = models.ForeignKey(
+        RecurrenceRule, on_delete=models.SET_NULL, null=True, blank=True, related_name="instances"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"], name="expense_user_date"),
+            models.Index(fields=["user", "category", "date"], name="expense_user_category_date"),
+            models.Index(fields=["user", "amount"], name="expense_user_amount"),
+        ]
+        constraints = [
+            # One generated expense per rule and date, so generation is idempotent
+            models.UniqueConstraint(fields=["recurrence_rule", "date"], name="unique_recurrence_instance"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Keep the write and the rollup updates in tracker.signals atomic
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} - {self.amount}"
+
+# Pre-aggregated spending, maintained incrementally by tracker.signals
+class SpendingRollup(models.Model):
+    DAY = "day"
+    MONTH = "month"
+    PERIOD_CHOICES = [(DAY, "Day"), (MONTH, "Month")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    bucket = models.DateField()  # the day itself, or the first day of the month
+    total = models.FloatField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "category", "period", "bucket"],
+                name="unique_spending_rollup",
+            ),
+            # NULLs are distinct in the constraint above, so uncategorized
+            # buckets need their own
+            models.UniqueConstraint(
+                fields=["user", "period", "bucket"],
+                condition=models.Q(category__isnull=True),
+                name="unique_uncategorized_rollup",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "period", "bucket"], name="rollup_user_period_bucket"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.period} {self.bucket}: {self.total}"
+
+# Running total of a user's spending per month, maintained with the rollups
+# by tracker.signals so budget checks never aggregate (see tracker.budgets)
+class MonthlySpend(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the month
+    total = models.FloatField(default=0)
+    alerted = models.PositiveSmallIntegerField(default=0)  # highest budget threshold (%) already alerted
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "month"], name="unique_monthly_spend"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.month:%Y-%m}: {self.total}"
+
+# Per-user counter bumped on every change to the user's expense data
+# (see tracker.versioning); used to key caches and reusable artifacts.
+class DataVersion(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
+
+# Single row counting Category changes (see tracker.versioning), shared by
+# every worker process so they all notice new and renamed categories.
+class CategoryVersion(models.Model):
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"categories v{self.version}"
+
+# Background export of a filtered expense list, produced by run_export_worker
+class ExportJob(models.Model):
+    CSV = "csv"
+    EXCEL = "excel"
+    PDF = "pdf"
+    FORMAT_CHOICES = [(CSV, "CSV"), (EXCEL, "Excel"), (PDF, "PDF")]
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    format = models.CharField(max_length=5, choices=FORMAT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    fingerprint = models.CharField(max_length=64)  # hash of format, filter params and covered dates
+    # Closed date bounds the date_range filter resolved to when queued (None: unbounded)
+    range_start = models.DateField(blank=True, null=True)
+    range_end = models.DateField(blank=True, null=True)
+    data_version = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="exportjob_status_created"),
+            models.Index(fields=["user", "fingerprint", "data_version"], name="exportjob_reuse"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.format} export ({self.status})"
+
+# A stored upload and how many rows reference it (see tracker.blobs);
+# unreferenced blobs are removed by collect_media_garbage
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.IntegerField(default=0)
+    variants = models.BooleanField(default=False)  # every thumbnail variant is written
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["refs", "updated_at"], name="mediablob_refs_updated"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refs} refs)"
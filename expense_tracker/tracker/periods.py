@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta
+
+from django.utils import timezone
+
+
+def as_date(value):
+    """Coerce a DateField value to a date (``Expense.date`` defaults to a datetime)"""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.make_naive(value, timezone.get_default_timezone())
+        return value.date()
+    return value
+
+
+def month_start(day):
+    """First day of the month containing ``day``"""
+    return day.replace(day=1)
+
+
+def next_month(day):
+    """First day of the month after the one containing ``day``"""
+    if day.month == 12:
+        return date(day.year + 1, 1, 1)
+    return date(day.year, day.month + 1, 1)
+
+
+def intersect(first, second):
+    """Intersect two closed ``(start, end)`` date ranges, ``None`` meaning unbounded.
+
+    Returns ``None`` when the ranges do not overlap.
+    """
+    starts = [d for d in (first[0], second[0]) if d is not None]
+    ends = [d for d in (first[1], second[1]) if d is not None]
+    start = max(starts) if starts else None
+    end = min(ends) if ends else None
+    if start is not None and end is not None and start > end:
+        return None
+    return start, end
+
+
+def date_range_bounds(date_range, today=None):
+    """Closed ``(start, end)`` bounds for the dashboard ``date_range`` filter"""
+    today = today or date.today()
+    if date_range == "today":
+        return today, today
+    if date_range == "week":
+        return today - timedelta(days=7), None
+    if date_range == "month":
+        return month_start(today), next_month(today) - timedelta(days=1)
+    return None, None
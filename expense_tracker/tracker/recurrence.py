@@ -0,0 +1,158 @@
+import time
+from dataclasses import dataclass
+
+from django.db import IntegrityError, connection, transaction
+
+from .models import Expense, RecurrenceRule
+from .signals import expense_row, expenses_changed
+
+GENERATION_BATCH_SIZE = 1000
+
+
+@dataclass
+class GenerationResult:
+    rules: int = 0
+    created: int = 0
+    skipped: int = 0  # occurrences that already existed
+    seconds: float = 0.0
+
+
+# ---------- Rules From Expenses ----------
+def start_rule(expense, frequency=RecurrenceRule.MONTHLY):
+    """Create a rule repeating ``expense`` and link the expense as its first instance"""
+    rule = RecurrenceRule(
+        user_id=expense.user_id, title=expense.title, amount=expense.amount,
+        category_id=expense.category_id, notes=expense.notes,
+        frequency=frequency, start_date=expense.date, next_run_date=expense.date,
+    )
+    rule.next_run_date = rule.following(expense.date)
+    rule.save()
+    # A plain UPDATE: linking changes nothing the expense signals care about
+    Expense.objects.filter(pk=expense.pk).update(recurrence_rule=rule)
+    expense.recurrence_rule = rule
+    return rule
+
+
+def sync_expense_rule(expense):
+    """Keep the expense's rule in step with an edit of it.
+
+    The rule is started or stopped to match the form's ``recurring``
+    checkbox, and the edited title, amount, category and notes become those
+    of the occurrences it generates next.
+    """
+    if expense.recurrence_rule_id is None:
+        if expense.recurring:
+            start_rule(expense)
+        return
+    rules = RecurrenceRule.objects.filter(pk=expense.recurrence_rule_id)
+    if expense.recurring:
+        rules.update(active=True, title=expense.title, amount=expense.amount,
+                     category_id=expense.category_id, notes=expense.notes)
+    else:
+        rules.filter(active=True).update(active=False)
+
+
+# ---------- Generation ----------
+def _due_dates(rule, today):
+    """Every occurrence from next_run_date up to today, and the one after them"""
+    dates = []
+    day = rule.next_run_date
+    while day <= today and (rule.end_date is None or day <= rule.end_date):
+        dates.append(day)
+        day = rule.following(day)
+    return dates, day
+
+
+def _instance(rule, day):
+    return Expense(
+        user_id=rule.user_id, title=rule.title, amount=rule.amount,
+        category_id=rule.category_id, notes=rule.notes, date=day,
+        recurring=True, recurrence_rule=rule,
+    )
+
+
+def _existing_occurrences(rules, since):
+    """(rule id, date) of the occurrences already generated from ``since`` on"""
+    return set(
+        Expense.objects.filter(recurrence_rule__in=[rule.pk for rule in rules], date__gte=since)
+        .values_list("recurrence_rule_id", "date")
+    )
+
+
+def _insert(instances):
+    """Insert generated occurrences and return those actually inserted.
+
+    One bulk insert normally; if another run created some of them in the
+    meantime, they are inserted one by one and the duplicates skipped, so
+    only new rows are counted in the derived data.
+    """
+    try:
+        with transaction.atomic():
+            return Expense.objects.bulk_create(instances, batch_size=GENERATION_BATCH_SIZE)
+    except IntegrityError:
+        pass
+    inserted = []
+    for instance in instances:
+        instance.pk = None
+        instance._state.adding = True
+        try:
+            with transaction.atomic():
+                Expense.objects.bulk_create([instance])
+        except IntegrityError:
+            continue
+        inserted.append(instance)
+    return inserted
+
+
+def _generate_batch(rules, today, dry_run):
+    planned = []
+    for rule in rules:
+        dates, next_run = _due_dates(rule, today)
+        planned.extend((rule, day) for day in dates)
+        rule.next_run_date = next_run
+        if rule.end_date is not None and next_run > rule.end_date:
+            rule.active = False
+
+    # Occurrences already generated (a rerun, or a run that died mid-way)
+    existing = _existing_occurrences(rules, min(day for _, day in planned)) if planned else set()
+    new = [_instance(rule, day) for rule, day in planned if (rule.pk, day) not in existing]
+    if dry_run:
+        return len(new), len(planned) - len(new)
+
+    inserted = _insert(new) if new else []
+    # Saved even when nothing was due, so rules past their end date are deactivated
+    RecurrenceRule.objects.bulk_update(rules, ["next_run_date", "active"], batch_size=GENERATION_BATCH_SIZE)
+    if inserted:
+        # bulk_create skips model signals
+        expenses_changed.send(sender=Expense, added=[expense_row(e) for e in inserted], removed=[])
+    return len(inserted), len(planned) - len(inserted)
+
+
+def generate_due(today, batch_size=GENERATION_BATCH_SIZE, dry_run=False):
+    """Generate every expense due up to ``today`` from active rules.
+
+    Rules are walked in primary-key batches, each in its own transaction, so
+    memory stays bounded by the batch size however many rules exist. Missed
+    periods are caught up, and reruns create nothing new.
+    """
+    result = GenerationResult()
+    started = time.perf_counter()
+    due = RecurrenceRule.objects.filter(active=True, next_run_date__lte=today).order_by("id")
+    if not dry_run and connection.features.has_select_for_update_skip_locked:
+        # Concurrent runs split the rules instead of double-generating
+        due = due.select_for_update(skip_locked=True)
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rules = list(due.filter(id__gt=last_id)[:batch_size])
+            if not rules:
+                break
+            last_id = rules[-1].pk
+            created, skipped = _generate_batch(rules, today, dry_run)
+        result.rules += len(rules)
+        result.created += created
+        result.skipped += skipped
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,196 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Expense, SpendingRollup
+from .periods import month_start, next_month
+
+# Change sets touching at least this many buckets are applied in bulk
+BULK_THRESHOLD = 50
+BULK_BATCH_SIZE = 500
+
+
+# ---------- Incremental Updates ----------
+def _bucket_deltas(added, removed):
+    """Net (total, count) change per rollup bucket for the given expense rows"""
+    deltas = defaultdict(lambda: [0.0, 0])
+    for rows, sign in ((added, 1), (removed, -1)):
+        for row in rows:
+            for period, bucket in ((SpendingRollup.DAY, row.date),
+                                   (SpendingRollup.MONTH, month_start(row.date))):
+                delta = deltas[(row.user_id, row.category_id, period, bucket)]
+                delta[0] += sign * row.amount
+                delta[1] += sign
+    return deltas
+
+
+def _apply_delta(user_id, category_id, period, bucket, total, count):
+    rows = SpendingRollup.objects.filter(
+        user_id=user_id, category_id=category_id, period=period, bucket=bucket
+    )
+    if rows.update(total=F("total") + total, count=F("count") + count):
+        if count < 0:
+            rows.filter(count__lte=0).delete()
+        return
+    if count <= 0:
+        # Nothing to subtract from (e.g. the user is being deleted)
+        return
+    try:
+        with transaction.atomic():
+            SpendingRollup.objects.create(
+                user_id=user_id, category_id=category_id, period=period,
+                bucket=bucket, total=total, count=count,
+            )
+    except IntegrityError:
+        # Another writer created the bucket first
+        rows.update(total=F("total") + total, count=F("count") + count)
+
+
+def _apply_bulk(deltas):
+    """Apply many bucket deltas with one read and a few batched writes"""
+    user_ids = {user_id for user_id, _, _, _ in deltas}
+    buckets = [bucket for _, _, _, bucket in deltas]
+    rows = SpendingRollup.objects.select_for_update().filter(
+        user_id__in=user_ids, bucket__gte=min(buckets), bucket__lte=max(buckets)
+    ).values_list("id", "user_id", "category_id", "period", "bucket", "count")
+    existing = {tuple(key): (pk, count) for pk, *key, count in rows.iterator()}
+
+    increments, emptied, new = [], [], []
+    for key, (total, count) in deltas.items():
+        if key in existing:
+            pk, current = existing[key]
+            increments.append((total, count, pk))
+            if current + count <= 0:
+                emptied.append(pk)
+        elif count > 0:
+            user_id, category_id, period, bucket = key
+            new.append(SpendingRollup(user_id=user_id, category_id=category_id, period=period,
+                                      bucket=bucket, total=total, count=count))
+    if increments:
+        # Plain executemany: bulk_update builds a CASE per row and is far slower
+        quote = connection.ops.quote_name
+        table = quote(SpendingRollup._meta.db_table)
+        total, count, pk = (quote(SpendingRollup._meta.get_field(name).column) for name in ("total", "count", "id"))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {table} SET {total} = {total} + %s, {count} = {count} + %s WHERE {pk} = %s",
+                increments,
+            )
+    SpendingRollup.objects.filter(pk__in=emptied).delete()
+    SpendingRollup.objects.bulk_create(new, batch_size=BULK_BATCH_SIZE)
+
+
+def apply_changes(added=(), removed=()):
+    """Fold added/removed expense rows into the rollup table.
+
+    Rows only need ``user_id``, ``category_id``, ``date`` and ``amount``.
+    Changes that cancel out (e.g. a title-only edit) issue no queries.
+    Large change sets (imports, generated expenses) are applied in bulk.
+    """
+    deltas = {key: delta for key, delta in _bucket_deltas(added, removed).items() if delta != [0, 0]}
+    if len(deltas) >= BULK_THRESHOLD:
+        try:
+            with transaction.atomic():
+                _apply_bulk(deltas)
+            return
+        except IntegrityError:
+            pass  # a bucket was created concurrently; apply one by one instead
+    for key, (total, count) in deltas.items():
+        _apply_delta(*key, total=total, count=count)
+
+
+def move_to_uncategorized(category_id):
+    """Fold a category's buckets into the uncategorized ones before it is deleted"""
+    rows = SpendingRollup.objects.filter(category_id=category_id)
+    for rollup in rows.iterator():
+        _apply_delta(rollup.user_id, None, rollup.period, rollup.bucket,
+                     total=rollup.total, count=rollup.count)
+
+
+# ---------- Reading ----------
+def range_filter(start=None, end=None):
+    """Q selecting the fewest rollup rows that cover the closed range [start, end].
+
+    Whole months are read from month buckets and only the partial months at
+    either edge from day buckets. ``None`` leaves that side unbounded.
+    """
+    first_full = None
+    if start is not None:
+        first_full = start if start.day == 1 else next_month(start)
+    end_excl = end + timedelta(days=1) if end is not None else None
+    last_full_excl = month_start(end_excl) if end_excl is not None else None
+
+    if first_full is not None and last_full_excl is not None and first_full >= last_full_excl:
+        return Q(period=SpendingRollup.DAY, bucket__gte=start, bucket__lte=end)
+
+    months = Q(period=SpendingRollup.MONTH)
+    if first_full is not None:
+        months &= Q(bucket__gte=first_full)
+    if last_full_excl is not None:
+        months &= Q(bucket__lt=last_full_excl)
+    condition = months
+    if start is not None and start != first_full:
+        condition |= Q(period=SpendingRollup.DAY, bucket__gte=start, bucket__lt=first_full)
+    if end_excl is not None and end_excl != last_full_excl:
+        condition |= Q(period=SpendingRollup.DAY, bucket__gte=last_full_excl, bucket__lte=end)
+    return condition
+
+
+def total_spent(user, start=None, end=None, category_name=None):
+    """Total spent by ``user`` in [start, end], optionally for one category"""
+    rollups = SpendingRollup.objects.filter(user=user)
+    if category_name:
+        rollups = rollups.filter(category__name=category_name)
+    return rollups.filter(range_filter(start, end)).aggregate(Sum("total"))["total__sum"] or 0
+
+
+# ---------- Rebuild ----------
+def expected_rollups(user_id):
+    """Rollup buckets recomputed from the raw expenses of one user"""
+    expenses = Expense.objects.filter(user_id=user_id).order_by()
+    expected = {}
+    days = expenses.values("category_id", "date").annotate(total=Sum("amount"), count=Count("id"))
+    for row in days.iterator():
+        expected[(row["category_id"], SpendingRollup.DAY, row["date"])] = (row["total"], row["count"])
+    months = (expenses.annotate(month=TruncMonth("date")).values("category_id", "month")
+              .annotate(total=Sum("amount"), count=Count("id")))
+    for row in months.iterator():
+        expected[(row["category_id"], SpendingRollup.MONTH, row["month"])] = (row["total"], row["count"])
+    return expected
+
+
+def stored_rollups(user_id):
+    rows = SpendingRollup.objects.filter(user_id=user_id).values_list(
+        "category_id", "period", "bucket", "total", "count"
+    )
+    return {(c, p, b): (t, n) for c, p, b, t, n in rows.iterator()}
+
+
+def diff_rollups(user_id, tolerance=1e-6):
+    """Buckets whose stored value differs from the recomputed one, as (key, stored, expected)"""
+    expected = expected_rollups(user_id)
+    stored = stored_rollups(user_id)
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        want = expected.get(key, (0, 0))
+        have = stored.get(key, (0, 0))
+        if want[1] != have[1] or abs(want[0] - have[0]) > tolerance:
+            mismatches.append((key, have, want))
+    return mismatches
+
+
+def rebuild_user(user_id, batch_size=1000):
+    """Replace a user's rollups with ones recomputed from their expenses"""
+    expected = expected_rollups(user_id)
+    with transaction.atomic():
+        SpendingRollup.objects.filter(user_id=user_id).delete()
+        SpendingRollup.objects.bulk_create(
+            (SpendingRollup(user_id=user_id, category_id=category_id, period=period,
+                            bucket=bucket, total=total, count=count)
+             for (category_id, period, bucket), (total, count) in expected.items()),
+            batch_size=batch_size,
+        )
+    return len(expected)
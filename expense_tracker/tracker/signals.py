@@ -0,0 +1,199 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import blobs, budgets, rollups, thumbnails
+from .matching import invalidate_category_matcher
+from .models import Category, Expense, RecurrenceRule, UserProfile
+from .periods import as_date
+from .versioning import bump_data_versions
+
+# The fields derived data (rollups, budgets, versions) depends on
+ExpenseRow = namedtuple("ExpenseRow", ["user_id", "category_id", "date", "amount"])
+
+# Sent whenever expenses are written, with ``added`` and ``removed`` lists of
+# ExpenseRow. An update is the old row removed plus the new row added. Code
+# that bypasses model signals (bulk_create, bulk_update) must send it itself.
+expenses_changed = Signal()
+
+
+def expense_row(expense):
+    return ExpenseRow(expense.user_id, expense.category_id, as_date(expense.date), float(expense.amount))
+
+
+@dataclass
+class ExpenseChanges:
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+
+_batch = ContextVar("expense_changes", default=None)
+
+
+@contextmanager
+def batched_changes():
+    """Collect the changes of every expense save and delete in the block and
+    send them as one expenses_changed when it exits.
+
+    Use inside a transaction. Bulk writes in the block add their rows to the
+    yielded ExpenseChanges instead of sending the signal themselves.
+    """
+    changes = ExpenseChanges()
+    token = _batch.set(changes)
+    try:
+        yield changes
+    finally:
+        _batch.reset(token)
+    if changes.added or changes.removed:
+        expenses_changed.send(sender=Expense, added=changes.added, removed=changes.removed)
+
+
+def _expenses_changed(added, removed):
+    changes = _batch.get()
+    if changes is None:
+        expenses_changed.send(sender=Expense, added=added, removed=removed)
+    else:
+        changes.added.extend(added)
+        changes.removed.extend(removed)
+
+
+# ---------- Expense Writes ----------
+@receiver(pre_save, sender=Expense)
+def remember_previous_expense(sender, instance, raw=False, **kwargs):
+    instance._previous_row = None
+    instance._previous_receipt = ""
+    if raw or instance._state.adding:
+        return
+    previous = Expense.objects.filter(pk=instance.pk).values_list(
+        "user_id", "category_id", "date", "amount", "receipt"
+    ).first()
+    if previous:
+        instance._previous_row = ExpenseRow(*previous[:4])
+        instance._previous_receipt = previous[4] or ""
+
+
+@receiver(post_save, sender=Expense)
+def expense_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_row", None)
+    _expenses_changed([expense_row(instance)], [previous] if previous else [])
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User):
+        # Deleting the user cascades to all of their derived data as well
+        return
+    _expenses_changed([], [expense_row(instance)])
+
+
+
+# ---------- Recurring Expenses ----------
+@receiver(post_delete, sender=Expense)
+def stop_deleted_expense_rule(sender, instance, origin=None, **kwargs):
+    """Deleting an expense stops the rule repeating it"""
+    if instance.recurrence_rule_id is None or isinstance(origin, User):
+        return
+    RecurrenceRule.objects.filter(pk=instance.recurrence_rule_id, active=True).update(active=False)
+
+# ---------- Derived Data ----------
+@receiver(expenses_changed)
+def update_spending_rollups(sender, added=(), removed=(), **kwargs):
+    rollups.apply_changes(added, removed)
+
+
+@receiver(expenses_changed)
+def update_monthly_spend(sender, added=(), removed=(), **kwargs):
+    budgets.apply_changes(added, removed)
+
+
+@receiver(expenses_changed)
+def bump_expense_versions(sender, added=(), removed=(), **kwargs):
+    bump_data_versions(row.user_id for row in [*added, *removed])
+
+
+@receiver(post_save, sender=UserProfile)
+def budget_changed(sender, instance, raw=False, **kwargs):
+    if not raw and getattr(instance, "_previous_budget", None) not in (None, instance.budget):
+        # Thresholds already passed under the new budget are not alerted again
+        budgets.reset_alerts(instance.user_id, instance.budget)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_profile_version(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or isinstance(origin, User):
+        return
+    # The profile (picture, bio) is rendered on the dashboard
+    bump_data_versions([instance.user_id])
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollups(sender, instance, **kwargs):
+    # Deleting a category nulls its expenses with a plain UPDATE
+    rollups.move_to_uncategorized(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def bump_category_versions(sender, instance, raw=False, **kwargs):
+    if raw or kwargs.get("created"):
+        return
+    # Renaming or deleting a category changes every export that shows it
+    user_ids = Expense.objects.filter(category=instance).values_list("user_id", flat=True).distinct()
+    bump_data_versions(list(user_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_category_matcher(sender, **kwargs):
+    transaction.on_commit(invalidate_category_matcher)
+
+
+# ---------- Images ----------
+def _schedule_variants(image):
+    if image and not blobs.has_variants(image.name):
+        name = image.name
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
+@receiver(post_save, sender=Expense)
+def track_receipt(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    blobs.replace_ref(getattr(instance, "_previous_receipt", ""), instance.receipt.name or "")
+    _schedule_variants(instance.receipt)
+
+
+@receiver(pre_save, sender=UserProfile)
+def remember_previous_profile(sender, instance, raw=False, **kwargs):
+    instance._previous_picture = ""
+    instance._previous_budget = None
+    if not raw and not instance._state.adding:
+        previous = UserProfile.objects.filter(pk=instance.pk).values_list("profile_picture", "budget").first()
+        if previous:
+            instance._previous_picture = previous[0] or ""
+            instance._previous_budget = previous[1]
+
+
+@receiver(post_save, sender=UserProfile)
+def track_profile_picture(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    blobs.replace_ref(getattr(instance, "_previous_picture", ""), instance.profile_picture.name or "")
+    _schedule_variants(instance.profile_picture)
+
+
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=UserProfile)
+def release_image(sender, instance, **kwargs):
+    image = instance.receipt if sender is Expense else instance.profile_picture
+    if image:
+        blobs.release(image.name)
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+# <upload_to>/ab/cd/<sha256>.<ext>, plus thumbnail variants <sha256>.<size>.<ext>
+_CONTENT_NAME = re.compile(r"(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(?:\.\w+)*$")
+
+
+def content_digest(name):
+    """The SHA-256 a content-addressed name was derived from, or None"""
+    match = _CONTENT_NAME.search(name)
+    return match.group(3) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each file under the SHA-256 of its content.
+
+    An upload to ``receipts/bill.jpg`` is saved as
+    ``receipts/3f/a2/3fa2...e1.jpg``; uploading the same bytes again stores
+    nothing and returns the existing name. Names never change meaning, so
+    they can be cached forever. Which blobs are still used is tracked by
+    MediaBlob reference counts (see tracker.blobs).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name  # _save derives the final name from the content
+
+    def _save(self, name, content):
+        from .blobs import touch
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        final = posixpath.join(posixpath.dirname(name), digest[:2], digest[2:4], digest + extension)
+        # Touched before the check: garbage collection then either leaves an
+        # existing file alone until the model's reference is taken, or has
+        # already deleted it and the bytes are written again below
+        touch(final)
+        if self.exists(final):
+            return final
+
+        # Write under a unique name and rename: concurrent identical uploads
+        # then race harmlessly, each replacing the file with the same bytes.
+        temporary = super()._save(posixpath.join(posixpath.dirname(final), f".{uuid.uuid4().hex}.part"), content)
+        os.replace(self.path(temporary), self.path(final))
+        return final
+
+
+_media_storage = ContentAddressedStorage()
+
+
+def media_storage():
+    """Storage of user uploads (receipts, profile pictures)"""
+    return _media_storage
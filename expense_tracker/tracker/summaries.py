@@ -0,0 +1,69 @@
+"""Cache of the dashboard totals cards and category chart data.
+
+Entries are keyed on the user, their data version, the category version,
+the date and the filters that change the totals (not the sort order or
+page). Expense saves and deletes bump the data version through
+``expenses_changed``, renaming or deleting a category bumps it for the
+users it affects and any Category change moves the category version, so
+a stale summary is never looked up again and simply ages out.
+"""
+import hashlib
+
+from django.core.cache import InvalidCacheBackendError, caches
+
+from . import metrics
+from .versioning import get_category_version, get_data_version
+
+# Cache alias for summaries; see CACHES in settings for the backend and size
+SUMMARY_CACHE = "dashboard"
+
+# Filters that change the totals; sorting and pagination do not
+SUMMARY_PARAMS = ("category", "date_range", "search")
+
+
+def _summary_cache():
+    try:
+        return caches[SUMMARY_CACHE]
+    except InvalidCacheBackendError:
+        return None
+
+
+def summary_key(user_id, params, today, version=None, categories=None):
+    """Cache key of a summary. ``version`` and ``categories`` (the data and
+    category versions) are read from the database when not given; both are
+    shared by every process, so workers share entries."""
+    if version is None:
+        version = get_data_version(user_id)
+    if categories is None:
+        categories = get_category_version()
+    filters = "&".join(f"{name}={params.get(name) or ''}" for name in SUMMARY_PARAMS)
+    digest = hashlib.sha256(filters.encode()).hexdigest()[:32]
+    return f"summary:{user_id}:{version}:{categories}:{today.isoformat()}:{digest}"
+
+
+def cached_summary(key, compute):
+    """The summary stored under ``key``, computing and storing it on a miss"""
+    cache = _summary_cache()
+    if cache is None:
+        return compute()
+    summary = cache.get(key)
+    if summary is None:
+        metrics.incr("dashboard.cache.miss")
+        summary = compute()
+        cache.set(key, summary)
+    else:
+        metrics.incr("dashboard.cache.hit")
+    return summary
+
+
+def summary_cache_stats():
+    counts = metrics.read("dashboard.cache.hit", "dashboard.cache.miss")
+    hits, misses = counts["dashboard.cache.hit"], counts["dashboard.cache.miss"]
+    cache = _summary_cache()
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": metrics.ratio(hits, misses),
+        "backend": type(cache).__name__ if cache is not None else None,
+        "max_entries": getattr(cache, "_max_entries", None),
+    }
@@ -0,0 +1,43 @@
+from django import template
+from django.utils.html import format_html
+
+from tracker import blobs, thumbnails
+
+register = template.Library()
+
+
+def _variants_ready(image):
+    """The ``<field>_variants`` annotation (see blobs.variants_ready) when
+    the row has it, otherwise one query on the image's blob"""
+    ready = getattr(image.instance, f"{image.field.name}_variants", None)
+    if ready is None:
+        ready = blobs.has_variants(image.name)
+        setattr(image.instance, f"{image.field.name}_variants", ready)
+    return ready
+
+
+@register.simple_tag
+def thumbnail_url(image, size="thumb", fmt="jpeg"):
+    """URL of a resized variant: {% thumbnail_url expense.receipt "medium" %}"""
+    if not image:
+        return ""
+    return thumbnails.variant_url(image.name, size, fmt, _variants_ready(image))
+
+
+@register.simple_tag
+def picture(image, size="thumb", alt="", css_class=""):
+    """<picture> serving the WebP variant with a JPEG fallback.
+
+    Falls back to the original image until the variants have been generated.
+    """
+    if not image:
+        return ""
+    if not _variants_ready(image):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', image.url, alt, css_class)
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        thumbnails.variant_url(image.name, size, "webp"),
+        thumbnails.variant_url(image.name, size, "jpeg"),
+        alt, css_class,
+    )
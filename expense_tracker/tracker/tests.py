@@ -1,3 +1,1107 @@
-from django.test import TestCase
+from concurrent.futures import Future
+from datetime import date, timedelta
+import importlib.util
+import gzip
+import io
+import json
+import tempfile
+import threading
+import tracemalloc
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    ai, blobs, budgets, chat_memory, export_jobs, exporters, importers, instrumentation, intents, matching,
+    metrics, recurrence, rollups, summaries, thumbnails, versioning,
+)
+from .chat_memory import get_chat_store
+from .filters import SORT_ORDERINGS, apply_filters
+from .matching import get_category_matcher, invalidate_category_matcher
+from .models import Category, Expense, ExportJob, MediaBlob, RecurrenceRule, SpendingRollup, UserProfile
+from .periods import month_start
+from .signals import expense_row, expenses_changed
+from .views import ai as ai_views
+from .storage import media_storage
+
+EXPENSE_INDEXES = ("expense_user_date", "expense_user_category_date", "expense_user_amount")
+
+
+# ---------- Filters ----------
+class FilterExpensesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.food = Category.objects.create(name="Food")
+
+    def test_month_filter_excludes_same_month_of_other_years(self):
+        today = date.today()
+        this_month = Expense.objects.create(user=self.user, title="now", amount=1, date=today)
+        Expense.objects.create(user=self.user, title="last year", amount=1,
+                               date=today.replace(year=today.year - 1, day=1))
+        expenses = apply_filters(Expense.objects.filter(user=self.user), {"date_range": "month"})
+        self.assertEqual(list(expenses), [this_month])
+
+    def test_month_filter_is_a_plain_date_range(self):
+        expenses = apply_filters(Expense.objects.filter(user=self.user), {"date_range": "month"})
+        sql = str(expenses.query).lower()
+        self.assertNotIn("django_date_extract", sql)
+        self.assertNotIn("strftime", sql)
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class FilterIndexUsageTests(TestCase):
+    """Every dashboard filter combination is answered through a composite index"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        Category.objects.create(name="Food")
+        today = date.today()
+        Expense.objects.bulk_create(
+            Expense(user=self.user, title=f"expense {i}", amount=i, date=today - timedelta(days=i))
+            for i in range(50)
+        )
+
+    def plan(self, params):
+        expenses = apply_filters(Expense.objects.filter(user=self.user), params)
+        return expenses.explain()
+
+    def test_every_sort_and_date_range_uses_an_expense_index(self):
+        for sort_by in ["", *SORT_ORDERINGS]:
+            for date_range in ["", "today", "week", "month"]:
+                for category in ["", "Food"]:
+                    params = {"sort_by": sort_by, "date_range": date_range, "category": category}
+                    with self.subTest(**params):
+                        plan = self.plan(params)
+                        self.assertNotIn("SCAN tracker_expense", plan)
+                        self.assertTrue(
+                            any(f"USING INDEX {name} " in plan for name in EXPENSE_INDEXES), plan
+                        )
+
+    def test_date_ordering_uses_user_date_index(self):
+        for sort_by in ["newest", "oldest"]:
+            for date_range in ["", "today", "week", "month"]:
+                with self.subTest(sort_by=sort_by, date_range=date_range):
+                    plan = self.plan({"sort_by": sort_by, "date_range": date_range})
+                    self.assertIn("USING INDEX expense_user_date ", plan)
+                    self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_amount_ordering_uses_user_amount_index(self):
+        for sort_by in ["high", "low"]:
+            with self.subTest(sort_by=sort_by):
+                plan = self.plan({"sort_by": sort_by})
+                self.assertIn("USING INDEX expense_user_amount ", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_category_filter_uses_user_category_date_index(self):
+        for date_range in ["", "today", "week", "month"]:
+            with self.subTest(date_range=date_range):
+                plan = self.plan({"category": "Food", "date_range": date_range})
+                self.assertIn("USING INDEX expense_user_category_date ", plan)
+
+
+# ---------- Conditional GET ----------
+def _forget_process_state():
+    """Drop what another worker process would not have"""
+    matching._cached = (None, None)
+    caches["default"].clear()
+
+
+class DashboardConditionalGetTests(TestCase):
+    def setUp(self):
+        caches[summaries.SUMMARY_CACHE].clear()
+        self.user = User.objects.create_user("alice", password="secret")
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.food = Category.objects.create(name="Food")
+        Expense.objects.create(user=self.user, title="lunch", amount=12, date=date.today(), category=self.food)
+        self.client.force_login(self.user)
+
+    def revalidate(self, url, response, **params):
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+        return again, [query["sql"] for query in queries.captured_queries]
+
+    def test_unchanged_reload_is_not_modified_without_expense_queries(self):
+        for name in ("home", "dashboard_data"):
+            with self.subTest(view=name):
+                url = reverse(name)
+                response = self.client.get(url, {"sort_by": "high"})
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("no-cache", response["Cache-Control"])
+                self.assertTrue(response.has_header("Last-Modified"))
+
+                again, sql = self.revalidate(url, response, sort_by="high")
+                self.assertEqual(again.status_code, 304)
+                self.assertFalse(again.content)
+                for statement in sql:
+                    self.assertNotIn("tracker_expense", statement)
+                    self.assertNotIn("tracker_spendingrollup", statement)
+
+    def test_etag_is_the_same_in_a_fresh_process(self):
+        response = self.client.get(reverse("dashboard_data"))
+        _forget_process_state()
+        again, _ = self.revalidate(reverse("dashboard_data"), response)
+        self.assertEqual(again.status_code, 304)
+
+    def test_query_string_is_part_of_the_etag(self):
+        url = reverse("home")
+        response = self.client.get(url, {"date_range": "month"})
+        again, _ = self.revalidate(url, response, date_range="week")
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again["ETag"], response["ETag"])
+
+    def test_expense_change_invalidates(self):
+        url = reverse("dashboard_data")
+        response = self.client.get(url)
+        Expense.objects.create(user=self.user, title="dinner", amount=30, date=date.today())
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()["total_today"], 42)
+
+    def test_profile_change_invalidates(self):
+        url = reverse("home")
+        response = self.client.get(url)
+        self.profile.bio = "Saving for a bike"
+        self.profile.save()
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 200)
+
+    def test_other_users_changes_do_not_invalidate(self):
+        url = reverse("home")
+        response = self.client.get(url)
+        bob = User.objects.create_user("bob")
+        Expense.objects.create(user=bob, title="taxi", amount=9, date=date.today())
+        again, _ = self.revalidate(url, response)
+        self.assertEqual(again.status_code, 304)
+
+
+# ---------- Summary Cache ----------
+class DashboardSummaryCacheTests(TestCase):
+    def setUp(self):
+        caches[summaries.SUMMARY_CACHE].clear()
+        metrics.reset("dashboard.cache.hit", "dashboard.cache.miss")
+        self.user = User.objects.create_user("alice")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food = Category.objects.create(name="Food")
+        # Category changes refresh the process-wide matcher on commit
+        self.addCleanup(invalidate_category_matcher)
+        Expense.objects.create(user=self.user, title="lunch", amount=12, date=date.today(), category=self.food)
+        self.client.force_login(self.user)
+
+    def totals(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse("dashboard_data"), params).json()
+        computed = any("tracker_spendingrollup" in query["sql"] for query in queries.captured_queries)
+        return data["total_month"], computed
+
+    def test_repeat_is_served_from_the_cache(self):
+        self.assertEqual(self.totals(), (12, True))
+        self.assertEqual(self.totals(sort_by="high"), (12, False))  # sorting does not change the totals
+        self.assertEqual(summaries.summary_cache_stats()["hit_rate"], 0.5)
+
+    def test_entries_are_shared_between_processes(self):
+        self.totals()
+        _forget_process_state()
+        self.assertEqual(self.totals(), (12, False))
+        self.assertEqual(summaries.summary_cache_stats()["hit_rate"], 0.5)  # counted in the same shared cache
+
+    def test_filters_are_part_of_the_key(self):
+        self.totals()
+        self.assertEqual(self.totals(category="Food"), (12, True))
+
+    def test_expense_and_category_changes_invalidate(self):
+        self.totals()
+        Expense.objects.create(user=self.user, title="dinner", amount=30, date=date.today(), category=self.food)
+        self.assertEqual(self.totals(), (42, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.delete()
+        self.assertEqual(self.totals(category="Food"), (0, True))
+
+
+# ---------- Request Timing ----------
+def _query_count(response):
+    db = response["Server-Timing"].split(", ")[0]
+    return int(db.split('desc="')[1].split()[0])
+
+
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        Expense.objects.create(user=self.user, title="lunch", amount=12, date=date.today())
+        self.client.force_login(self.user)
+
+    def test_sync_request_counts_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("home"))
+        self.assertEqual(_query_count(response), len(queries))
+        self.assertGreater(len(queries), 0)
+
+    async def test_async_request_counts_queries_of_sync_views(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        response = await client.get(reverse("home"))
+        self.assertGreater(_query_count(response), 0)
+
+    def test_queries_while_streaming_are_reported(self):
+        with override_settings(SLOW_REQUEST_MS=-1), self.assertLogs(instrumentation.logger, "WARNING") as logs:
+            response = self.client.get(reverse("export_csv"))
+            self.assertEqual(logs.output, [])  # reported once the body is consumed
+            b"".join(response.streaming_content)
+        self.assertRegex(logs.output[0], r"Slow request GET /export/csv/: .*, [1-9]\d* queries")
+
+
+# ---------- Import ----------
+def _csv(*rows, encoding="utf-8"):
+    return io.BytesIO("\n".join(["Title,Amount,Date,Category", *rows]).encode(encoding))
+
+
+class ImportExpensesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.food = Category.objects.create(name="Food")
+        self.addCleanup(invalidate_category_matcher)
+
+    def test_rows_are_imported_and_bad_rows_reported(self):
+        result = importers.import_expenses(self.user, _csv(
+            "lunch,12.5,2024-03-01,Food", "taxi,abc,2024-03-02,", "bus,3,not a date,", "rent,900,2024-03-03,",
+        ), "csv")
+        self.assertEqual((result.rows, result.imported, result.failed), (4, 2, 2))
+        self.assertEqual([number for number, _ in result.errors], [3, 4])
+        self.assertEqual(Expense.objects.get(title="lunch").category, self.food)
+        self.assertIsNone(Expense.objects.get(title="rent").category)
+
+    def test_missing_categories_are_created_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = importers.import_expenses(self.user, _csv(
+                "a,1,2024-03-01,food", "b,1,2024-03-01,Travel", "c,1,2024-03-01,travel",
+            ), "csv", batch_size=1)
+        self.assertEqual(result.categories_created, 1)
+        travel = Category.objects.get(name="Travel")
+        self.assertEqual(Expense.objects.filter(category=travel).count(), 2)
+        self.assertEqual(Expense.objects.filter(category=self.food).count(), 1)
+
+    def test_latin1_csv_is_a_format_error(self):
+        with self.assertRaisesMessage(importers.ImportFormatError, "not UTF-8"):
+            importers.import_expenses(self.user, _csv("café,4,2024-03-01,", encoding="latin-1"), "csv")
+        self.assertFalse(Expense.objects.exists())
+
+    def test_batches_before_a_read_error_stay_imported(self):
+        rows = [f"expense {i},1,2024-03-01," for i in range(500)]  # past the 8 KB decoding chunk
+        fileobj = _csv(*rows, "café,4,2024-03-01,", encoding="latin-1")
+        with self.assertRaises(importers.ImportFormatError) as raised:
+            importers.import_expenses(self.user, fileobj, "csv", batch_size=100)
+        result = raised.exception.result
+        self.assertGreater(result.imported, 0)
+        self.assertEqual(Expense.objects.count(), result.imported)
+        self.assertIn(f"{result.imported} rows from the {result.batches} earlier batch(es) were imported",
+                      str(raised.exception))
+
+    def test_unreadable_uploads_are_form_errors(self):
+        self.client.force_login(self.user)
+        uploads = [
+            SimpleUploadedFile("bank.csv", "Title,Amount,Date\ncafé,4,2024-03-01".encode("latin-1")),
+            SimpleUploadedFile("bank.xlsx", b"this is not a zip file"),
+        ]
+        for upload in uploads:
+            response = self.client.post(reverse("import_expenses"), {"file": upload})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context["form"].errors["file"])
+
+
+# ---------- JSON API ----------
+class ApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food = Category.objects.create(name="Food")
+        self.addCleanup(invalidate_category_matcher)
+        self.client.force_login(self.user)
+
+    def batch(self, *operations, url="api_expenses_batch"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(url), json.dumps({"operations": operations}),
+                                    content_type="application/json")
+
+    def create(self, count, **data):
+        data = {"title": "lunch", "amount": 10, "date": date.today().isoformat(), **data}
+        response = self.batch(*({"op": "create", "data": data} for _ in range(count)))
+        self.assertEqual(response.status_code, 200, response.content)
+        return [result["id"] for result in response.json()["results"]]
+
+    def assertDerivedDataMatches(self):
+        self.assertEqual(rollups.diff_rollups(self.user.pk), [])
+        self.assertEqual(budgets.diff_user(self.user.pk), [])
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api_expenses")).status_code, 401)
+
+    def test_cursor_pages_and_sparse_fields(self):
+        ids = self.create(5, category_id=self.food.pk)
+        first = self.client.get(reverse("api_expenses"), {"limit": 3, "fields": "id,category"}).json()
+        self.assertEqual(first["results"][0], {"id": ids[-1], "category": "Food"})
+        second = self.client.get(reverse("api_expenses"), {"limit": 3, "cursor": first["next_cursor"]}).json()
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(sorted(row["id"] for row in first["results"] + second["results"]), ids)
+        self.assertEqual(self.client.get(reverse("api_expenses"), {"fields": "id,secret"}).status_code, 400)
+
+    def test_responses_are_gzipped(self):
+        self.create(3)
+        response = self.client.get(reverse("api_expenses"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))["results"]), 3)
+
+    def test_mixed_batch_keeps_derived_data_in_step(self):
+        ids = self.create(3, category_id=self.food.pk, recurring=True)
+        self.assertEqual(RecurrenceRule.objects.filter(active=True).count(), 3)
+        deleted_rule = Expense.objects.get(pk=ids[2]).recurrence_rule_id
+        response = self.batch(
+            {"op": "update", "id": ids[0], "data": {"amount": 1, "category_id": None}},
+            {"op": "update", "id": ids[1], "data": {"recurring": False}},
+            {"op": "delete", "id": ids[2]},
+            {"op": "create", "data": {"title": "bus", "amount": 2}},
+        )
+        self.assertEqual([result["op"] for result in response.json()["results"]],
+                         ["update", "update", "delete", "create"])
+        self.assertEqual(budgets.budget_status(self.user.pk).spent, 1 + 10 + 2)
+        self.assertFalse(Expense.objects.get(pk=ids[1]).recurrence_rule.active)
+        self.assertFalse(RecurrenceRule.objects.get(pk=deleted_rule).active)
+        edited = Expense.objects.get(pk=ids[0]).recurrence_rule
+        self.assertEqual((edited.active, edited.amount, edited.category), (True, 1, None))
+        self.assertDerivedDataMatches()
+
+    def test_updates_write_only_their_own_fields(self):
+        ids = self.create(2)
+        with CaptureQueriesContext(connection) as queries:
+            self.batch({"op": "update", "id": ids[0], "data": {"title": "dinner"}},
+                       {"op": "update", "id": ids[1], "data": {"amount": 20}})
+        updates = [query["sql"] for query in queries.captured_queries
+                   if query["sql"].startswith('UPDATE "tracker_expense"')]
+        self.assertEqual(len(updates), 2)
+        self.assertFalse(any('"title"' in sql and '"amount"' in sql for sql in updates))
+
+    def test_invalid_batch_writes_nothing(self):
+        ids = self.create(1)
+        other = Expense.objects.create(user=User.objects.create_user("bob"), title="x", amount=3)
+        response = self.batch(
+            {"op": "update", "id": ids[0], "data": {"amount": 1}},
+            {"op": "delete", "id": other.pk},
+            {"op": "delete", "id": [ids[0]]},
+            {"op": "update", "id": True, "data": {"amount": 1}},
+            {"op": "create", "data": {"title": "x", "amount": 1, "category_id": [self.food.pk]}},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [1, 2, 3, 4])
+        self.assertEqual(Expense.objects.get(pk=ids[0]).amount, 10)
+
+    def test_batch_limit(self):
+        from .views import api
+        response = self.batch(*[{"op": "delete", "id": 1}] * (api.API_BATCH_LIMIT + 1))
+        self.assertEqual(response.status_code, 413)
+
+    def test_categories_are_created_once(self):
+        response = self.batch({"op": "create", "data": {"name": "food"}},
+                              {"op": "create", "data": {"name": "Travel"}}, url="api_categories_batch")
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(response.json()["results"][0]["id"], self.food.pk)
+        names = [row["name"] for row in self.client.get(reverse("api_categories")).json()["results"]]
+        self.assertIn("Travel", names)
+
+
+# ---------- Category Matcher ----------
+class CategoryMatcherTests(TestCase):
+    def setUp(self):
+        self.addCleanup(invalidate_category_matcher)
+        self.user = User.objects.create_user("alice")
+
+    def test_change_in_another_process_is_noticed(self):
+        get_category_matcher()
+        # Another worker creates a category: its matcher is gone, only the shared version moves
+        travel = Category.objects.bulk_create([Category(name="Travel")])[0]
+        versioning.bump_category_version()
+        Expense.objects.create(user=self.user, title="train", amount=30, category=travel)
+        self.assertEqual(get_category_matcher().ids_for("Travel"), [travel.pk])
+        expenses = apply_filters(Expense.objects.filter(user=self.user), {"category": "Travel"})
+        self.assertEqual(expenses.count(), 1)
+
+    def test_version_is_shared_and_moves_on_change(self):
+        version = versioning.get_category_version()
+        self.assertEqual(versioning.get_category_version(), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Food")
+        self.assertEqual(versioning.get_category_version(), version + 1)
+        self.assertEqual(get_category_matcher().match("food delivery").name, "Food")
+
+
+# ---------- Export Jobs ----------
+class ExportJobReuseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.monday = date(2026, 10, 12)
+
+    def test_relative_range_is_not_reused_on_another_day(self):
+        params = {"date_range": "week"}
+        job, _ = export_jobs.enqueue(self.user, "csv", params, today=self.monday)
+        self.assertEqual(export_jobs.enqueue(self.user, "csv", params, today=self.monday), (job, True))
+        later, reused = export_jobs.enqueue(self.user, "csv", params, today=self.monday + timedelta(days=1))
+        self.assertFalse(reused)
+        self.assertNotEqual(later, job)
+
+    def test_unbounded_export_is_reused_across_days(self):
+        job, _ = export_jobs.enqueue(self.user, "csv", {"search": "taxi"}, today=self.monday)
+        again = export_jobs.enqueue(self.user, "csv", {"search": "taxi"}, today=self.monday + timedelta(days=3))
+        self.assertEqual(again, (job, True))
+
+    def test_data_change_is_not_reused(self):
+        job, _ = export_jobs.enqueue(self.user, "csv", {})
+        Expense.objects.create(user=self.user, title="lunch", amount=12)
+        self.assertNotEqual(export_jobs.enqueue(self.user, "csv", {})[0], job)
+
+
+    def test_worker_exports_the_dates_the_job_was_queued_for(self):
+        for day in [date(2026, 9, 30), date(2026, 10, 31), date(2026, 11, 1)]:
+            Expense.objects.create(user=self.user, title=f"on {day}", amount=1, date=day)
+        job, _ = export_jobs.enqueue(self.user, "csv", {"date_range": "month"}, today=date(2026, 10, 31))
+        self.assertEqual((job.range_start, job.range_end), (date(2026, 10, 1), date(2026, 10, 31)))
+
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        # The worker picks the job up after midnight
+        with override_settings(MEDIA_ROOT=media_root.name), \
+                mock.patch("tracker.filters.date", mock.Mock(today=lambda: date(2026, 11, 1))):
+            self.assertTrue(export_jobs.claim(job.pk))
+            job = export_jobs.run(ExportJob.objects.get(pk=job.pk))
+            content = job.file.read().decode()
+        self.assertEqual((job.status, job.total), (ExportJob.DONE, 1))
+        self.assertIn("on 2026-10-31", content)
+
+class PdfExportTests(TestCase):
+    def peak_memory(self, count):
+        rows = ((f"Expense {n}", 1.5, "Food", date(2026, 1, 1), "") for n in range(count))
+        output = io.BytesIO()
+        tracemalloc.start()
+        try:
+            exporters.write_pdf(rows, output, summary=[("Food", 1.5 * count, count)], rows_per_table=20)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertTrue(output.getvalue().startswith(b"%PDF"))
+        return peak
+
+    def test_peak_memory_grows_far_slower_than_the_rows(self):
+        small, large = self.peak_memory(500), self.peak_memory(3000)
+        # Only the finished page streams accumulate (~0.4 KB a row); keeping the
+        # laid-out tables until the end cost ~2.4 KB a row
+        self.assertLess((large - small) / 2500, 1000)
+
+
+# ---------- Recurring Expenses ----------
+class RecurringGenerationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.today = date(2026, 10, 18)
+
+    def rule(self, start, **fields):
+        return RecurrenceRule.objects.create(
+            user=self.user, title="rent", amount=900, start_date=start, next_run_date=start, **fields
+        )
+
+    def assertDerivedDataMatches(self):
+        self.assertEqual(rollups.diff_rollups(self.user.pk), [])
+        self.assertEqual(budgets.diff_user(self.user.pk), [])
+
+    def test_edits_and_deletes_reach_the_rule(self):
+        self.client.force_login(self.user)
+        food, housing = Category.objects.create(name="Food"), Category.objects.create(name="Housing")
+        self.addCleanup(invalidate_category_matcher)
+        self.client.post(reverse("add_expense"), {"title": "rent", "amount": 900, "category": food.pk,
+                                                   "date": "2026-09-01", "recurring": "on"})
+        expense = Expense.objects.get()
+        self.client.post(reverse("edit_expense", args=[expense.pk]), {
+            "title": "flat rent", "amount": 950, "category": housing.pk, "date": "2026-09-01",
+            "notes": "new lease", "recurring": "on",
+        })
+        recurrence.generate_due(self.today)
+        generated = Expense.objects.get(date=date(2026, 10, 1))
+        self.assertEqual((generated.title, generated.amount, generated.category, generated.notes),
+                         ("flat rent", 950, housing, "new lease"))
+
+        self.client.post(reverse("delete_expense", args=[expense.pk]))
+        self.assertFalse(RecurrenceRule.objects.get().active)
+        self.assertEqual(recurrence.generate_due(date(2026, 12, 31)).created, 0)
+
+    def test_missed_months_are_caught_up(self):
+        rule = self.rule(date(2026, 7, 31))
+        result = recurrence.generate_due(self.today)
+        self.assertEqual(result.created, 3)
+        self.assertEqual(sorted(Expense.objects.values_list("date", flat=True)),
+                         [date(2026, 7, 31), date(2026, 8, 31), date(2026, 9, 30)])
+        rule.refresh_from_db()
+        self.assertEqual(rule.next_run_date, date(2026, 10, 31))
+        self.assertDerivedDataMatches()
+
+    def test_rerun_creates_nothing(self):
+        rule = self.rule(date(2026, 9, 1))
+        recurrence.generate_due(self.today)
+        RecurrenceRule.objects.filter(pk=rule.pk).update(next_run_date=date(2026, 9, 1))  # as if the run died
+        result = recurrence.generate_due(self.today)
+        self.assertEqual((result.created, result.skipped), (0, 2))
+        self.assertEqual(Expense.objects.count(), 2)
+        self.assertDerivedDataMatches()
+
+    def test_rule_past_its_end_date_is_deactivated(self):
+        rule = self.rule(date(2026, 9, 1), end_date=date(2026, 8, 1))
+        recurrence.generate_due(self.today)
+        rule.refresh_from_db()
+        self.assertFalse(rule.active)
+        self.assertFalse(Expense.objects.exists())
+
+    def test_occurrences_created_concurrently_are_not_counted_twice(self):
+        rule = self.rule(date(2026, 9, 1))
+        recurrence.generate_due(self.today)
+        RecurrenceRule.objects.filter(pk=rule.pk).update(next_run_date=date(2026, 9, 1))
+        # A stale read: the run believes nothing exists and tries to insert both again
+        with mock.patch.object(recurrence, "_existing_occurrences", return_value=set()):
+            result = recurrence.generate_due(self.today + timedelta(days=14))
+        self.assertEqual(result.created, 1)  # only November is new
+        self.assertEqual(Expense.objects.count(), 3)
+        self.assertDerivedDataMatches()
+
+
+# ---------- AI Chat ----------
+@override_settings(CHAT_MEMORY={"BACKEND": "tracker.chat_memory.LocalChatStore"})
+class AiResponseCacheTests(TestCase):
+    def setUp(self):
+        caches[ai.RESPONSE_CACHE].clear()
+        self.user = User.objects.create_user("alice")
+        self.client.force_login(self.user)
+
+    def ask(self, message):
+        return self.client.post(reverse("ai_chat"), json.dumps({"message": message}),
+                                content_type="application/json").json()["reply"]
+
+    def test_answers_are_shared_by_standalone_questions_only(self):
+        get_chat_store.cache_clear()
+        self.addCleanup(get_chat_store.cache_clear)
+        model = mock.Mock()
+        model.generate_content.return_value.text = "Save 20% of your income."
+
+        def save_now(user_id, messages):
+            for role, content in messages:
+                ai_views.save_message(user_id, role, content)
+
+        with mock.patch.object(ai, "get_model", return_value=model), \
+                mock.patch.object(ai_views, "_save_in_background", save_now):
+            for message in ["What is a good savings rate?", "what is a good savings rate", "Why is that?",
+                            "Why is that?", "What is a good savings rate for this year?"]:
+                self.assertEqual(self.ask(message), "Save 20% of your income.")
+        # The repeat is answered from the cache although the history grew;
+        # the follow-up depends on it, so it is sent to Gemini every time
+        self.assertEqual(model.generate_content.call_count, 4)
+        self.assertEqual(len(ai_views.load_history(self.user.pk, 20)), 10)
+        self.assertIn("Why is that?", model.generate_content.call_args_list[2].args[0])
+
+    def test_follow_up_detection(self):
+        for question in ["Why is that?", "and last week?", "What about rent...", "How do I reduce it?"]:
+            self.assertTrue(ai.is_follow_up(question), question)
+        for question in ["How should I plan for this month?", "What is a good savings rate?"]:
+            self.assertFalse(ai.is_follow_up(question), question)
+        self.assertTrue(ai.cacheable("Why is that?", history=[]))
+
+
+    async def test_stream_keeps_gemini_off_the_event_loop_and_times_it(self):
+        loop_thread = threading.get_ident()
+        model_threads = []
+
+        async def stream():
+            for text in ["Save ", "more."]:
+                yield mock.Mock(text=text)
+
+        def get_model():
+            model_threads.append(threading.get_ident())
+            model = mock.Mock()
+            model.generate_content_async = mock.AsyncMock(return_value=stream())
+            return model
+
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        with mock.patch.object(ai, "get_model", get_model), mock.patch.object(ai_views, "_save_in_background"), \
+                override_settings(SLOW_REQUEST_MS=-1), self.assertLogs(instrumentation.logger, "WARNING") as logs:
+            response = await client.post(reverse("ai_chat_stream"), json.dumps({"message": "Tell me a joke"}),
+                                         content_type="application/json")
+            body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'"delta": "more."', body)
+        self.assertNotEqual(model_threads, [loop_thread])
+        self.assertRegex(logs.output[0], r", gemini \d+ ms")
+
+class ChatStoreTests(TestCase):
+    def assertPendingFollowsTheCap(self, store):
+        for number in range(chat_memory.MAX_MESSAGES + 5):
+            pending = store.append(1, "user", f"$message {number}")
+        self.assertEqual(pending, chat_memory.MAX_MESSAGES)  # dropped messages are not pending
+        self.assertEqual(store.history(1, 1), [{"role": "user", "content": f"$message {number}"}])
+        folded = [message["id"] for message in store.unsummarized(1)[:150]]
+        store.fold(1, "$summary", folded)
+        self.assertEqual(store.summary(1), "$summary")
+        self.assertEqual(store.append(1, "assistant", "ok"), chat_memory.MAX_MESSAGES - 150 + 1)
+
+    def assertFoldIsClaimedOnce(self, store):
+        store.append(2, "user", "hello")
+        self.assertTrue(store.claim_fold(2, 60))
+        self.assertFalse(store.claim_fold(2, 60))  # e.g. from another process
+        store.release_fold(2)
+        self.assertTrue(store.claim_fold(2, 0))
+        self.assertTrue(store.claim_fold(2, 60))  # the previous claim expired
+
+    def test_local_store(self):
+        self.assertPendingFollowsTheCap(chat_memory.LocalChatStore())
+        self.assertFoldIsClaimedOnce(chat_memory.LocalChatStore())
+
+    def test_mongo_store(self):
+        try:
+            import mongomock
+        except ImportError:
+            self.skipTest("mongomock is not installed")
+        with mock.patch("pymongo.MongoClient", mongomock.MongoClient):
+            store = chat_memory.MongoChatStore("mongodb://localhost", "test")
+        self.assertPendingFollowsTheCap(store)
+        self.assertFoldIsClaimedOnce(store)
+        self.assertTrue(store.collection.index_information()["user_id_1"]["unique"])
+
+    def test_summary_is_skipped_while_another_process_folds(self):
+        store = chat_memory.LocalChatStore()
+        for number in range(ai_views.SUMMARY_THRESHOLD):
+            store.append(1, "user", f"message {number}")
+        model = mock.Mock()
+        model.generate_content.return_value.text = "likes coffee"
+        with mock.patch.object(ai_views, "get_chat_store", return_value=store), \
+                mock.patch.object(ai, "get_model", return_value=model):
+            store.claim_fold(1, 60)
+            ai_views.summarize_old_chats(1)
+            self.assertEqual(store.summary(1), "")
+            model.generate_content.assert_not_called()
+
+            store.release_fold(1)
+            ai_views.summarize_old_chats(1)
+        self.assertEqual(store.summary(1), "likes coffee")
+        self.assertEqual(len(store.unsummarized(1)), ai_views.KEEP_VERBATIM)
+        self.assertTrue(store.claim_fold(1, 60))  # released after the fold
+
+    def test_backends_implement_every_method(self):
+        with self.assertRaises(TypeError):
+            type("PartialStore", (chat_memory.ChatStore,), {"append": lambda self, *args: 0})()
+
+
+# ---------- Chat Intents ----------
+class IntentParserTests(TestCase):
+    today = date(2026, 10, 18)
+
+    def setUp(self):
+        self.addCleanup(invalidate_category_matcher)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Food")
+
+    def parse(self, message):
+        return intents.parse(message, self.today)
+
+    def test_result_count_comes_from_the_ranking_words(self):
+        cases = {
+            "What are my top 3 categories last month?": (intents.TOP_CATEGORIES, 3),
+            "show my five biggest expenses": (intents.LARGEST, 5),
+            "largest 2 purchases this year": (intents.LARGEST, 2),
+            "show my largest expenses over 500": (intents.LARGEST, 5),
+            "biggest expense in 2025": (intents.LARGEST, 1),
+            "largest expenses in the last 30 days": (intents.LARGEST, 5),
+            "my 50 most expensive payments": (intents.LARGEST, intents.MAX_LIMIT),
+        }
+        for message, (kind, limit) in cases.items():
+            with self.subTest(message=message):
+                intent = self.parse(message)
+                self.assertEqual((intent.kind, intent.limit), (kind, limit))
+
+    def test_periods(self):
+        cases = {
+            "how much did I spend today": (date(2026, 10, 18), date(2026, 10, 18)),
+            "total spent last week": (date(2026, 10, 5), date(2026, 10, 11)),
+            "how much did I spend last month": (date(2026, 9, 1), date(2026, 9, 30)),
+            "spending in the last 10 days": (date(2026, 10, 9), date(2026, 10, 18)),
+            "how much did I spend in december": (date(2025, 12, 1), date(2025, 12, 31)),
+            "total in march 2026": (date(2026, 3, 1), date(2026, 3, 31)),
+            "how much did I spend in 2025": (date(2025, 1, 1), date(2025, 12, 31)),
+            "biggest expense during 2024": (date(2024, 1, 1), date(2024, 12, 31)),
+        }
+        for message, (start, end) in cases.items():
+            with self.subTest(message=message):
+                period = self.parse(message).period
+                self.assertEqual((period.start, period.end), (start, end))
+
+    def test_kinds_and_categories(self):
+        self.assertEqual(self.parse("How much budget do I have left?").kind, intents.BUDGET)
+        compare = self.parse("Compare food this month with last month")
+        self.assertEqual((compare.kind, compare.category, compare.period.label),
+                         (intents.COMPARE, "Food", "this month"))
+        average = self.parse("average daily spending this month")
+        self.assertEqual((average.kind, average.per_day), (intents.AVERAGE, True))
+        total = self.parse("how much have I spent on food")
+        self.assertEqual((total.kind, total.category, total.period), (intents.TOTAL, "Food", None))
+        total = self.parse("how much did I spend on food in 2024?")
+        self.assertEqual((total.kind, total.category, total.period.label), (intents.TOTAL, "Food", "in 2024"))
+        for message in ("am I over budget?", "how much of my budget have I used", "what's my budget"):
+            with self.subTest(message=message):
+                self.assertEqual(self.parse(message).kind, intents.BUDGET)
+
+    def test_other_messages_go_to_the_model(self):
+        for message in ("hello there", "give me tips to save money", "tell me more",
+                        "Can you help me budget better?", "how much should I spend on food?",
+                        "how do I make a budget", "what could I cut from my food spending this month?",
+                        "is a budget worth it?"):
+            with self.subTest(message=message):
+                self.assertIsNone(self.parse(message))
+
+
+# ---------- Spending Rollups ----------
+class SpendingRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.food = Category.objects.create(name="Food")
+        self.travel = Category.objects.create(name="Travel")
+        self.addCleanup(invalidate_category_matcher)
+
+    def assertMatchesRebuild(self):
+        self.assertEqual(rollups.diff_rollups(self.user.pk), [])
+        incremental = rollups.stored_rollups(self.user.pk)
+        rollups.rebuild_user(self.user.pk)
+        self.assertEqual(rollups.stored_rollups(self.user.pk).keys(), incremental.keys())
+
+    def test_saves_updates_and_deletes(self):
+        lunch = Expense.objects.create(user=self.user, title="lunch", amount=12, date=date(2026, 9, 30),
+                                       category=self.food)
+        Expense.objects.create(user=self.user, title="taxi", amount=20, date=date(2026, 10, 1), category=self.travel)
+        lunch.amount, lunch.date, lunch.category = 15, date(2026, 10, 2), self.travel
+        lunch.save()
+        self.assertMatchesRebuild()
+        lunch.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(rollups.total_spent(self.user, date(2026, 9, 15), date(2026, 10, 31)), 20)
+
+    def test_deleting_a_category_moves_its_spending_to_uncategorized(self):
+        Expense.objects.create(user=self.user, title="lunch", amount=12, date=date(2026, 10, 1), category=self.food)
+        self.food.delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(SpendingRollup.objects.filter(category__isnull=False).exists())
+
+    def test_bulk_changes_match_the_rebuild(self):
+        expenses = Expense.objects.bulk_create(
+            Expense(user=self.user, title=f"day {i}", amount=i + 1, date=date(2026, 1, 1) + timedelta(days=i),
+                    category=(self.food, self.travel, None)[i % 3])
+            for i in range(90)
+        )
+        self.assertGreaterEqual(len(rollups._bucket_deltas([expense_row(e) for e in expenses], [])),
+                                rollups.BULK_THRESHOLD)
+        expenses_changed.send(sender=Expense, added=[expense_row(e) for e in expenses], removed=[])
+        self.assertMatchesRebuild()
+        Expense.objects.filter(date__lt=date(2026, 2, 15)).delete()
+        self.assertMatchesRebuild()
+
+    def test_concurrent_first_writes_to_an_uncategorized_bucket_share_one_row(self):
+        bucket = {"user": self.user, "category": None, "period": SpendingRollup.DAY, "bucket": date(2026, 10, 1)}
+        update = QuerySet.update
+
+        def another_writer_between_update_and_insert(queryset, **values):
+            updated = update(queryset, **values)
+            if not updated and not SpendingRollup.objects.exists():
+                SpendingRollup.objects.create(**bucket, total=5, count=1)
+            return updated
+
+        with mock.patch.object(QuerySet, "update", another_writer_between_update_and_insert):
+            rollups._apply_delta(self.user.pk, None, SpendingRollup.DAY, date(2026, 10, 1), total=12, count=1)
+        self.assertEqual(list(SpendingRollup.objects.values_list("total", "count")), [(17, 2)])
+
+    def test_range_totals_combine_month_and_day_buckets(self):
+        for day in (date(2026, 1, 31), date(2026, 2, 1), date(2026, 2, 28), date(2026, 3, 1), date(2026, 3, 2)):
+            Expense.objects.create(user=self.user, title="x", amount=day.day, date=day)
+        self.assertEqual(rollups.total_spent(self.user, date(2026, 1, 31), date(2026, 3, 1)), 31 + 1 + 28 + 1)
+        self.assertEqual(rollups.total_spent(self.user, date(2026, 2, 1), date(2026, 2, 28)), 1 + 28)
+        self.assertEqual(rollups.total_spent(self.user), 31 + 1 + 28 + 1 + 2)
+
+
+# ---------- Monthly Budget ----------
+class BudgetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.profile = UserProfile.objects.create(user=self.user, budget=100)
+        self.today = date.today()
+        self.alerts = []
+        receiver = lambda sender, threshold, month, **kwargs: self.alerts.append((month, threshold))  # noqa: E731
+        budgets.budget_alert.connect(receiver, weak=False)
+        self.addCleanup(budgets.budget_alert.disconnect, receiver)
+
+    def spend(self, amount, day=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Expense.objects.create(user=self.user, title="x", amount=amount, date=day or self.today)
+
+    def thresholds(self):
+        return [threshold for _, threshold in self.alerts]
+
+    def test_each_threshold_is_alerted_once_per_month(self):
+        for amount in (60, 10, 25, 10, 30):
+            self.spend(amount)
+        self.assertEqual(self.thresholds(), [50, 80, 100])
+        self.spend(60, month_start(self.today) - timedelta(days=1))  # last month has its own counter
+        self.assertEqual(self.thresholds(), [50, 80, 100, 50])
+
+    def test_jump_over_several_thresholds_alerts_the_highest(self):
+        self.spend(85)
+        self.assertEqual(self.thresholds(), [80])
+
+    def test_refunds_do_not_realert(self):
+        expense = self.spend(60)
+        expense.delete()
+        self.spend(55)
+        self.assertEqual(self.thresholds(), [50])
+
+    def test_budget_change_resets_the_alerts(self):
+        self.spend(60)
+        self.profile.budget = 200
+        self.profile.save()
+        self.spend(45)
+        self.assertEqual(self.thresholds(), [50, 50])  # 105 is 50% of the new budget
+        self.profile.budget = 50
+        self.profile.save()  # already over: nothing to announce
+        self.spend(1)
+        self.assertEqual(self.thresholds(), [50, 50])
+        self.assertEqual(budgets.budget_status(self.user.pk).alerted, 100)
+
+    def test_counters_follow_every_write_path(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("add_expense_voice"), json.dumps({"speech": "spent 25 on lunch"}),
+                         content_type="application/json")
+        with self.captureOnCommitCallbacks(execute=True):
+            importers.import_expenses(self.user, _csv(f"book,15,{self.today.isoformat()},"), "csv")
+            RecurrenceRule.objects.create(user=self.user, title="rent", amount=40,
+                                          start_date=self.today, next_run_date=self.today)
+            recurrence.generate_due(self.today)
+            self.client.post(reverse("api_expenses_batch"), json.dumps({"operations": [
+                {"op": "create", "data": {"title": "bus", "amount": 5}},
+            ]}), content_type="application/json")
+        voice = Expense.objects.get(title__startswith="Voice")
+        voice.amount = 30
+        voice.save()
+        Expense.objects.filter(title="book").delete()
+        self.assertEqual(budgets.budget_status(self.user.pk).spent, 30 + 40 + 5)
+        self.assertEqual(budgets.diff_user(self.user.pk), [])
+
+
+# ---------- Analytics ----------
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+
+@skipUnless(HAS_NUMPY, "the analytics need NumPy")
+class AnalyticsComputationTests(TestCase):
+    today = date(2026, 10, 18)
+
+    def columns(self, *rows):
+        import numpy as np
+
+        from . import analytics
+
+        codes = {}
+        return analytics.ExpenseColumns.build(
+            days=np.array([day.toordinal() for day, _, _ in rows], np.int32),
+            cents=np.array([round(amount * 100) for _, amount, _ in rows], np.int64),
+            categories=np.array([codes.setdefault(category, len(codes)) for _, _, category in rows], np.int16),
+            category_ids=codes,
+        )
+
+    def setUp(self):
+        from . import analytics
+
+        self.analytics = analytics
+        self.data = self.columns(
+            (date(2026, 8, 31), 100, 1),
+            (date(2026, 10, 18), 5, 2),  # out of order: build sorts
+            (date(2026, 9, 1), 50, 2),
+            (date(2026, 9, 30), 25, None),
+            (date(2026, 10, 1), 10, 1),
+            (date(2026, 10, 20), 999, 1),  # future-dated
+        )
+
+    def test_monthly_totals_split_at_month_boundaries(self):
+        totals = self.analytics.monthly_totals(self.data, self.today, months=3)
+        self.assertEqual(totals.tolist(), [10000, 7500, 1500])
+        change, percent = self.analytics.month_over_month(totals)
+        self.assertEqual(change.tolist(), [-2500, -6000])
+        self.assertEqual(percent.tolist(), [-25.0, -80.0])
+
+    def test_moving_average(self):
+        self.assertEqual(self.analytics.moving_average([1, 2, 3, 4], 2).tolist(), [1.5, 2.5, 3.5])
+
+    def test_month_end_projection(self):
+        # 40.00 in the last 30 days is 1.33 a day for the 13 days left
+        self.assertEqual(self.analytics.month_end_projection(self.data, self.today, budget=100), {
+            "spent": 15.0, "daily_run_rate": 1.33, "days_remaining": 13, "projected": 32.33, "budget": 100,
+            "budget_used_percent": 15.0, "projected_percent": 32.3, "projected_over_budget": 0.0,
+            "safe_daily_spend": 6.54,
+        })
+
+    def test_category_totals(self):
+        self.assertEqual(self.analytics.category_totals(self.data, date(2026, 9, 1), self.today),
+                         [(2, 5500), (None, 2500), (1, 1000)])
+
+    def test_compute_uses_the_given_names_without_queries(self):
+        with self.assertNumQueries(0):
+            result = self.analytics.compute(self.data, self.today, months=2, category_names={1: "Food", 2: "Rent"})
+        self.assertEqual([month["total"] for month in result["months"]], [75.0, 15.0])
+        self.assertEqual(result["months"][1]["change_percent"], -80.0)
+        self.assertEqual(result["categories_this_month"],
+                         [{"category": "Food", "total": 10.0}, {"category": "Rent", "total": 5.0}])
+        self.assertEqual(len(result["daily"]["totals"]), self.analytics.DAILY_DAYS)
+        self.assertEqual(result["daily"]["totals"][-1], 5.0)
+
+    def test_empty_user(self):
+        result = self.analytics.compute(self.columns(), self.today, budget=100)
+        self.assertEqual({month["total"] for month in result["months"]}, {0.0})
+        self.assertEqual({month["change_percent"] for month in result["months"]}, {None})
+        self.assertEqual(result["trend_per_month"], 0.0)
+        self.assertEqual((result["this_month"]["projected"], result["this_month"]["safe_daily_spend"]), (0.0, 7.69))
+        self.assertEqual(result["categories_this_month"], [])
+
+
+@skipUnless(HAS_NUMPY, "the analytics need NumPy")
+class AnalyticsViewTests(TestCase):
+    def setUp(self):
+        from . import analytics
+
+        self.analytics = analytics
+        analytics.clear_columns()
+        self.addCleanup(analytics.clear_columns)
+        self.user = User.objects.create_user("alice")
+        self.client.force_login(self.user)
+        self.expense = Expense.objects.create(user=self.user, title="x", amount=12, date=date.today())
+
+    def test_columns_reload_after_a_change(self):
+        columns = self.analytics.get_columns(self.user.pk)
+        self.assertIs(self.analytics.get_columns(self.user.pk), columns)
+        Expense.objects.create(user=self.user, title="y", amount=3, date=date.today())
+        self.assertEqual(len(self.analytics.get_columns(self.user.pk)), 2)
+
+    def test_cache_is_bounded_by_bytes(self):
+        other = User.objects.create_user("bob")
+        Expense.objects.create(user=other, title="x", amount=1, date=date.today())
+        columns = self.analytics.get_columns(self.user.pk)
+        with override_settings(ANALYTICS_CACHE_BYTES=columns.nbytes):  # room for one user
+            self.assertIs(self.analytics.get_columns(self.user.pk), columns)
+            self.analytics.get_columns(other.pk)
+            self.assertIsNot(self.analytics.get_columns(self.user.pk), columns)
+        self.analytics.clear_columns()
+        with override_settings(ANALYTICS_CACHE_BYTES=columns.nbytes - 1):  # too large to keep
+            self.assertIsNot(self.analytics.get_columns(self.user.pk), self.analytics.get_columns(self.user.pk))
+
+    def test_months_are_clamped(self):
+        for value, months in (("", 12), ("1", 2), ("999", self.analytics.MAX_MONTHS), ("abc", 12)):
+            with self.subTest(months=value):
+                response = self.client.get(reverse("analytics_data"), {"months": value} if value else {})
+                self.assertEqual(len(response.json()["months"]), months)
+        self.assertEqual(response.json()["months"][-1]["total"], 12.0)
+
+    def test_unchanged_analytics_are_not_resent(self):
+        response = self.client.get(reverse("analytics_data"))
+        again = self.client.get(reverse("analytics_data"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.expense.amount = 20
+        self.expense.save()
+        changed = self.client.get(reverse("analytics_data"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+
+
+# ---------- Media Storage ----------
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = media_storage()
+
+    def upload(self):
+        return self.storage.save("receipts/bill.jpg", ContentFile(b"receipt bytes"))
+
+    def age(self, name):
+        MediaBlob.objects.filter(name=name).update(updated_at=timezone.now() - 2 * blobs.GC_GRACE_PERIOD)
+
+    def test_unreferenced_upload_is_collected_after_the_grace_period(self):
+        name = self.upload()
+        self.assertEqual(blobs.collect_garbage(), [])
+        self.age(name)
+        self.assertEqual(blobs.collect_garbage(), [name])
+        self.assertFalse(self.storage.exists(name))
+
+    def test_reupload_of_a_collectable_file_keeps_it(self):
+        name = self.upload()
+        blobs.replace_ref("", name)
+        blobs.replace_ref(name, "")  # the expense was deleted
+        self.age(name)
+        self.assertEqual(self.upload(), name)  # stored nothing, the reference comes on save
+        self.assertEqual(blobs.collect_garbage(), [])
+        self.assertTrue(self.storage.exists(name))
+
+    def test_reupload_after_collection_writes_the_file_again(self):
+        name = self.upload()
+        self.age(name)
+        blobs.collect_garbage()
+        self.assertEqual(self.upload(), name)
+        self.assertTrue(self.storage.exists(name))
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.client.force_login(self.user)
+        self.names = [f"receipts/{n:02x}/{n:02x}/{n:02x}{n:02x}{'0' * 60}.jpg" for n in range(3)]
+        for name in self.names:
+            Expense.objects.create(user=self.user, title="x", amount=1, date=date.today(), receipt=name)
+
+    def test_finished_generation_is_recorded_on_the_blob(self):
+        future = Future()
+        future.set_result(4)
+        version = versioning.get_data_version(self.user.pk)
+        thumbnails._finished(self.names[0])(future)
+        self.assertEqual(set(MediaBlob.objects.filter(variants=True).values_list("name", flat=True)),
+                         {self.names[0]})
+        # The dashboard now shows the thumbnail, so its ETag must change
+        self.assertEqual(versioning.get_data_version(self.user.pk), version + 1)
+        thumbnails._finished(self.names[0])(future)
+        self.assertEqual(versioning.get_data_version(self.user.pk), version + 1)
+
+    def test_callback_thread_closes_its_connection(self):
+        future = Future()
+        future.set_result(4)
+        done = thumbnails._finished(self.names[0])
+        with mock.patch.object(blobs, "mark_variants"), mock.patch.object(thumbnails, "connection") as db:
+            done(future)
+            db.close.assert_not_called()  # ran in the scheduling thread
+            worker = threading.Thread(target=done, args=(future,))
+            worker.start()
+            worker.join()
+        db.close.assert_called_once_with()
+
+    def test_dashboard_reads_variants_without_file_checks(self):
+        blobs.mark_variants([self.names[0]])
+        with mock.patch.object(type(media_storage()), "exists", side_effect=AssertionError("file check")):
+            with CaptureQueriesContext(connection) as queries:
+                html = self.client.get(reverse("home")).content.decode()
+        self.assertFalse([q for q in queries.captured_queries if "tracker_mediablob" in q["sql"]
+                          and "EXISTS" not in q["sql"].upper()])
+        self.assertIn(thumbnails.variant_name(self.names[0], "thumb", "webp"), html)
+        for name in self.names[1:]:
+            self.assertIn(f'<img src="/media/{name}"', html)
+            self.assertNotIn(thumbnails.variant_name(name, "thumb", "webp"), html)
@@ -0,0 +1,130 @@
+"""Resized variants of uploaded images (receipts, profile pictures).
+
+Each variant is stored next to its original as ``<name>.<size>.<format>``
+(``receipts/bill.jpg`` -> ``receipts/bill.thumb.webp``) and generated with
+Pillow in a process pool after the upload is committed, which then sets
+the blob's ``variants`` flag. Templates use the ``thumbnails`` tag library,
+which reads that flag instead of the filesystem and falls back to the
+original until the variants exist.
+
+The module deliberately imports no models at import time: pool workers
+start with ``spawn`` and only need ``make_variants``.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.db import connection
+
+from .storage import media_storage
+
+logger = logging.getLogger(__name__)
+
+# size: (width, height, crop to fill)
+SIZES = {
+    "thumb": (160, 160, True),
+    "medium": (800, 800, False),
+}
+# format: (file extension, Pillow options)
+FORMATS = {
+    "webp": ("webp", {"quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+def variant_name(name, size, fmt="jpeg"):
+    root, _ = os.path.splitext(name)
+    return f"{root}.{size}.{FORMATS[fmt][0]}"
+
+
+def is_variant(name):
+    parts = os.path.basename(name).rsplit(".", 2)
+    return len(parts) == 3 and parts[1] in SIZES
+
+
+# ---------- Generation ----------
+def make_variants(source_path, force=False):
+    """Write every size/format variant of the image at ``source_path``.
+
+    Runs in a pool worker; returns the number of files written.
+    """
+    from PIL import Image, ImageOps
+
+    targets = [
+        (size, fmt, variant_name(source_path, size, fmt))
+        for size in SIZES for fmt in FORMATS
+    ]
+    if not force and all(os.path.exists(path) for _, _, path in targets):
+        return 0
+
+    with Image.open(source_path) as image:
+        image.draft("RGB", SIZES["medium"][:2])  # let JPEG decode at a reduced scale
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        written = 0
+        for size in SIZES:
+            width, height, crop = SIZES[size]
+            if crop:
+                resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+            else:
+                resized = image.copy()
+                resized.thumbnail((width, height), Image.LANCZOS)
+            for fmt in FORMATS:
+                path = variant_name(source_path, size, fmt)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                resized.save(tmp, format=fmt.upper(), **FORMATS[fmt][1])
+                os.replace(tmp, path)  # readers never see a half-written file
+                written += 1
+    return written
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2),
+                mp_context=get_context("spawn"),
+            )
+        return _pool
+
+
+def _finished(name):
+    scheduled_in = threading.get_ident()
+
+    def done(future):
+        if future.exception() is not None:
+            logger.error("Thumbnail generation failed for %s: %s", name, future.exception())
+            return
+        from .blobs import mark_variants
+
+        try:
+            mark_variants([name])
+        finally:
+            if threading.get_ident() != scheduled_in:
+                connection.close()  # opened by the pool's callback thread
+    return done
+
+
+def schedule(name, force=False):
+    """Generate the variants of a stored file in the pool; returns the future"""
+    future = get_pool().submit(make_variants, media_storage().path(name), force)
+    future.add_done_callback(_finished(name))
+    return future
+
+
+def has_variants(name):
+    """Whether every variant file exists (checks the filesystem)"""
+    return all(media_storage().exists(variant_name(name, size, fmt)) for size in SIZES for fmt in FORMATS)
+
+
+# ---------- URLs ----------
+def variant_url(name, size, fmt="jpeg", ready=True):
+    """URL of a variant, or of the original while the variants are not ``ready``"""
+    return media_storage().url(variant_name(name, size, fmt) if ready else name)
@@ -12,9 +12,24 @@ urlpatterns = [
     path('profile/', views.profile, name='profile'),
     path("edit-profile/", views.edit_profile, name="edit_profile"),
     path("add-expense-voice/", views.add_expense_voice, name="add_expense_voice"),
+    path("import/", views.import_expenses, name="import_expenses"),
     path("ai-chat/", views.ai_chat_page, name="ai_chat_page"),
     path("api/ai_chat/", views.ai_chat, name="ai_chat"),
+    path("api/ai_chat/stream/", views.ai_chat_stream, name="ai_chat_stream"),
     path("ai/reset/", views.reset_ai_memory, name="reset_ai_memory"),
+    path("export/csv/", views.export_csv, name="export_csv"),
+    path("export/excel/", views.export_excel, name="export_excel"),
+    path("export/pdf/", views.export_pdf, name="export_pdf"),
+    path("export/jobs/", views.export_job_create, name="export_job_create"),
+    path("export/jobs/<int:job_id>/", views.export_job_status, name="export_job_status"),
+    path("export/jobs/<int:job_id>/download/", views.export_job_download, name="export_job_download"),
+    path("api/dashboard/", views.dashboard_data, name="dashboard_data"),
+    path("api/analytics/", views.analytics_data, name="analytics_data"),
+    path("api/expenses/", views.api_expenses, name="api_expenses"),
+    path("api/expenses/batch/", views.api_expenses_batch, name="api_expenses_batch"),
+    path("api/categories/", views.api_categories, name="api_categories"),
+    path("api/categories/batch/", views.api_categories_batch, name="api_categories_batch"),
+    path("metrics/requests/", views.request_metrics, name="request_metrics"),
 
     
 
@@ -0,0 +1,56 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CategoryVersion, DataVersion
+
+CATEGORY_VERSION_ID = 1  # the single CategoryVersion row
+
+
+def get_data_version(user_id):
+    """Current data version of a user (0 before their first change)"""
+    version = DataVersion.objects.filter(user_id=user_id).values_list("version", flat=True).first()
+    return version or 0
+
+
+def get_data_version_state(user_id):
+    """(version, updated_at) of a user; (0, None) before their first change"""
+    state = DataVersion.objects.filter(user_id=user_id).values_list("version", "updated_at").first()
+    return state or (0, None)
+
+
+def bump_data_versions(user_ids):
+    """Increase the data version of each given user by one"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    now = timezone.now()
+    rows = DataVersion.objects.filter(user_id__in=user_ids)
+    if rows.update(version=F("version") + 1, updated_at=now) == len(user_ids):
+        return
+    missing = user_ids - set(rows.values_list("user_id", flat=True))
+    for user_id in missing:
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(user_id=user_id, version=1, updated_at=now)
+        except IntegrityError:
+            # Created concurrently; count this change on top of it
+            DataVersion.objects.filter(user_id=user_id).update(version=F("version") + 1, updated_at=now)
+
+
+def get_category_version():
+    """Current category version, shared by every process (0 before the first change)"""
+    version = CategoryVersion.objects.filter(pk=CATEGORY_VERSION_ID).values_list("version", flat=True).first()
+    return version or 0
+
+
+def bump_category_version():
+    """Increase the category version by one"""
+    rows = CategoryVersion.objects.filter(pk=CATEGORY_VERSION_ID)
+    if rows.update(version=F("version") + 1):
+        return
+    try:
+        with transaction.atomic():
+            CategoryVersion.objects.create(pk=CATEGORY_VERSION_ID, version=1)
+    except IntegrityError:
+        rows.update(version=F("version") + 1)
@@ -0,0 +1,15 @@
+# Views are split by area; heavy dependencies (openpyxl, reportlab, Gemini,
+# MongoDB, NumPy) are imported on first use inside these modules, not at startup.
+from .auth import register, user_login, user_logout
+from .dashboard import filter_expenses, paginate_expenses, dashboard_totals, home, dashboard_data
+from .expenses import add_expense, edit_expense, delete_expense, add_expense_voice, import_expenses
+from .exports import (
+    export_csv, export_excel, export_pdf,
+    export_job_create, export_job_status, export_job_download,
+)
+from .profile import profile, edit_profile
+from .ai import ai_chat_page, ai_chat, ai_chat_stream, reset_ai_memory
+from .analytics import analytics_data
+from .api import api_expenses, api_expenses_batch, api_categories, api_categories_batch
+from .monitoring import request_metrics
+from .media import serve_media
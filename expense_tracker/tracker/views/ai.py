@@ -0,0 +1,249 @@
+from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+
+from .. import ai, instrumentation, intents, metrics
+from ..chat_memory import get_chat_store
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- AI Memory ----------
+SUMMARY_THRESHOLD = 50  # unsummarized messages that trigger a fold
+KEEP_VERBATIM = 10      # most recent messages never folded into the summary
+SUMMARY_CLAIM_SECONDS = 300  # a crashed summarizer's claim expires after this
+
+# Summarization runs off the request path, queued once per user in this
+# process; the store's fold claim keeps other processes from running it too
+chat_summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+_summarizing = set()
+_summarizing_lock = threading.Lock()
+
+
+def save_message(user_id, role, content):
+    """Save a chat message for a specific user and schedule summarization when due"""
+    pending = get_chat_store().append(user_id, role, content)
+    if pending > SUMMARY_THRESHOLD:
+        schedule_summary(user_id)
+
+
+def load_history(user_id, limit=10):
+    """Load last N messages for a specific user"""
+    return get_chat_store().history(user_id, limit)
+
+
+def load_summary(user_id):
+    """Load summary memory for a user"""
+    return get_chat_store().summary(user_id)
+
+
+def schedule_summary(user_id):
+    """Queue summarize_old_chats for a user unless it is already queued"""
+    with _summarizing_lock:
+        if user_id in _summarizing:
+            return
+        _summarizing.add(user_id)
+
+    def run():
+        try:
+            summarize_old_chats(user_id)
+        except Exception as e:
+            logger.error("AI Summary Error: %s", str(e))
+        finally:
+            with _summarizing_lock:
+                _summarizing.discard(user_id)
+    chat_summarizer.submit(run)
+
+
+def summarize_old_chats(user_id):
+    """Fold all but the latest KEEP_VERBATIM messages into the rolling summary.
+
+    Only messages since the last fold are sent, together with the existing
+    summary, and they are deleted once the new summary is saved. Does
+    nothing while another process holds the store's fold claim.
+    """
+    store = get_chat_store()
+    if not store.claim_fold(user_id, SUMMARY_CLAIM_SECONDS):
+        return  # another process is folding them
+    try:
+        _fold_old_messages(store, user_id)
+    finally:
+        store.release_fold(user_id)
+
+
+def _fold_old_messages(store, user_id):
+    old_msgs = store.unsummarized(user_id)[:-KEEP_VERBATIM]
+    if not old_msgs:
+        return
+
+    history_text = "\n".join([f"{m['role']}: {m['content']}" for m in old_msgs])
+    previous = store.summary(user_id)
+
+    # Ask Gemini to merge the new messages into the summary
+    model = ai.get_model()
+    response = model.generate_content(
+        "Update the summary of a conversation with the messages that followed it. "
+        "Keep key facts and user preferences.\n\n"
+        f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{history_text}"
+    )
+    summary = response.text.strip() if response and hasattr(response, "text") else ""
+    if summary:
+        store.fold(user_id, summary, [m["id"] for m in old_msgs])
+
+
+# ---------- AI Chat ----------
+# Chat memory writes happen here, after the reply has been sent
+chat_memory_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-memory")
+
+
+def _save_in_background(user_id, messages_to_save):
+    def save():
+        try:
+            for role, content in messages_to_save:
+                save_message(user_id, role, content)
+        except Exception as e:
+            logger.error("AI Memory Error: %s", str(e))
+    chat_memory_writer.submit(save)
+
+
+def answer_from_expenses(user, user_message):
+    """Reply to questions the expense data answers directly, else None"""
+    intent = intents.parse(user_message)
+    metrics.incr("ai.answer.remote" if intent is None else "ai.answer.local")
+    return intents.answer(user, intent) if intent else None
+
+
+def load_conversation(user_id):
+    """(summary, recent history) sent to Gemini with a question"""
+    return load_summary(user_id), load_history(user_id)
+
+
+def build_prompt(summary, history, user_message):
+    history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
+    return (f"User's past memory: {summary}\n\nRecent conversation:\n{history_text}"
+            f"\nuser: {user_message}\nassistant:")
+
+
+@login_required
+def ai_chat_page(request):
+    return render(request, "tracker/ai_chat.html")
+
+@csrf_exempt
+@login_required
+def ai_chat(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            user_message = data.get("message", "").strip()
+            if not user_message:
+                return JsonResponse({"reply": "⚠️ Please type something."})
+
+            # --- STEP 1: Try to answer from Expense DB ---
+            reply = answer_from_expenses(request.user, user_message)
+            if reply is None:
+                # --- STEP 2: Same standalone question on the same data already answered ---
+                summary, history = load_conversation(request.user.id)
+                cacheable = ai.cacheable(user_message, history)
+                reply = ai.cached_reply(request.user.id, user_message) if cacheable else None
+                if reply is None:
+                    # --- STEP 3: Fallback to Gemini ---
+                    model = ai.get_model()
+                    with instrumentation.external_call("gemini"):
+                        response = model.generate_content(build_prompt(summary, history, user_message))
+                    reply = response.text if response and hasattr(response, "text") else None
+                    if cacheable:
+                        ai.cache_reply(request.user.id, user_message, reply)
+                    reply = reply or "⚠️ No response from AI."
+
+            _save_in_background(request.user.id, [("user", user_message), ("assistant", reply)])
+            return JsonResponse({"reply": reply})
+        except Exception as e:
+            logger.error("AI Chat Error: %s", str(e))
+            return JsonResponse({"reply": f"⚠️ Error: {str(e)}"})
+    return JsonResponse({"reply": "⚠️ Invalid request method."})
+
+
+def _sse(payload, event=None):
+    """Encode one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+@csrf_exempt
+@login_required
+async def ai_chat_stream(request):
+    """Stream the assistant's reply as server-sent events.
+
+    Runs as a native async view under ASGI, so a worker is not held while
+    Gemini generates; tokens are forwarded as they arrive.
+    """
+    if request.method != "POST":
+        return JsonResponse({"reply": "⚠️ Invalid request method."}, status=405)
+    try:
+        user_message = json.loads(request.body).get("message", "").strip()
+    except ValueError:
+        user_message = ""
+    if not user_message:
+        return JsonResponse({"reply": "⚠️ Please type something."}, status=400)
+    user = await request.auser()
+
+    async def events():
+        parts = []
+        try:
+            reply = await sync_to_async(answer_from_expenses)(user, user_message)
+            if reply is None:
+                summary, history = await sync_to_async(load_conversation, thread_sensitive=False)(user.id)
+                cacheable = ai.cacheable(user_message, history)
+                if cacheable:
+                    reply = await sync_to_async(ai.cached_reply)(user.id, user_message)
+            if reply is not None:
+                parts.append(reply)
+                yield _sse({"delta": reply})
+            else:
+                # Importing and configuring the client blocks
+                model = await sync_to_async(ai.get_model)()
+                with instrumentation.external_call("gemini"):
+                    response = await model.generate_content_async(
+                        build_prompt(summary, history, user_message), stream=True)
+                    async for chunk in response:
+                        text = getattr(chunk, "text", "")
+                        if text:
+                            parts.append(text)
+                            yield _sse({"delta": text})
+                if parts:
+                    if cacheable:
+                        await sync_to_async(ai.cache_reply)(user.id, user_message, "".join(parts))
+                else:
+                    parts.append("⚠️ No response from AI.")
+                    yield _sse({"delta": parts[0]})
+            yield _sse({}, event="done")
+        except Exception as e:
+            logger.error("AI Chat Error: %s", str(e))
+            yield _sse({"error": f"⚠️ Error: {str(e)}"}, event="error")
+        finally:
+            if parts:
+                _save_in_background(user.id, [("user", user_message), ("assistant", "".join(parts))])
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let a proxy buffer the stream
+    return response
+
+# ---------- Reset AI Memory ----------
+@csrf_exempt
+@login_required
+def reset_ai_memory(request):
+    if request.method == "POST":
+        try:
+            get_chat_store().reset(request.user.id)
+            return JsonResponse({"success": True, "msg": "🧹 Memory cleared successfully!"})
+        except Exception as e:
+            return JsonResponse({"success": False, "msg": f"⚠️ Error: {str(e)}"})
+    return JsonResponse({"success": False, "msg": "⚠️ Invalid request method."})
@@ -0,0 +1,23 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .dashboard import dashboard_etag, dashboard_last_modified
+
+# NumPy is imported with the analytics module on the first request
+
+
+# ---------- Analytics ----------
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
+def analytics_data(request):
+    """Monthly trend, daily moving averages and the month-end budget projection"""
+    from .. import analytics
+    try:
+        months = int(request.GET.get("months", analytics.DEFAULT_MONTHS))
+    except ValueError:
+        months = analytics.DEFAULT_MONTHS
+    months = min(max(months, 2), analytics.MAX_MONTHS)
+    return JsonResponse(analytics.user_analytics(request.user, months=months))
@@ -0,0 +1,301 @@
+from collections import defaultdict
+from functools import wraps
+import json
+
+from django import forms
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
+
+from .. import recurrence
+from ..filters import DEFAULT_SORT, SORT_ORDERINGS
+from ..forms import ExpenseForm
+from ..importers import CategoryResolver
+from ..matching import get_category_matcher
+from ..models import Category, Expense
+from ..signals import batched_changes, expense_row
+from .dashboard import filter_expenses, paginate_expenses
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+API_BATCH_LIMIT = getattr(settings, "API_BATCH_LIMIT", 500)  # operations per batch request
+
+# API field -> the column it is read from
+EXPENSE_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "amount": "amount",
+    "category_id": "category_id",
+    "category": "category_id",
+    "date": "date",
+    "notes": "notes",
+    "recurring": "recurring",
+    "receipt": "receipt",
+}
+DEFAULT_EXPENSE_FIELDS = ("id", "title", "amount", "category_id", "category", "date", "notes", "recurring")
+
+# Writable fields, validated with the expense form's rules
+_FORM_FIELDS = ExpenseForm.base_fields
+EXPENSE_INPUT = {name: _FORM_FIELDS[name] for name in ("title", "amount", "date", "notes", "recurring")}
+REQUIRED_ON_CREATE = ("title", "amount")
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+def api_view(*methods):
+    """JSON API view: gzip-compressed, 401 instead of the login redirect,
+    and ApiError turned into an error response"""
+    def decorate(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({"error": "Authentication required"}, status=401)
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                body = {"error": str(error)}
+                if error.errors:
+                    body["errors"] = error.errors
+                return JsonResponse(body, status=error.status)
+        return gzip_page(require_http_methods(methods)(wrapper))
+    return decorate
+
+
+# ---------- Helpers ----------
+def _json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError("The request body is not valid JSON")
+
+
+def _operations(request):
+    operations = _json_body(request).get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise ApiError('Send {"operations": [...]} with at least one operation')
+    if len(operations) > API_BATCH_LIMIT:
+        raise ApiError(f"At most {API_BATCH_LIMIT} operations per batch", status=413)
+    if not all(isinstance(operation, dict) for operation in operations):
+        raise ApiError("Every operation must be an object")
+    return operations
+
+
+def _requested_fields(request):
+    raw = request.GET.get("fields")
+    if not raw:
+        return DEFAULT_EXPENSE_FIELDS
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in EXPENSE_FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get("limit", API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError("limit must be a number")
+    return min(max(size, 1), API_MAX_PAGE_SIZE)
+
+
+def is_id(value):
+    """Whether a client-supplied value can be a primary key (JSON true is not 1)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def expense_values(expense, fields, category_names):
+    values = {}
+    for name in fields:
+        if name == "id":
+            values[name] = expense.pk
+        elif name == "category":
+            values[name] = category_names.get(expense.category_id)
+        elif name == "receipt":
+            values[name] = expense.receipt.url if expense.receipt else None
+        else:
+            values[name] = getattr(expense, name)
+    return values
+
+
+def clean_expense_data(data, category_ids, partial):
+    """Validated model values from an operation's ``data``; raises ValidationError"""
+    if not isinstance(data, dict):
+        raise forms.ValidationError("data must be an object")
+    unknown = set(data) - EXPENSE_INPUT.keys() - {"category_id"}
+    if unknown:
+        raise forms.ValidationError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    cleaned = {}
+    for name, form_field in EXPENSE_INPUT.items():
+        if name not in data and (partial or name not in REQUIRED_ON_CREATE):
+            continue
+        try:
+            cleaned[name] = form_field.clean(data.get(name))
+        except forms.ValidationError as error:
+            raise forms.ValidationError(f"{name}: {' '.join(error.messages)}")
+    if "category_id" in data:
+        category_id = data["category_id"]
+        if category_id is not None and not (is_id(category_id) and category_id in category_ids):
+            raise forms.ValidationError(f"category_id: no category {category_id}")
+        cleaned["category_id"] = category_id
+    if partial and not cleaned:
+        raise forms.ValidationError("Nothing to update")
+    return cleaned
+
+
+# ---------- Expenses ----------
+@api_view("GET")
+def api_expenses(request):
+    """One page of the user's expenses, filtered like the dashboard.
+
+    Accepts the dashboard parameters (category, date_range, search,
+    sort_by), ``cursor`` and ``limit`` for keyset pagination, and
+    ``fields`` (comma-separated) to return only some fields.
+    """
+    fields = _requested_fields(request)
+    sort_field = SORT_ORDERINGS.get(request.GET.get("sort_by"), SORT_ORDERINGS[DEFAULT_SORT])[0].lstrip("-")
+    columns = {EXPENSE_FIELDS[name] for name in fields} | {sort_field, "id"}
+
+    expenses = filter_expenses(request, Expense.objects.filter(user=request.user)).only(*columns)
+    page, next_cursor = paginate_expenses(request, expenses, page_size=_page_size(request))
+    category_names = (
+        {category.id: category.name for category in get_category_matcher().categories}
+        if "category" in fields else {}
+    )
+    return JsonResponse({
+        "results": [expense_values(expense, fields, category_names) for expense in page],
+        "next_cursor": next_cursor,
+    })
+
+
+def _plan(operations, existing, category_ids):
+    """Split validated operations into creates, updates and deletes; raises ApiError"""
+    creates, updates, deletes, errors = [], [], [], []
+    touched = set()
+    for index, op in enumerate(operations):
+        kind = op.get("op")
+        try:
+            if kind == "create":
+                creates.append((index, clean_expense_data(op.get("data"), category_ids, partial=False)))
+                continue
+            if kind not in ("update", "delete"):
+                raise forms.ValidationError('op must be "create", "update" or "delete"')
+            expense = existing.get(op.get("id")) if is_id(op.get("id")) else None
+            if expense is None:
+                raise forms.ValidationError(f"No expense {op.get('id')}")
+            if expense.pk in touched:
+                raise forms.ValidationError(f"Expense {expense.pk} appears more than once")
+            touched.add(expense.pk)
+            if kind == "update":
+                updates.append((index, expense, clean_expense_data(op.get("data"), category_ids, partial=True)))
+            else:
+                deletes.append((index, expense))
+        except forms.ValidationError as error:
+            errors.append({"index": index, "error": " ".join(error.messages)})
+    if errors:
+        raise ApiError("No operations were applied", errors=errors)
+    return creates, updates, deletes
+
+
+@api_view("POST")
+def api_expenses_batch(request):
+    """Apply create, update and delete operations in one transaction.
+
+    Body: {"operations": [{"op": "create", "data": {...}},
+    {"op": "update", "id": 1, "data": {...}}, {"op": "delete", "id": 2}]}.
+    Every operation is validated first; if any fails nothing is written
+    and the errors are returned by operation index.
+    """
+    operations = _operations(request)
+    target_ids = {op.get("id") for op in operations
+                  if op.get("op") in ("update", "delete") and is_id(op.get("id"))}
+    referenced = {op["data"].get("category_id") for op in operations
+                  if isinstance(op.get("data"), dict) and is_id(op["data"].get("category_id"))}
+
+    results = [None] * len(operations)
+    with transaction.atomic(), batched_changes() as changes:
+        # Locked until commit, so concurrent edits cannot be overwritten with
+        # stale values and the removed rows match what is replaced
+        existing = Expense.objects.select_for_update().filter(user=request.user, pk__in=target_ids).in_bulk()
+        category_ids = set(Category.objects.select_for_update().filter(pk__in=referenced)
+                           .values_list("pk", flat=True))
+        creates, updates, deletes = _plan(operations, existing, category_ids)
+
+        created = Expense.objects.bulk_create(
+            Expense(user=request.user, **data) for _, data in creates
+        )
+        changes.added.extend(expense_row(expense) for expense in created)
+
+        by_fields = defaultdict(list)
+        for _, expense, data in updates:
+            changes.removed.append(expense_row(expense))
+            for name, value in data.items():
+                setattr(expense, name, value)
+            changes.added.append(expense_row(expense))
+            # Each row only writes the fields its operation changed
+            by_fields[tuple(sorted(data))].append(expense)
+        for fields, expenses in by_fields.items():
+            Expense.objects.bulk_update(expenses, fields)
+
+        if deletes:
+            # The delete signals add their rows to ``changes``
+            Expense.objects.filter(pk__in=[expense.pk for _, expense in deletes]).delete()
+
+        for expense in created:
+            if expense.recurring:
+                recurrence.start_rule(expense)
+        for _, expense, _ in updates:
+            recurrence.sync_expense_rule(expense)
+
+    for (index, _), expense in zip(creates, created):
+        results[index] = {"op": "create", "id": expense.pk}
+    for index, expense, _ in updates:
+        results[index] = {"op": "update", "id": expense.pk}
+    for index, expense in deletes:
+        results[index] = {"op": "delete", "id": expense.pk}
+    return JsonResponse({"results": results})
+
+
+# ---------- Categories ----------
+@api_view("GET")
+def api_categories(request):
+    return JsonResponse({
+        "results": [{"id": category.id, "name": category.name} for category in get_category_matcher().categories],
+    })
+
+
+@api_view("POST")
+def api_categories_batch(request):
+    """Create categories by name; names that already exist return the existing id.
+
+    Categories are shared by all users, so renaming and deleting them stays
+    in the admin.
+    """
+    operations = _operations(request)
+    name_field = forms.CharField(max_length=Category._meta.get_field("name").max_length)
+    names, errors = [], []
+    for index, op in enumerate(operations):
+        try:
+            if op.get("op") != "create":
+                raise forms.ValidationError('op must be "create"')
+            data = op.get("data")
+            names.append(name_field.clean(data.get("name") if isinstance(data, dict) else None).strip())
+        except forms.ValidationError as error:
+            errors.append({"index": index, "error": " ".join(error.messages)})
+    if errors:
+        raise ApiError("No operations were applied", errors=errors)
+
+    with transaction.atomic():
+        categories = CategoryResolver()
+        categories.resolve(names)
+    return JsonResponse({
+        "results": [{"op": "create", "id": categories.id_for(name), "name": name} for name in names],
+        "created": categories.created,
+    })
@@ -0,0 +1,37 @@
+from django.shortcuts import render, redirect
+from django.contrib.auth import authenticate, login, logout
+from django.contrib import messages
+
+from ..forms import SimpleUserCreationForm
+from ..models import UserProfile
+
+
+# ---------- User Auth ----------
+def register(request):
+    if request.method == "POST":
+        form = SimpleUserCreationForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            UserProfile.objects.create(user=user)  # create profile automatically
+            messages.success(request, "Account created successfully!")
+            return redirect("login")
+    else:
+        form = SimpleUserCreationForm()
+    return render(request, "registration/register.html", {"form": form})
+
+
+def user_login(request):
+    if request.method == "POST":
+        username = request.POST.get("username")
+        password = request.POST.get("password")
+        user = authenticate(request, username=username, password=password)
+        if user:
+            login(request, user)
+            return redirect("home")
+        messages.error(request, "Invalid credentials")
+    return render(request, "registration/login.html")
+
+
+def user_logout(request):
+    logout(request)
+    return redirect("login")
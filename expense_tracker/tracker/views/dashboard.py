@@ -0,0 +1,236 @@
+from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.contrib.messages import get_messages
+from django.db.models import Q, Sum
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from datetime import date, datetime, time, timedelta
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+
+from .. import blobs, budgets, rollups, summaries
+from ..filters import DEFAULT_SORT, SORT_ORDERINGS, apply_filters
+from ..matching import get_category_matcher
+from ..models import Expense, SpendingRollup
+from ..periods import date_range_bounds, intersect, month_start, next_month
+from ..versioning import get_category_version, get_data_version_state
+
+
+# ---------- Helper (Apply Filters) ----------
+EXPENSES_PAGE_SIZE = getattr(settings, "EXPENSES_PAGE_SIZE", 30)
+
+
+def filter_expenses(request, expenses):
+    return apply_filters(expenses, request.GET)
+
+
+# ---------- Helper (Keyset Pagination) ----------
+def _encode_cursor(value, pk):
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, field):
+    """Return (value, pk) from a cursor, or None if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if field == "date":
+            value = date.fromisoformat(value)
+        else:
+            value = float(value)
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def paginate_expenses(request, expenses, page_size=EXPENSES_PAGE_SIZE):
+    """Return one page of an ordered queryset and the cursor for the next one.
+
+    Uses keyset pagination on ``(sort field, id)`` so every page costs the same
+    single indexed query however deep the user scrolls.
+    """
+    sort_by = request.GET.get("sort_by")
+    first, second = SORT_ORDERINGS.get(sort_by, SORT_ORDERINGS[DEFAULT_SORT])
+    descending = first.startswith("-")
+    field = first.lstrip("-")
+
+    cursor = request.GET.get("cursor")
+    position = _decode_cursor(cursor, field) if cursor else None
+    if position:
+        value, pk = position
+        op = "lt" if descending else "gt"
+        expenses = expenses.filter(
+            Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"id__{op}": pk})
+        )
+
+    page = list(expenses[:page_size + 1])
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        last = page[-1]
+        next_cursor = _encode_cursor(getattr(last, field), last.pk)
+    return page, next_cursor
+
+
+# ---------- Dashboard ----------
+def dashboard_totals(request, expenses):
+    """Dashboard cards and chart data for the filtered expenses.
+
+    Read from the rollup table in O(buckets); a free-text search cannot be
+    answered from rollups so it falls back to one aggregate over the rows.
+    """
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    windows = {
+        "total_today": (today, today),
+        "total_week": (week_start, None),
+        "total_month": (month_start(today), next_month(today) - timedelta(days=1)),
+        "total_expense": (None, None),
+    }
+
+    search = request.GET.get("search")
+    if search and search.strip():
+        sums = {}
+        for name, (start, end) in windows.items():
+            bounds = {}
+            if start:
+                bounds["date__gte"] = start
+            if end:
+                bounds["date__lt"] = end + timedelta(days=1)
+            sums[name] = Sum("amount", filter=Q(**bounds) if bounds else None)
+        totals = expenses.aggregate(**sums)
+        by_category = expenses.order_by().values("category__name").annotate(total=Sum("amount"))
+    else:
+        rollup_rows = SpendingRollup.objects.filter(user=request.user)
+        category = request.GET.get("category")
+        if category:
+            rollup_rows = rollup_rows.filter(category__name=category)
+        bounds = date_range_bounds(request.GET.get("date_range"), today)
+        sums = {}
+        for name, window in windows.items():
+            overlap = intersect(bounds, window)
+            if overlap:
+                sums[name] = Sum("total", filter=rollups.range_filter(*overlap))
+        totals = rollup_rows.aggregate(**sums)
+        by_category = (rollup_rows.filter(rollups.range_filter(*bounds))
+                       .values("category__name").annotate(total=Sum("total")).order_by())
+
+    result = {name: totals.get(name) or 0 for name in windows}
+    result["category_labels"] = [c["category__name"] for c in by_category]
+    result["category_data"] = [c["total"] for c in by_category]
+    return result
+
+
+def cached_dashboard_totals(request, expenses):
+    """dashboard_totals, from the summary cache when the data is unchanged"""
+    version, _, categories = _versions(request)
+    key = summaries.summary_key(request.user.pk, request.GET, date.today(), version, categories)
+    return summaries.cached_summary(key, lambda: dashboard_totals(request, expenses))
+
+
+def _versions(request):
+    """The user's (data version, updated_at) and the category version, read once per request"""
+    if not hasattr(request, "_versions"):
+        request._versions = (*get_data_version_state(request.user.pk), get_category_version())
+    return request._versions
+
+
+# ---------- Conditional GET ----------
+def _dashboard_state(request):
+    """(etag, last modified) of the current user's dashboard, or (None, None).
+
+    The page only changes when the user's data version does, or with the
+    query string, the day (the today/week/month cards), the category list
+    or the CSRF cookie (the rendered token). Pending flash messages are
+    shown once, so such responses are never validated.
+    """
+    if not hasattr(request, "_dashboard_state"):
+        state = (None, None)
+        if request.method in ("GET", "HEAD") and not len(get_messages(request)):
+            get_token(request)  # sets the CSRF cookie now if the request has none
+            version, updated_at, categories = _versions(request)
+            today = date.today()  # as in dashboard_totals
+            key = "|".join(str(part) for part in (
+                request.user.pk, version, request.path, request.GET.urlencode(), today,
+                categories, request.META["CSRF_COOKIE"],
+            ))
+            start_of_day = timezone.make_aware(datetime.combine(today, time.min))
+            state = (
+                hashlib.sha256(key.encode()).hexdigest()[:32],
+                max(updated_at, start_of_day) if updated_at else start_of_day,
+            )
+        request._dashboard_state = state
+    return request._dashboard_state
+
+
+def dashboard_etag(request, *args, **kwargs):
+    return _dashboard_state(request)[0]
+
+
+def dashboard_last_modified(request, *args, **kwargs):
+    return _dashboard_state(request)[1]
+
+
+@login_required
+@cache_control(private=True, no_cache=True)  # browsers revalidate instead of reusing it
+@condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
+def home(request):
+    expenses = Expense.objects.filter(user=request.user)
+    expenses = filter_expenses(request, expenses)
+
+    page, next_cursor = paginate_expenses(
+        request, expenses.select_related("category").annotate(receipt_variants=blobs.variants_ready("receipt"))
+    )
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params["cursor"] = next_cursor
+        next_query = params.urlencode()
+    first_query = None
+    if request.GET.get("cursor"):
+        params = request.GET.copy()
+        del params["cursor"]
+        first_query = params.urlencode()
+
+    return render(request, "tracker/home.html", {
+        "expenses": page,
+        "next_query": next_query,
+        "first_query": first_query,
+        "categories": [c.name for c in get_category_matcher().categories],
+        "budget": budgets.budget_status(request.user.pk),
+        **cached_dashboard_totals(request, expenses),
+    })
+
+
+@login_required
+@cache_control(private=True, no_cache=True)  # browsers revalidate instead of reusing it
+@condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
+def dashboard_data(request):
+    """The dashboard as JSON: totals, chart data and one page of expenses"""
+    expenses = filter_expenses(request, Expense.objects.filter(user=request.user))
+    page, next_cursor = paginate_expenses(request, expenses.select_related("category"))
+    return JsonResponse({
+        **cached_dashboard_totals(request, expenses),
+        "budget": budgets.budget_status(request.user.pk).as_dict(),
+        "expenses": [
+            {
+                "id": expense.pk,
+                "title": expense.title,
+                "amount": expense.amount,
+                "category": expense.category.name if expense.category else None,
+                "date": expense.date,
+                "notes": expense.notes,
+            }
+            for expense in page
+        ],
+        "next_cursor": next_cursor,
+    })
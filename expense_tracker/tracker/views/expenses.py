@@ -0,0 +1,119 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+import json
+import re
+import logging
+
+from .. import importers, recurrence
+from ..forms import ExpenseForm, ImportExpensesForm
+from ..matching import get_category_matcher
+from ..models import Expense
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Expenses ----------
+@login_required
+def add_expense(request):
+    if request.method == "POST":
+        form = ExpenseForm(request.POST, request.FILES)
+        if form.is_valid():
+            expense = form.save(commit=False)
+            expense.user = request.user
+            expense.save()
+            recurrence.sync_expense_rule(expense)
+            messages.success(request, "Expense added!")
+            return redirect("home")
+    else:
+        form = ExpenseForm()
+    return render(request, "tracker/add_expense.html", {"form": form})
+
+
+@login_required
+def edit_expense(request, expense_id):
+    expense = get_object_or_404(Expense, id=expense_id, user=request.user)
+    if request.method == "POST":
+        form = ExpenseForm(request.POST, request.FILES, instance=expense)
+        if form.is_valid():
+            expense = form.save()
+            recurrence.sync_expense_rule(expense)
+            messages.success(request, "Expense updated!")
+            return redirect("home")
+    else:
+        form = ExpenseForm(instance=expense)
+    return render(request, "tracker/edit_expense.html", {"form": form})
+
+
+@login_required
+def delete_expense(request, expense_id):
+    expense = get_object_or_404(Expense, id=expense_id, user=request.user)
+    expense.delete()
+    messages.success(request, "Expense deleted!")
+    return redirect("home")
+
+
+# ---------- Voice Expense ----------
+@login_required
+@csrf_exempt
+def add_expense_voice(request):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            speech = data.get("speech", "").lower()
+
+            amount_match = re.search(r"\d+(\.\d+)?", speech)
+            category_match = get_category_matcher().match(speech)
+
+            if amount_match:
+                amount = float(amount_match.group())
+                expense = Expense.objects.create(
+                    title=f"Voice Entry - {category_match.name if category_match else 'Other'}",
+                    amount=amount,
+                    category_id=category_match.id if category_match else None,
+                    user=request.user
+                )
+                return JsonResponse({
+                    "success": True,
+                    "msg": f"✅ Added {amount} in {category_match.name if category_match else 'Other'}"
+                })
+
+            return JsonResponse({"success": False, "msg": "⚠️ Could not detect amount."})
+        except Exception as e:
+            logger.error("Voice Expense Error: %s", str(e))
+            return JsonResponse({"success": False, "msg": f"Error: {str(e)}"})
+    return JsonResponse({"success": False, "msg": "Invalid request"})
+
+
+# ---------- Import ----------
+@login_required
+def import_expenses(request):
+    """Import a CSV or XLSX file and show per-batch results"""
+    result = None
+    batches = []
+    if request.method == "POST":
+        form = ImportExpensesForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                result = importers.import_expenses(
+                    request.user, upload, importers.file_format(upload.name),
+                    dry_run=form.cleaned_data["dry_run"],
+                    on_batch=lambda batch: batches.append((batch.number, batch.imported, len(batch.errors))),
+                )
+            except importers.ImportFormatError as e:
+                form.add_error("file", str(e))
+                result = e.result  # batches committed before the error, if any
+            else:
+                if result.imported and not form.cleaned_data["dry_run"]:
+                    messages.success(request, f"Imported {result.imported} expenses.")
+    else:
+        form = ImportExpensesForm()
+    return render(request, "tracker/import_expenses.html", {
+        "form": form,
+        "result": result,
+        "batches": batches,
+        "dry_run": request.method == "POST" and form.cleaned_data.get("dry_run"),
+    })
@@ -0,0 +1,108 @@
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+import tempfile
+
+from ..models import Expense, ExportJob
+from .dashboard import filter_expenses
+
+# The exporter modules import openpyxl and reportlab, so they are only
+# loaded when an export is actually requested.
+
+
+# ---------- Export CSV ----------
+@login_required
+def export_csv(request):
+    from .. import exporters
+    expenses = filter_expenses(request, Expense.objects.filter(user=request.user))
+
+    response = StreamingHttpResponse(
+        exporters.csv_chunks(exporters.export_rows(expenses)),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = 'attachment; filename="expenses.csv"'
+    return response
+
+
+# ---------- Export Excel ----------
+@login_required
+def export_excel(request):
+    from .. import exporters
+    expenses = filter_expenses(request, Expense.objects.filter(user=request.user))
+
+    # Spool to a temporary file so the workbook never sits in memory; the
+    # file is removed once the response has been streamed and closed.
+    spool = tempfile.TemporaryFile()
+    exporters.write_excel(exporters.export_rows(expenses), spool)
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename="expenses.xlsx",
+        content_type=exporters.EXCEL_CONTENT_TYPE,
+    )
+
+
+# ---------- Export PDF ----------
+@login_required
+def export_pdf(request):
+    from .. import exporters
+    expenses = filter_expenses(request, Expense.objects.filter(user=request.user))
+
+    spool = tempfile.TemporaryFile()
+    exporters.write_pdf(
+        exporters.export_rows(expenses),
+        spool,
+        summary=exporters.category_summary(expenses),
+    )
+    spool.seek(0)
+    return FileResponse(
+        spool,
+        as_attachment=True,
+        filename="expenses.pdf",
+        content_type="application/pdf",
+    )
+
+
+# ---------- Background Exports ----------
+def _export_job_payload(job, reused=False):
+    return {
+        "id": job.pk,
+        "format": job.format,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "error": job.error,
+        "reused": reused,
+        "status_url": reverse("export_job_status", args=[job.pk]),
+        "download_url": reverse("export_job_download", args=[job.pk]) if job.status == ExportJob.DONE else None,
+    }
+
+
+@login_required
+def export_job_create(request):
+    """Queue an export of the dashboard filters in the query string"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
+    export_format = request.POST.get("format")
+    if export_format not in dict(ExportJob.FORMAT_CHOICES):
+        return JsonResponse({"error": "Unknown export format."}, status=400)
+    from .. import export_jobs
+    job, reused = export_jobs.enqueue(request.user, export_format, request.GET)
+    return JsonResponse(_export_job_payload(job, reused), status=200 if reused else 201)
+
+
+@login_required
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user)
+    return JsonResponse(_export_job_payload(job))
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, user=request.user, status=ExportJob.DONE)
+    if not job.file:
+        raise Http404("Export file is no longer available")
+    from .. import export_jobs
+    return FileResponse(job.file.open("rb"), as_attachment=True, filename=export_jobs.filename(job))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.http import HttpResponseNotModified
+from django.views.static import serve
+
+from ..storage import content_digest
+
+# A content-addressed name always refers to the same bytes
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+# ---------- Media ----------
+def serve_media(request, path, document_root=None):
+    """Serve an uploaded file with cache headers suited to its name.
+
+    Content-addressed files (receipts/ab/cd/<sha256>.jpg and their
+    thumbnails) get their digest as ETag and are cacheable forever; a
+    matching If-None-Match is answered without touching the disk. Other
+    files are revalidated with Last-Modified on every use.
+    """
+    digest = content_digest(path)
+    if digest is None:
+        response = serve(request, path, document_root=document_root or settings.MEDIA_ROOT)
+        response["Cache-Control"] = REVALIDATE
+        return response
+
+    etag = f'"{digest}"'
+    if_none_match = request.headers.get("If-None-Match", "")
+    if if_none_match == "*" or etag in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = serve(request, path, document_root=document_root or settings.MEDIA_ROOT)
+    response["ETag"] = etag
+    response["Cache-Control"] = IMMUTABLE
+    return response
@@ -0,0 +1,16 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .. import ai, instrumentation, summaries
+
+
+# ---------- Monitoring ----------
+@staff_member_required
+def request_metrics(request):
+    """Rolling request latency per URL name (this process) and cache counters"""
+    return JsonResponse({
+        "requests": instrumentation.percentiles(),
+        "ai_response_cache": ai.response_cache_stats(),
+        "ai_local_answers": ai.local_answer_stats(),
+        "dashboard_cache": summaries.summary_cache_stats(),
+    })
@@ -0,0 +1,40 @@
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+
+from ..forms import UserProfileForm
+from ..models import UserProfile
+
+
+# ---------- Profile ----------
+@login_required
+def profile(request):
+    profile = get_object_or_404(UserProfile, user=request.user)
+    if request.method == "POST":
+        form = UserProfileForm(request.POST, request.FILES, instance=profile)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Profile updated!")
+            return redirect("profile")
+    else:
+        form = UserProfileForm(instance=profile)
+    return render(request, "tracker/profile.html", {"form": form})
+
+
+@login_required
+def edit_profile(request):
+    profile = get_object_or_404(UserProfile, user=request.user)
+    if request.method == "POST":
+        profile_form = UserProfileForm(request.POST, request.FILES, instance=profile)
+        user = request.user
+        user.first_name = request.POST.get("first_name")
+        user.last_name = request.POST.get("last_name")
+        user.email = request.POST.get("email")
+        if profile_form.is_valid():
+            user.save()
+            profile_form.save()
+            messages.success(request, "Profile updated successfully!")
+            return redirect("profile")
+    else:
+        profile_form = UserProfileForm(instance=profile)
+    return render(request, "tracker/edit_profile.html", {"form": profile_form})